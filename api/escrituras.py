@@ -0,0 +1,122 @@
+"""
+Altas y modificaciones en lote para la API.
+
+Todas las filas de una solicitud se validan con el ModelForm del recurso
+antes de guardar nada; si alguna falla no se guarda ninguna y se devuelven
+los errores de cada fila con su índice. Si todas son válidas se guardan
+con `save()` (para no saltarse la lógica de los modelos y las señales) en
+una sola transacción reintentable.
+
+Las claves foráneas de todas las filas se resuelven con una consulta por
+campo (`in_bulk`) en lugar de una por fila, y las filas a modificar se
+leen todas juntas.
+"""
+import functools
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.models import model_to_dict
+
+from core.referencias import ReferenciaChoiceField
+from core.transacciones import transaccion_reintentable
+
+MAX_FILAS_POR_LOTE = 1000
+
+
+class LoteInvalido(Exception):
+    def __init__(self, errores):
+        super().__init__('Hay filas con errores.')
+        self.errores = errores
+
+
+def _clave_precargada(campo, objetos, valor):
+    if valor in campo.empty_values:
+        return None
+    try:
+        objeto = objetos.get(campo.queryset.model._meta.pk.to_python(valor))
+    except ValidationError:
+        objeto = None
+    if objeto is None:
+        raise ValidationError(campo.error_messages['invalid_choice'], code='invalid_choice', params={'value': valor})
+    return objeto
+
+
+def _precargar_claves(formularios):
+    """Resuelve las claves foráneas de todas las filas con una consulta por campo."""
+    for nombre, campo in formularios[0].fields.items():
+        # Las tablas de referencia ya se resuelven en memoria
+        if not isinstance(campo, forms.ModelChoiceField) or isinstance(campo, ReferenciaChoiceField):
+            continue
+        pk = campo.queryset.model._meta.pk
+        if campo.to_field_name not in (None, pk.name) or isinstance(campo, forms.ModelMultipleChoiceField):
+            continue
+        claves = set()
+        for formulario in formularios:
+            try:
+                valor = formulario.data.get(nombre)
+                if valor not in campo.empty_values:
+                    claves.add(pk.to_python(valor))
+            except (ValidationError, TypeError):
+                pass
+        objetos = campo.queryset.in_bulk(claves) if claves else {}
+        for formulario in formularios:
+            propio = formulario.fields[nombre]
+            propio.to_python = functools.partial(_clave_precargada, propio, objetos)
+
+
+def _validar(formularios):
+    if formularios:
+        _precargar_claves(formularios)
+    errores = [
+        {'indice': indice, 'errores': formulario.errors.get_json_data()}
+        for indice, formulario in enumerate(formularios)
+        if not formulario.is_valid()
+    ]
+    if errores:
+        raise LoteInvalido(errores)
+
+
+@transaccion_reintentable
+def _guardar(recurso, formularios, nuevos):
+    objetos = [formulario.save() for formulario in formularios]
+    if nuevos:
+        recurso.al_crear(objetos)
+    return objetos
+
+
+def crear(recurso, filas):
+    """Crea una instancia por fila (dicts con los campos del formulario) o lanza LoteInvalido."""
+    formularios = [recurso.formulario(fila) for fila in filas]
+    _validar(formularios)
+    return _guardar(recurso, formularios, nuevos=True)
+
+
+def actualizar(recurso, filas):
+    """
+    Modifica las instancias indicadas por el `id` de cada fila. Los campos
+    que una fila no trae conservan su valor actual.
+    """
+    errores = []
+    ids = []
+    for indice, fila in enumerate(filas):
+        try:
+            ids.append(int(fila.get('id')))
+        except (TypeError, ValueError):
+            errores.append({'indice': indice, 'errores': {'id': [{'message': 'Falta el id.', 'code': 'required'}]}})
+    if errores:
+        raise LoteInvalido(errores)
+
+    existentes = recurso.modelo.objects.in_bulk(ids)
+    formularios = []
+    for indice, (pk, fila) in enumerate(zip(ids, filas)):
+        instancia = existentes.get(pk)
+        if instancia is None:
+            errores.append({'indice': indice, 'errores': {'id': [{'message': 'No existe.', 'code': 'no_existe'}]}})
+            continue
+        campos = recurso.formulario._meta.fields
+        datos = {**model_to_dict(instancia, fields=campos), **fila}
+        formularios.append(recurso.formulario(datos, instance=instancia))
+    if errores:
+        raise LoteInvalido(errores)
+    _validar(formularios)
+    return _guardar(recurso, formularios, nuevos=False)
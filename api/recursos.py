@@ -0,0 +1,269 @@
+"""
+Recursos de la API JSON (/api/v1/).
+
+Cada recurso declara sus campos públicos y cómo leerlos. Con `?campos=`
+el cliente elige qué campos quiere (sparse fieldsets) y la consulta se
+arma a partir de esa selección: solo las columnas pedidas (`only`), un
+`select_related` por cada relación simple pedida y un `prefetch_related`
+(con su propio `only`) por cada relación múltiple. Un campo que no se pide
+no cuesta ni una columna ni un JOIN.
+
+Las escrituras usan los mismos ModelForm que las vistas HTML, así que
+aplican las mismas validaciones.
+"""
+import base64
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from citas.estados import tipo_nota_sistema
+from citas.forms import CitaForm
+from citas.models import Cita, NotaCita
+from historiales.models import HistorialMedico
+from inventario.forms import MedicamentoForm
+from inventario.models import Inventario, Medicamento
+from pacientes.forms import PacienteForm
+from pacientes.models import Paciente, Telefono
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+
+class ErrorConsulta(ValueError):
+    """Parámetros de consulta inválidos (campos, filtros, cursor o límite)."""
+
+
+class Relacion:
+    """Objeto relacionado por una clave foránea (o uno a uno): se lee con select_related."""
+
+    def __init__(self, ruta, campos):
+        self.ruta = ruta
+        self.campos = campos
+
+    def planificar(self, plan):
+        plan['select_related'].add(self.ruta)
+        if plan['modelo']._meta.get_field(self.ruta).concrete:
+            # La clave foránea no puede quedar diferida si se sigue con select_related
+            plan['only'].add(self.ruta)
+        plan['only'].update(f'{self.ruta}__{campo}' for campo in self.campos)
+
+    def valor(self, objeto):
+        try:
+            relacionado = getattr(objeto, self.ruta)
+        except ObjectDoesNotExist:
+            return None
+        if relacionado is None:
+            return None
+        return {campo: getattr(relacionado, campo) for campo in self.campos}
+
+
+class Multiple:
+    """Objetos relacionados inversos: se leen con un prefetch_related por página."""
+
+    def __init__(self, ruta, modelo, campos, enlace):
+        self.ruta = ruta
+        self.modelo = modelo
+        self.campos = campos
+        # Clave foránea hacia el objeto principal, necesaria para repartir las filas
+        self.enlace = enlace
+
+    def planificar(self, plan):
+        consulta = self.modelo.objects.only(self.enlace, *self.campos).order_by('pk')
+        plan['prefetch_related'].append(Prefetch(self.ruta, queryset=consulta))
+
+    def valor(self, objeto):
+        return [
+            {campo: getattr(relacionado, campo) for campo in self.campos}
+            for relacionado in getattr(objeto, self.ruta).all()
+        ]
+
+
+class Columna:
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def planificar(self, plan):
+        plan['only'].add(self.ruta)
+
+    def valor(self, objeto):
+        return getattr(objeto, self.ruta)
+
+
+def _columnas(*nombres):
+    return {nombre: Columna(nombre) for nombre in nombres}
+
+
+def codificar_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ErrorConsulta('Cursor inválido.') from None
+
+
+class Recurso:
+    nombre = None
+    modelo = None
+    campos = {}
+    por_defecto = ()
+    # Parámetro de la URL -> búsqueda del ORM
+    filtros = {}
+    formulario = None
+
+    def __init__(self):
+        self.por_defecto = tuple(self.por_defecto or self.campos)
+
+    def seleccion(self, parametro):
+        """Campos pedidos con ?campos=a,b,c (en el orden de la declaración)."""
+        if not parametro:
+            return list(self.por_defecto)
+        pedidos = {campo.strip() for campo in parametro.split(',') if campo.strip()}
+        desconocidos = pedidos - set(self.campos)
+        if desconocidos:
+            raise ErrorConsulta(f"Campos desconocidos: {', '.join(sorted(desconocidos))}.")
+        # El id se devuelve siempre: es la clave para los cursores y las escrituras
+        return [nombre for nombre in self.campos if nombre in pedidos or nombre == 'id']
+
+    def consulta(self, seleccion):
+        plan = {'modelo': self.modelo, 'only': {'pk'}, 'select_related': set(), 'prefetch_related': []}
+        for nombre in seleccion:
+            self.campos[nombre].planificar(plan)
+        consulta = self.modelo.objects.only(*plan['only'])
+        if plan['select_related']:
+            consulta = consulta.select_related(*plan['select_related'])
+        if plan['prefetch_related']:
+            consulta = consulta.prefetch_related(*plan['prefetch_related'])
+        return consulta
+
+    def filtrar(self, consulta, parametros):
+        condiciones = {
+            busqueda: parametros[parametro]
+            for parametro, busqueda in self.filtros.items()
+            if parametros.get(parametro) not in (None, '')
+        }
+        try:
+            return consulta.filter(**condiciones) if condiciones else consulta
+        except (ValueError, TypeError, ValidationError):
+            raise ErrorConsulta('Filtro inválido.') from None
+
+    def serializar(self, objeto, seleccion):
+        return {nombre: self.campos[nombre].valor(objeto) for nombre in seleccion}
+
+    def pagina(self, parametros):
+        """Una página ordenada por id con paginación por cursor: (filas, cursor siguiente o None)."""
+        seleccion = self.seleccion(parametros.get('campos'))
+        try:
+            limite = int(parametros.get('limite') or LIMITE_POR_DEFECTO)
+        except ValueError:
+            raise ErrorConsulta('El límite debe ser un número entero.') from None
+        limite = max(1, min(limite, LIMITE_MAXIMO))
+
+        consulta = self.filtrar(self.consulta(seleccion), parametros).order_by('pk')
+        if parametros.get('cursor'):
+            consulta = consulta.filter(pk__gt=decodificar_cursor(parametros['cursor']))
+        # Una fila de más indica si hay otra página, sin contar el total
+        objetos = list(consulta[:limite + 1])
+        siguiente = codificar_cursor(objetos[limite - 1].pk) if len(objetos) > limite else None
+        return [self.serializar(objeto, seleccion) for objeto in objetos[:limite]], siguiente
+
+    def detalle(self, pk, parametros):
+        seleccion = self.seleccion(parametros.get('campos'))
+        objeto = self.consulta(seleccion).filter(pk=pk).first()
+        return None if objeto is None else self.serializar(objeto, seleccion)
+
+    def al_crear(self, objetos):
+        """Se llama dentro de la transacción con los objetos creados en una escritura en lote."""
+
+
+class Pacientes(Recurso):
+    nombre = 'pacientes'
+    modelo = Paciente
+    campos = {
+        **_columnas('id', 'numero_documento', 'nombre', 'apellido', 'fecha_nacimiento', 'genero', 'email',
+                    'created_at', 'updated_at'),
+        'direccion': Relacion('direccion', ('direccion', 'codigo_postal', 'ciudad_id')),
+        'telefonos': Multiple('telefonos', Telefono, ('id', 'numero', 'tipo_telefono_id', 'es_principal'),
+                              enlace='paciente'),
+    }
+    por_defecto = ('id', 'numero_documento', 'nombre', 'apellido', 'fecha_nacimiento', 'genero', 'email')
+    filtros = {'numero_documento': 'numero_documento', 'actualizado_desde': 'updated_at__gte'}
+    formulario = PacienteForm
+
+
+class Citas(Recurso):
+    nombre = 'citas'
+    modelo = Cita
+    campos = {
+        **_columnas('id', 'paciente_id', 'serie_id', 'fecha', 'hora_inicio', 'hora_fin', 'observaciones',
+                    'created_at', 'updated_at'),
+        'paciente': Relacion('paciente', ('id', 'numero_documento', 'nombre', 'apellido')),
+        'tipo_cita': Relacion('tipo_cita', ('id', 'nombre')),
+        'motivo': Relacion('motivo', ('id', 'nombre')),
+        'estado': Relacion('estado', ('id', 'nombre', 'color')),
+        'notas': Multiple('notas', NotaCita, ('id', 'tipo_nota_id', 'contenido', 'created_at'), enlace='cita'),
+    }
+    por_defecto = ('id', 'paciente_id', 'fecha', 'hora_inicio', 'hora_fin', 'tipo_cita', 'motivo', 'estado')
+    filtros = {
+        'paciente_id': 'paciente_id',
+        'estado_id': 'estado_id',
+        'fecha_desde': 'fecha__gte',
+        'fecha_hasta': 'fecha__lte',
+        'actualizado_desde': 'updated_at__gte',
+    }
+    formulario = CitaForm
+
+    def al_crear(self, objetos):
+        # Igual que al crear una cita desde el formulario, pero con un solo INSERT
+        tipo_nota = tipo_nota_sistema()
+        ahora = timezone.now().strftime('%Y-%m-%d %H:%M')
+        NotaCita.objects.bulk_create([
+            NotaCita(cita=cita, tipo_nota=tipo_nota, contenido=f"Cita creada el {ahora} (API)")
+            for cita in objetos
+        ])
+
+
+class Historiales(Recurso):
+    nombre = 'historiales'
+    modelo = HistorialMedico
+    campos = {
+        **_columnas('id', 'paciente_id', 'medico_id', 'fecha'),
+        'paciente': Relacion('paciente', ('id', 'numero_documento', 'nombre', 'apellido')),
+        'medico': Relacion('medico', ('id', 'username', 'first_name', 'last_name')),
+    }
+    por_defecto = ('id', 'paciente_id', 'medico_id', 'fecha')
+    filtros = {'paciente_id': 'paciente_id', 'medico_id': 'medico_id', 'fecha_desde': 'fecha__gte'}
+
+
+class Medicamentos(Recurso):
+    nombre = 'medicamentos'
+    modelo = Medicamento
+    campos = {
+        **_columnas('id', 'codigo', 'nombre', 'descripcion', 'categoria_id', 'proveedor_id', 'stock_minimo',
+                    'created_at', 'updated_at'),
+        'categoria': Relacion('categoria', ('id', 'nombre')),
+        'proveedor': Relacion('proveedor', ('id', 'nombre')),
+    }
+    por_defecto = ('id', 'codigo', 'nombre', 'categoria_id', 'proveedor_id', 'stock_minimo')
+    filtros = {'categoria_id': 'categoria_id', 'proveedor_id': 'proveedor_id', 'codigo': 'codigo'}
+    formulario = MedicamentoForm
+
+
+class Existencias(Recurso):
+    nombre = 'existencias'
+    modelo = Inventario
+    campos = {
+        **_columnas('id', 'medicamento_id', 'cantidad', 'fecha_caducidad', 'lote', 'created_at', 'updated_at'),
+        'medicamento': Relacion('medicamento', ('id', 'codigo', 'nombre')),
+    }
+    por_defecto = ('id', 'medicamento_id', 'cantidad', 'fecha_caducidad', 'lote')
+    filtros = {'medicamento_id': 'medicamento_id', 'caduca_hasta': 'fecha_caducidad__lte'}
+
+
+RECURSOS = {recurso.nombre: recurso for recurso in (
+    Pacientes(), Citas(), Historiales(), Medicamentos(), Existencias(),
+)}
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/<str:recurso>/', views.coleccion, name='coleccion'),
+    path('v1/<str:recurso>/<int:pk>/', views.detalle, name='detalle'),
+]
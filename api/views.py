@@ -0,0 +1,140 @@
+"""
+Vistas de la API JSON v1.
+
+    GET   /api/v1/<recurso>/         lista paginada por cursor (?campos=, ?limite=, ?cursor=, filtros)
+    GET   /api/v1/<recurso>/<id>/    un objeto (?campos=)
+    POST  /api/v1/<recurso>/         alta en lote: un arreglo de objetos (o un objeto)
+    PATCH /api/v1/<recurso>/         modificación en lote: un arreglo de objetos con su `id`
+
+Autenticación por sesión (con token CSRF en las escrituras, como el resto
+del sitio) o HTTP Basic para integraciones, con los mismos roles que las
+vistas de personal médico.
+"""
+import base64
+import binascii
+import functools
+import json
+
+from django.contrib.auth import authenticate
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+
+from . import escrituras
+from .recursos import RECURSOS, ErrorConsulta
+
+ROLES_API = ('admin', 'medico', 'recepcionista')
+
+
+def _error(mensaje, status, **extra):
+    return JsonResponse({'error': mensaje, **extra}, status=status)
+
+
+def _usuario_basic(request):
+    tipo, _, credenciales = request.headers.get('Authorization', '').partition(' ')
+    if tipo.lower() != 'basic' or not credenciales:
+        return None
+    try:
+        usuario, _, clave = base64.b64decode(credenciales).decode().partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=usuario, password=clave)
+
+
+def api_view(vista):
+    """Autentica la petición y responde los errores de autenticación y permisos en JSON."""
+    @csrf_exempt
+    @functools.wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            # Con la cookie de sesión se exige el token CSRF, como en los formularios
+            rechazo = CsrfViewMiddleware(lambda r: None).process_view(request, None, (), {})
+            if rechazo is not None:
+                return _error('Falta el token CSRF.', 403)
+        else:
+            usuario = _usuario_basic(request)
+            if usuario is None:
+                respuesta = _error('Autenticación requerida.', 401)
+                respuesta['WWW-Authenticate'] = 'Basic realm="api"'
+                return respuesta
+            request.user = usuario
+
+        perfil = getattr(request.user, 'perfilusuario', None)
+        if not request.user.is_superuser and (perfil is None or perfil.rol not in ROLES_API):
+            return _error('No tiene permisos para usar la API.', 403)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _recurso(nombre):
+    return RECURSOS.get(nombre)
+
+
+def _filas(request):
+    try:
+        datos = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise ErrorConsulta('El cuerpo debe ser JSON.') from None
+    filas = datos if isinstance(datos, list) else [datos]
+    if not filas or not all(isinstance(fila, dict) for fila in filas):
+        raise ErrorConsulta('Se espera un objeto o un arreglo de objetos.')
+    if len(filas) > escrituras.MAX_FILAS_POR_LOTE:
+        raise ErrorConsulta(f'Se aceptan a lo sumo {escrituras.MAX_FILAS_POR_LOTE} filas por solicitud.')
+    return filas
+
+
+@api_view
+def coleccion(request, recurso):
+    recurso = _recurso(recurso)
+    if recurso is None:
+        return _error('Recurso no encontrado.', 404)
+    metodos = ['GET', 'POST', 'PATCH'] if recurso.formulario else ['GET']
+    if request.method not in metodos:
+        respuesta = _error('Método no permitido.', 405)
+        respuesta['Allow'] = ', '.join(metodos)
+        return respuesta
+
+    try:
+        if request.method == 'GET':
+            filas, siguiente = recurso.pagina(request.GET)
+            return JsonResponse({'resultados': filas, 'siguiente': siguiente})
+
+        filas = _filas(request)
+        if request.method == 'POST':
+            objetos, status = escrituras.crear(recurso, filas), 201
+        else:
+            objetos, status = escrituras.actualizar(recurso, filas), 200
+    except ErrorConsulta as e:
+        return _error(str(e), 400)
+    except escrituras.LoteInvalido as e:
+        return _error(str(e), 400, filas=e.errores)
+    except IntegrityError:
+        # Por ejemplo, dos filas del mismo lote con la misma cédula
+        return _error('Las filas chocan entre sí o con datos existentes; no se guardó ninguna.', 409)
+
+    seleccion = list(recurso.por_defecto)
+    # Se relee con el plan de consulta del recurso en lugar de una consulta por relación
+    guardados = {objeto.pk: objeto for objeto in recurso.consulta(seleccion).filter(pk__in=[o.pk for o in objetos])}
+    return JsonResponse(
+        {'resultados': [recurso.serializar(guardados[objeto.pk], seleccion) for objeto in objetos]},
+        status=status,
+    )
+
+
+@api_view
+def detalle(request, recurso, pk):
+    recurso = _recurso(recurso)
+    if recurso is None:
+        return _error('Recurso no encontrado.', 404)
+    if request.method != 'GET':
+        respuesta = _error('Método no permitido.', 405)
+        respuesta['Allow'] = 'GET'
+        return respuesta
+    try:
+        fila = recurso.detalle(pk, request.GET)
+    except ErrorConsulta as e:
+        return _error(str(e), 400)
+    if fila is None:
+        return _error('No encontrado.', 404)
+    return JsonResponse(fila)
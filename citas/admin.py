@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EstadoCita, TipoCita, MotivoCita, Cita, TipoNota, NotaCita
+from .models import EstadoCita, TipoCita, MotivoCita, Cita, TipoNota, NotaCita, SerieCitas
 
 @admin.register(EstadoCita)
 class EstadoCitaAdmin(admin.ModelAdmin):
@@ -23,6 +23,13 @@ class CitaAdmin(admin.ModelAdmin):
     search_fields = ('paciente__nombre', 'paciente__apellido', 'motivo__nombre')
     readonly_fields = ('created_at', 'updated_at')
 
+@admin.register(SerieCitas)
+class SerieCitasAdmin(admin.ModelAdmin):
+    list_display = ('paciente', 'tipo_cita', 'fecha_inicio', 'hora_inicio', 'intervalo_dias', 'ocurrencias')
+    list_filter = ('frecuencia', 'tipo_cita')
+    search_fields = ('paciente__nombre', 'paciente__apellido')
+    readonly_fields = ('created_at', 'updated_at')
+
 @admin.register(TipoNota)
 class TipoNotaAdmin(admin.ModelAdmin):
     list_display = ('nombre',)
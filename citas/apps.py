@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CitasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'citas'
+
+    def ready(self):
+        from core import referencias
+        from .models import EstadoCita, TipoCita, MotivoCita, TipoNota
+        for modelo in (EstadoCita, TipoCita, MotivoCita, TipoNota):
+            referencias.registrar(modelo)
+        import citas.signals
@@ -0,0 +1,150 @@
+"""
+Citas de un rango de fechas para la vista de calendario, en JSON o como
+feed iCalendar (.ics).
+
+Las citas del rango se leen con una sola consulta con `select_related`,
+filtrando por (fecha, hora_inicio), que es el índice de la tabla. Antes de
+eso se calcula la ETag del rango con una consulta agregada (cantidad de
+citas y última modificación de las citas y de sus pacientes) más el sello
+de las tablas de referencia; si el cliente ya tiene esa versión se
+responde 304 sin leer ni serializar las citas.
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from core import referencias
+from .models import Cita, EstadoCita, MotivoCita, TipoCita
+
+MAX_DIAS_RANGO = 93
+ESTADO_CANCELADA = 'Cancelada'
+
+
+class RangoInvalido(ValueError):
+    pass
+
+
+def _fecha(valor, nombre):
+    try:
+        return datetime.date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise RangoInvalido(f"El parámetro '{nombre}' debe ser una fecha AAAA-MM-DD.") from None
+
+
+def rango(parametros):
+    """
+    (desde, hasta) inclusivos a partir de los parámetros `desde` y `hasta`;
+    sin parámetros, el mes en curso.
+    """
+    if not parametros.get('desde') and not parametros.get('hasta'):
+        hoy = timezone.localdate()
+        desde = hoy.replace(day=1)
+        hasta = (desde + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+        return desde, hasta
+    desde = _fecha(parametros.get('desde'), 'desde')
+    hasta = _fecha(parametros.get('hasta'), 'hasta')
+    if hasta < desde:
+        raise RangoInvalido("'hasta' no puede ser anterior a 'desde'.")
+    if (hasta - desde).days >= MAX_DIAS_RANGO:
+        raise RangoInvalido(f'El rango no puede superar los {MAX_DIAS_RANGO} días.')
+    return desde, hasta
+
+
+def citas_del_rango(desde, hasta):
+    return Cita.objects.filter(fecha__range=(desde, hasta))
+
+
+def etag(desde, hasta, formato):
+    resumen = citas_del_rango(desde, hasta).aggregate(
+        cantidad=Count('pk'),
+        ultima_cita=Max('updated_at'),
+        ultimo_paciente=Max('paciente__updated_at'),
+    )
+    partes = [
+        formato, desde, hasta, resumen['cantidad'], resumen['ultima_cita'], resumen['ultimo_paciente'],
+        *(referencias.version(modelo) for modelo in (EstadoCita, TipoCita, MotivoCita)),
+    ]
+    return hashlib.md5('|'.join(map(str, partes)).encode()).hexdigest()
+
+
+def eventos(desde, hasta):
+    """Citas del rango listas para el calendario (formato de eventos de FullCalendar)."""
+    citas = citas_del_rango(desde, hasta).select_related(
+        'paciente', 'tipo_cita', 'motivo', 'estado'
+    ).order_by('fecha', 'hora_inicio')
+    return [
+        {
+            'id': cita.pk,
+            'title': f'{cita.paciente} - {cita.tipo_cita.nombre}',
+            'start': datetime.datetime.combine(cita.fecha, cita.hora_inicio).isoformat(),
+            'end': datetime.datetime.combine(cita.fecha, cita.hora_fin).isoformat(),
+            'color': cita.estado.color,
+            'url': reverse('citas:show', args=[cita.pk]),
+            'paciente': str(cita.paciente),
+            'tipo': cita.tipo_cita.nombre,
+            'motivo': cita.motivo.nombre,
+            'estado': cita.estado.nombre,
+        }
+        for cita in citas
+    ]
+
+
+def _texto_ics(valor):
+    return (
+        str(valor).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _plegar(linea):
+    """Corta la línea en tramos de 75 octetos como pide RFC 5545."""
+    datos = linea.encode()
+    if len(datos) <= 75:
+        return linea
+    tramos, inicio, limite = [], 0, 75
+    while inicio < len(datos):
+        fin = min(inicio + limite, len(datos))
+        # No cortar en medio de un carácter UTF-8
+        while fin < len(datos) and (datos[fin] & 0xC0) == 0x80:
+            fin -= 1
+        tramos.append(datos[inicio:fin].decode())
+        inicio, limite = fin, 74
+    return '\r\n '.join(tramos)
+
+
+def _utc(fecha, hora):
+    local = timezone.make_aware(datetime.datetime.combine(fecha, hora))
+    return local.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ics(desde, hasta, dominio):
+    citas = citas_del_rango(desde, hasta).select_related(
+        'paciente', 'tipo_cita', 'motivo', 'estado'
+    ).order_by('fecha', 'hora_inicio')
+    lineas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Servicio Medico UNEARTE//Citas//ES',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ]
+    for cita in citas:
+        modificada = cita.updated_at.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        lineas += [
+            'BEGIN:VEVENT',
+            f'UID:cita-{cita.pk}@{dominio}',
+            f'DTSTAMP:{modificada}',
+            f'LAST-MODIFIED:{modificada}',
+            f'DTSTART:{_utc(cita.fecha, cita.hora_inicio)}',
+            f'DTEND:{_utc(cita.fecha, cita.hora_fin)}',
+            f'SUMMARY:{_texto_ics(f"{cita.paciente} - {cita.tipo_cita.nombre}")}',
+            f'DESCRIPTION:{_texto_ics(f"Motivo: {cita.motivo.nombre}. Estado: {cita.estado.nombre}.")}',
+            f'STATUS:{"CANCELLED" if cita.estado.nombre == ESTADO_CANCELADA else "CONFIRMED"}',
+            'END:VEVENT',
+        ]
+    lineas.append('END:VCALENDAR')
+    return '\r\n'.join(_plegar(linea) for linea in lineas) + '\r\n'
@@ -0,0 +1,61 @@
+"""
+Cambios de las citas de hoy en vivo, para la página de citas de hoy.
+
+Las señales de `Cita` (y los cambios masivos, que usan UPDATE y no
+disparan señales) publican un evento por cita de hoy en el canal
+`citas_hoy` al confirmarse la transacción. La vista `citas_hoy_eventos`
+los envía como server-sent events y la página aplica cada cambio sobre
+su fila, sin recargar la lista completa.
+
+Eventos (`event: cita`), con `accion`:
+    'estado'     cambió el estado: {id, accion, estado_id, estado, color}
+    'creada'     hay una cita nueva para hoy: {id, accion}
+    'modificada' cambió otro dato de la cita: {id, accion, estado_id, estado, color}
+    'eliminada'  {id, accion}
+"""
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from core import referencias
+from core.difusion import Canal
+from .models import EstadoCita
+
+canal = Canal('citas_hoy')
+
+ESTADO = 'estado'
+CREADA = 'creada'
+MODIFICADA = 'modificada'
+ELIMINADA = 'eliminada'
+
+
+def _datos(cita_id, accion, estado_id=None):
+    datos = {'id': cita_id, 'accion': accion}
+    if estado_id is not None:
+        estado = referencias.obtener(EstadoCita, estado_id)
+        datos.update(
+            estado_id=estado_id,
+            estado=estado.nombre if estado else '',
+            color=estado.color if estado else '',
+        )
+    return datos
+
+
+def publicar(citas, accion):
+    """
+    Publica al confirmar la transacción un evento por cada cita de hoy.
+    `citas` son tuplas (id, fecha, estado_id).
+    """
+    hoy = timezone.localdate()
+    eventos = [_datos(cita_id, accion, estado_id) for cita_id, fecha, estado_id in citas if fecha == hoy]
+    if eventos:
+        transaction.on_commit(lambda: [canal.publicar('cita', datos) for datos in eventos])
+
+
+def mensaje_sse(evento):
+    """Texto de un evento para el flujo; None es solo un comentario para mantener la conexión."""
+    if evento is None:
+        return ': ping\n\n'
+    evento_id, tipo, datos = evento
+    return f'id: {evento_id}\nevent: {tipo}\ndata: {json.dumps(datos)}\n\n'
@@ -0,0 +1,90 @@
+"""
+Cambio de estado de muchas citas a la vez (cierre del día en recepción).
+
+En lugar de una lectura, un `save()` y una nota por cita, se lee el estado
+actual de todas con una consulta, se cambian con un solo UPDATE y las notas
+y los eventos de auditoría se insertan con un solo `bulk_create`, en una
+transacción.
+"""
+from django.utils import timezone
+
+from core import auditoria, referencias
+from core.transacciones import transaccion_reintentable
+from . import en_vivo
+from .models import Cita, NotaCita, TipoNota
+
+MAX_CITAS_POR_LOTE = 500
+
+ACTUALIZADA = 'actualizada'
+SIN_CAMBIOS = 'sin_cambios'
+OMITIDA = 'omitida'
+NO_EXISTE = 'no_existe'
+INVALIDA = 'invalida'
+
+
+def tipo_nota_sistema():
+    return referencias.obtener_o_crear(
+        TipoNota, 'Sistema', defaults={'descripcion': 'Notas generadas automáticamente por el sistema'}
+    )
+
+
+def _normalizar(ids):
+    validos, invalidos = [], []
+    for valor in ids:
+        try:
+            validos.append(int(valor))
+        except (TypeError, ValueError):
+            invalidos.append(valor)
+    return list(dict.fromkeys(validos)), invalidos
+
+
+@transaccion_reintentable
+def cambiar_estados(ids, estado, usuario=None, detalle=None, desde=None):
+    """
+    Lleva las citas `ids` al `estado` indicado y devuelve el resultado de
+    cada ID: [{'id', 'resultado', 'estado_anterior'}], con resultado
+    'actualizada', 'sin_cambios', 'no_existe' o 'invalida'. Con `desde`,
+    solo cambian las citas que siguen en ese estado; las demás quedan
+    'omitida'.
+    """
+    validos, invalidos = _normalizar(ids)
+    anteriores, fechas, actuales, omitidas = {}, {}, set(), set()
+    filas = Cita.objects.filter(pk__in=validos).values_list('pk', 'estado_id', 'estado__nombre', 'fecha')
+    for pk, estado_id, nombre, fecha in filas:
+        anteriores[pk] = nombre
+        fechas[pk] = fecha
+        if estado_id == estado.pk:
+            actuales.add(pk)
+        elif desde is not None and estado_id != desde.pk:
+            omitidas.add(pk)
+    cambiar = [pk for pk in validos if pk in anteriores and pk not in actuales and pk not in omitidas]
+
+    if cambiar:
+        Cita.objects.filter(pk__in=cambiar).update(estado=estado, updated_at=timezone.now())
+        tipo_nota = tipo_nota_sistema()
+        autor = f" por {usuario.username}" if usuario is not None else ''
+        sufijo = f" ({detalle})" if detalle else ''
+        NotaCita.objects.bulk_create([
+            NotaCita(
+                cita_id=pk,
+                tipo_nota=tipo_nota,
+                contenido=f"Estado cambiado de '{anteriores[pk]}' a '{estado.nombre}'{autor}{sufijo}.",
+            )
+            for pk in cambiar
+        ])
+        en_vivo.publicar([(pk, fechas[pk], estado.pk) for pk in cambiar], en_vivo.ESTADO)
+        auditoria.registrar(Cita, cambiar, auditoria.MODIFICADO, {'estado_id': estado.pk}, usuario=usuario)
+
+    resultados = []
+    for pk in validos:
+        if pk not in anteriores:
+            resultado = NO_EXISTE
+        elif pk in actuales:
+            resultado = SIN_CAMBIOS
+        elif pk in omitidas:
+            resultado = OMITIDA
+        else:
+            resultado = ACTUALIZADA
+        resultados.append({'id': pk, 'resultado': resultado, 'estado_anterior': anteriores.get(pk)})
+    resultados.extend({'id': valor, 'resultado': INVALIDA, 'estado_anterior': None} for valor in invalidos)
+    return resultados
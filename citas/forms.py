@@ -1,7 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from .models import Cita, EstadoCita, TipoCita, MotivoCita
+from core.referencias import ReferenciaChoiceField
+from core import referencias
+from .models import Cita, EstadoCita, TipoCita, MotivoCita, SerieCitas
+from .series import MAX_OCURRENCIAS
 from pacientes.models import Paciente
 
 class CitaForm(forms.ModelForm):
@@ -17,6 +20,11 @@ class CitaForm(forms.ModelForm):
             'estado',
             'observaciones',
         ]
+        field_classes = {
+            'tipo_cita': ReferenciaChoiceField,
+            'motivo': ReferenciaChoiceField,
+            'estado': ReferenciaChoiceField,
+        }
         widgets = {
             'paciente': forms.Select(attrs={'class': 'form-control'}),
             'tipo_cita': forms.Select(attrs={'class': 'form-control'}),
@@ -41,9 +49,6 @@ class CitaForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['paciente'].queryset = Paciente.objects.all()
-        self.fields['tipo_cita'].queryset = TipoCita.objects.all()
-        self.fields['motivo'].queryset = MotivoCita.objects.all()
-        self.fields['estado'].queryset = EstadoCita.objects.all()
         
         # Establecer valores mínimos para fecha y hora SOLO para nuevas citas
         if not self.instance.pk:
@@ -92,6 +97,129 @@ class CitaForm(forms.ModelForm):
             raise ValidationError('No se pueden programar citas en fechas pasadas.')
         return fecha
 
+class SerieCitasForm(forms.ModelForm):
+    estado = ReferenciaChoiceField(
+        queryset=EstadoCita.objects.all(),
+        label='Estado',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+    class Meta:
+        model = SerieCitas
+        fields = [
+            'paciente',
+            'tipo_cita',
+            'motivo',
+            'fecha_inicio',
+            'hora_inicio',
+            'hora_fin',
+            'frecuencia',
+            'intervalo_dias',
+            'ocurrencias',
+            'observaciones',
+        ]
+        field_classes = {
+            'tipo_cita': ReferenciaChoiceField,
+            'motivo': ReferenciaChoiceField,
+        }
+        widgets = {
+            'paciente': forms.Select(attrs={'class': 'form-control'}),
+            'tipo_cita': forms.Select(attrs={'class': 'form-control'}),
+            'motivo': forms.Select(attrs={'class': 'form-control'}),
+            'fecha_inicio': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'hora_inicio': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'hora_fin': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'frecuencia': forms.Select(attrs={'class': 'form-control'}),
+            'intervalo_dias': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'ocurrencias': forms.NumberInput(attrs={'class': 'form-control', 'min': 2, 'max': MAX_OCURRENCIAS}),
+            'observaciones': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Observaciones para todas las citas de la serie'}),
+        }
+        labels = {
+            'paciente': 'Paciente',
+            'tipo_cita': 'Tipo de Cita',
+            'motivo': 'Motivo',
+            'fecha_inicio': 'Primera Cita',
+            'hora_inicio': 'Hora de Inicio',
+            'hora_fin': 'Hora de Fin',
+            'frecuencia': 'Frecuencia',
+            'intervalo_dias': 'Cada cuántos días',
+            'ocurrencias': 'Cantidad de Citas',
+            'observaciones': 'Observaciones',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['paciente'].queryset = Paciente.objects.all()
+        self.fields['fecha_inicio'].widget.attrs['min'] = timezone.now().date()
+        self.fields['intervalo_dias'].required = False
+        self.fields['estado'].initial = referencias.id_de(EstadoCita, 'Programada')
+        self.fields['tipo_cita'].initial = referencias.id_de(TipoCita, 'Control')
+
+    def clean_fecha_inicio(self):
+        fecha = self.cleaned_data.get('fecha_inicio')
+        if fecha and fecha < timezone.now().date():
+            raise ValidationError('No se pueden programar citas en fechas pasadas.')
+        return fecha
+
+    def clean_ocurrencias(self):
+        ocurrencias = self.cleaned_data.get('ocurrencias')
+        if ocurrencias is not None and not 2 <= ocurrencias <= MAX_OCURRENCIAS:
+            raise ValidationError(f'Una serie debe tener entre 2 y {MAX_OCURRENCIAS} citas.')
+        return ocurrencias
+
+    def clean(self):
+        cleaned_data = super().clean()
+        hora_inicio = cleaned_data.get('hora_inicio')
+        hora_fin = cleaned_data.get('hora_fin')
+
+        if hora_inicio and hora_fin and hora_fin <= hora_inicio:
+            raise ValidationError('La hora de fin debe ser posterior a la hora de inicio.')
+
+        if cleaned_data.get('frecuencia') == 'semanal':
+            cleaned_data['intervalo_dias'] = 7
+        elif not cleaned_data.get('intervalo_dias'):
+            self.add_error('intervalo_dias', 'Indique cada cuántos días se repite la cita.')
+
+        # El solapamiento con otras citas lo verifica series.crear_serie
+        # dentro de la transacción que las inserta
+        return cleaned_data
+
+class EditarSerieForm(forms.ModelForm):
+    """Cambios que se aplican a todas las citas pendientes de una serie."""
+
+    class Meta:
+        model = SerieCitas
+        fields = ['tipo_cita', 'motivo', 'hora_inicio', 'hora_fin', 'observaciones']
+        field_classes = {
+            'tipo_cita': ReferenciaChoiceField,
+            'motivo': ReferenciaChoiceField,
+        }
+        widgets = {
+            'tipo_cita': forms.Select(attrs={'class': 'form-control'}),
+            'motivo': forms.Select(attrs={'class': 'form-control'}),
+            'hora_inicio': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'hora_fin': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'observaciones': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+        }
+        labels = {
+            'tipo_cita': 'Tipo de Cita',
+            'motivo': 'Motivo',
+            'hora_inicio': 'Hora de Inicio',
+            'hora_fin': 'Hora de Fin',
+            'observaciones': 'Observaciones',
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        hora_inicio = cleaned_data.get('hora_inicio')
+        hora_fin = cleaned_data.get('hora_fin')
+
+        if hora_inicio and hora_fin and hora_fin <= hora_inicio:
+            raise ValidationError('La hora de fin debe ser posterior a la hora de inicio.')
+
+        # El solapamiento lo verifica series.modificar_serie al aplicar los cambios
+        return cleaned_data
+
 class EstadoCitaForm(forms.ModelForm):
     class Meta:
         model = EstadoCita
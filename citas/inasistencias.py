@@ -0,0 +1,108 @@
+"""
+Barrido de citas vencidas: las citas que siguen en 'Programada' cuando ya
+pasó su hora (más un margen) se marcan como 'No asistió', con su nota de
+sistema, para que no inflen los contadores de citas pendientes.
+
+Las citas se recorren en el orden del índice (fecha, hora_inicio), por
+lotes y con paginación por clave (la última fecha, hora e id vistos) en
+lugar de OFFSET. Cada lote se confirma en su propia transacción, de modo
+que el barrido se puede interrumpir y volver a lanzar: lo ya marcado dejó
+de estar en 'Programada' y no se vuelve a tocar, y lo que quedó pendiente
+se retoma en la siguiente ejecución.
+"""
+import datetime
+import time
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils import timezone
+
+from core import referencias
+from . import estados
+from .models import Cita, EstadoCita
+
+ESTADO_PROGRAMADA = 'Programada'
+ESTADO_INASISTENCIA = 'No asistió'
+TAMANIO_LOTE = 500
+MARGEN_MINUTOS = 120
+
+
+@dataclass
+class ResultadoBarrido:
+    revisadas: int = 0
+    marcadas: int = 0
+    lotes: int = 0
+    segundos: float = 0.0
+
+    @property
+    def por_segundo(self):
+        return self.marcadas / self.segundos if self.segundos else 0.0
+
+
+def limite_vencidas(margen_minutos=MARGEN_MINUTOS, ahora=None):
+    """Fecha y hora locales antes de las cuales una cita programada se considera vencida."""
+    limite = timezone.localtime(ahora) - datetime.timedelta(minutes=margen_minutos)
+    return limite.date(), limite.time().replace(microsecond=0)
+
+
+def vencidas(programada, fecha_limite, hora_limite):
+    return Cita.objects.filter(estado=programada).filter(
+        Q(fecha__lt=fecha_limite) | Q(fecha=fecha_limite, hora_inicio__lte=hora_limite)
+    )
+
+
+def _despues_de(cursor):
+    fecha, hora, pk = cursor
+    return (
+        Q(fecha__gt=fecha)
+        | Q(fecha=fecha, hora_inicio__gt=hora)
+        | Q(fecha=fecha, hora_inicio=hora, pk__gt=pk)
+    )
+
+
+def estado_inasistencia():
+    return referencias.obtener_o_crear(
+        EstadoCita, ESTADO_INASISTENCIA,
+        defaults={'descripcion': 'El paciente no asistió a la cita', 'color': '#ffc107'}
+    )
+
+
+def barrer(margen_minutos=MARGEN_MINUTOS, lote=TAMANIO_LOTE, simular=False, limite=None, al_terminar_lote=None):
+    """
+    Marca como inasistencia las citas programadas vencidas y devuelve un
+    ResultadoBarrido. Con `simular=True` solo cuenta las citas que se
+    marcarían. `limite` acota la cantidad de citas revisadas en esta
+    ejecución; `al_terminar_lote(resultado)` se llama después de cada lote.
+    """
+    resultado = ResultadoBarrido()
+    programada = referencias.por_nombre(EstadoCita, ESTADO_PROGRAMADA)
+    if programada is None:
+        return resultado
+    destino = None if simular else estado_inasistencia()
+    fecha_limite, hora_limite = limite_vencidas(margen_minutos)
+    pendientes = vencidas(programada, fecha_limite, hora_limite).order_by('fecha', 'hora_inicio', 'pk')
+
+    inicio = time.monotonic()
+    cursor = None
+    while limite is None or resultado.revisadas < limite:
+        tamanio = lote if limite is None else min(lote, limite - resultado.revisadas)
+        consulta = pendientes if cursor is None else pendientes.filter(_despues_de(cursor))
+        filas = list(consulta.values_list('fecha', 'hora_inicio', 'pk')[:tamanio])
+        if not filas:
+            break
+        cursor = filas[-1]
+        resultado.revisadas += len(filas)
+        resultado.lotes += 1
+        if simular:
+            resultado.marcadas += len(filas)
+        else:
+            cambios = estados.cambiar_estados(
+                [pk for _, _, pk in filas], destino,
+                detalle='marcada automáticamente por cita vencida', desde=programada,
+            )
+            resultado.marcadas += sum(1 for c in cambios if c['resultado'] == estados.ACTUALIZADA)
+        resultado.segundos = time.monotonic() - inicio
+        if al_terminar_lote:
+            al_terminar_lote(resultado)
+    resultado.segundos = time.monotonic() - inicio
+    return resultado
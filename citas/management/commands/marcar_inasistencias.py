@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from citas.inasistencias import MARGEN_MINUTOS, TAMANIO_LOTE, barrer, limite_vencidas
+
+class Command(BaseCommand):
+    help = ("Marca como 'No asistió' las citas que siguen programadas después de su hora "
+            '(programar diariamente o cada hora; se puede interrumpir y volver a lanzar)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--margen', type=int, default=MARGEN_MINUTOS,
+                            help='Minutos después de la hora de inicio para considerar vencida una cita')
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE, help='Citas por transacción')
+        parser.add_argument('--limite', type=int, help='Máximo de citas a revisar en esta ejecución')
+        parser.add_argument('--simular', action='store_true', help='Solo cuenta las citas vencidas, sin modificarlas')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['margen'] < 0:
+            raise CommandError('--lote debe ser mayor que cero y --margen no puede ser negativo')
+
+        fecha, hora = limite_vencidas(options['margen'])
+        self.stdout.write(f'Citas programadas hasta el {fecha:%d/%m/%Y} a las {hora:%H:%M}')
+
+        def progreso(resultado):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'  lote {resultado.lotes}: {resultado.marcadas} marcadas ({resultado.por_segundo:.0f} citas/s)'
+                )
+
+        resultado = barrer(
+            margen_minutos=options['margen'], lote=options['lote'], simular=options['simular'],
+            limite=options['limite'], al_terminar_lote=progreso,
+        )
+        accion = 'se marcarían' if options['simular'] else 'marcadas como inasistencia'
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.marcadas} de {resultado.revisadas} citas vencidas {accion} en {resultado.lotes} lotes, '
+            f'{resultado.segundos:.1f}s ({resultado.por_segundo:.0f} citas/s)'
+        ))
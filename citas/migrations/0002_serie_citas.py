@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citas', '0001_initial'),
+        ('pacientes', '0008_posibleduplicado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieCitas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_inicio', models.DateField()),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('frecuencia', models.CharField(choices=[('semanal', 'Semanal'), ('dias', 'Cada N días')], default='semanal', max_length=10)),
+                ('intervalo_dias', models.PositiveSmallIntegerField(default=7, help_text='Días entre una cita y la siguiente')),
+                ('ocurrencias', models.PositiveSmallIntegerField(help_text='Cantidad de citas de la serie')),
+                ('observaciones', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('motivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='citas.motivocita')),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_citas', to='pacientes.paciente')),
+                ('tipo_cita', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='citas.tipocita')),
+            ],
+            options={
+                'verbose_name': 'Serie de Citas',
+                'verbose_name_plural': 'Series de Citas',
+                'db_table': 'series_cita',
+            },
+        ),
+        migrations.AddField(
+            model_name='cita',
+            name='serie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='citas', to='citas.seriecitas'),
+        ),
+    ]
@@ -45,8 +45,37 @@ class MotivoCita(models.Model):
         verbose_name = 'Motivo de Cita'
         verbose_name_plural = 'Motivos de Cita'
 
+class SerieCitas(models.Model):
+    """Citas recurrentes de un paciente: cada `intervalo_dias` días, `ocurrencias` veces."""
+    FRECUENCIA_OPCIONES = [
+        ('semanal', 'Semanal'),
+        ('dias', 'Cada N días'),
+    ]
+
+    paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='series_citas')
+    tipo_cita = models.ForeignKey(TipoCita, on_delete=models.CASCADE)
+    motivo = models.ForeignKey(MotivoCita, on_delete=models.CASCADE)
+    fecha_inicio = models.DateField()
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    frecuencia = models.CharField(max_length=10, choices=FRECUENCIA_OPCIONES, default='semanal')
+    intervalo_dias = models.PositiveSmallIntegerField(default=7, help_text="Días entre una cita y la siguiente")
+    ocurrencias = models.PositiveSmallIntegerField(help_text="Cantidad de citas de la serie")
+    observaciones = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Serie de {self.paciente} desde el {self.fecha_inicio} ({self.ocurrencias} citas)"
+
+    class Meta:
+        db_table = 'series_cita'
+        verbose_name = 'Serie de Citas'
+        verbose_name_plural = 'Series de Citas'
+
 class Cita(models.Model):
     paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE)
+    serie = models.ForeignKey(SerieCitas, on_delete=models.SET_NULL, blank=True, null=True, related_name='citas')
     tipo_cita = models.ForeignKey(TipoCita, on_delete=models.CASCADE)
     motivo = models.ForeignKey(MotivoCita, on_delete=models.CASCADE)
     fecha = models.DateField()
@@ -0,0 +1,167 @@
+"""
+Series de citas recurrentes (controles de pacientes crónicos).
+
+Una serie genera `ocurrencias` citas separadas por `intervalo_dias` días.
+En lugar de validar y guardar cada cita por separado, el solapamiento de
+todas las fechas se verifica con una sola consulta por rango de fechas, y
+las citas y sus notas de sistema se insertan con `bulk_create`. La
+verificación corre dentro de la misma transacción que inserta las citas:
+si dos series del mismo paciente se guardan a la vez, el aislamiento
+serializable obliga a reintentar una de ellas, que entonces ve las citas
+de la otra y se rechaza con `ValidationError`.
+
+Las modificaciones y la cancelación de una serie se aplican a sus citas
+pendientes: desde hoy en adelante y que no estén completadas ni
+canceladas. Las citas ya atendidas no se tocan.
+"""
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from core import auditoria, referencias
+from core.transacciones import transaccion_reintentable
+from . import en_vivo
+from .estados import tipo_nota_sistema
+from .models import Cita, EstadoCita, NotaCita
+
+MAX_OCURRENCIAS = 52
+ESTADOS_CERRADOS = ('Completada', 'Cancelada')
+ESTADO_CANCELADA = 'Cancelada'
+
+
+def fechas_serie(fecha_inicio, intervalo_dias, ocurrencias):
+    paso = datetime.timedelta(days=intervalo_dias)
+    return [fecha_inicio + paso * i for i in range(ocurrencias)]
+
+
+def solapamientos(paciente, fechas, hora_inicio, hora_fin, excluir_serie=None):
+    """
+    Citas del paciente que se cruzan con el horario en alguna de `fechas`,
+    con una sola consulta sobre el rango de fechas de la serie.
+    """
+    if not fechas:
+        return []
+    citas = Cita.objects.filter(
+        paciente=paciente,
+        fecha__range=(min(fechas), max(fechas)),
+        hora_inicio__lt=hora_fin,
+        hora_fin__gt=hora_inicio,
+    )
+    if excluir_serie is not None:
+        citas = citas.exclude(serie=excluir_serie)
+    fechas = set(fechas)
+    return [cita for cita in citas.order_by('fecha', 'hora_inicio') if cita.fecha in fechas]
+
+
+def mensaje_solapamientos(citas):
+    fechas = ', '.join(cita.fecha.strftime('%d/%m/%Y') for cita in citas[:10])
+    if len(citas) > 10:
+        fechas += f' y {len(citas) - 10} más'
+    return f'El paciente ya tiene citas que se cruzan con este horario: {fechas}.'
+
+
+def _verificar_solapamientos(paciente, fechas, hora_inicio, hora_fin, excluir_serie=None):
+    citas = solapamientos(paciente, fechas, hora_inicio, hora_fin, excluir_serie)
+    if citas:
+        raise ValidationError(mensaje_solapamientos(citas))
+
+
+def pendientes(serie):
+    """Citas de la serie a las que se aplican los cambios y la cancelación."""
+    cerrados = [referencias.id_de(EstadoCita, nombre) for nombre in ESTADOS_CERRADOS]
+    return serie.citas.filter(fecha__gte=timezone.now().date()).exclude(estado_id__in=[pk for pk in cerrados if pk])
+
+
+def _agregar_notas(ids, contenido):
+    """Una nota de sistema por cita; `contenido(i)` arma el texto de la i-ésima."""
+    tipo_nota = tipo_nota_sistema()
+    NotaCita.objects.bulk_create([
+        NotaCita(cita_id=cita_id, tipo_nota=tipo_nota, contenido=contenido(i))
+        for i, cita_id in enumerate(ids, 1)
+    ])
+
+
+@transaccion_reintentable
+def crear_serie(serie, estado):
+    """
+    Guarda `serie` (sin guardar todavía) y crea todas sus citas con el
+    `estado` inicial indicado. Devuelve las citas creadas; lanza
+    ValidationError si alguna se cruza con otra cita del paciente.
+    """
+    fechas = fechas_serie(serie.fecha_inicio, serie.intervalo_dias, serie.ocurrencias)
+    _verificar_solapamientos(serie.paciente_id, fechas, serie.hora_inicio, serie.hora_fin)
+    serie.save()
+    citas = Cita.objects.bulk_create([
+        Cita(
+            paciente_id=serie.paciente_id,
+            serie=serie,
+            tipo_cita_id=serie.tipo_cita_id,
+            motivo_id=serie.motivo_id,
+            fecha=fecha,
+            hora_inicio=serie.hora_inicio,
+            hora_fin=serie.hora_fin,
+            estado=estado,
+            observaciones=serie.observaciones,
+        )
+        for fecha in fechas
+    ])
+    en_vivo.publicar([(cita.pk, cita.fecha, cita.estado_id) for cita in citas], en_vivo.CREADA)
+    auditoria.registrar_objetos(citas, auditoria.CREADO)
+    ahora = timezone.now().strftime('%Y-%m-%d %H:%M')
+    _agregar_notas(
+        [cita.pk for cita in citas],
+        lambda i: f"Cita creada el {ahora} (serie #{serie.pk}, {i} de {serie.ocurrencias})",
+    )
+    return citas
+
+
+@transaccion_reintentable
+def modificar_serie(serie):
+    """
+    Guarda los cambios de `serie` (tipo, motivo, horario, observaciones) y
+    los aplica a sus citas pendientes. Devuelve cuántas citas cambiaron;
+    lanza ValidationError si el nuevo horario se cruza con otra cita.
+    """
+    filas = list(pendientes(serie).values_list('pk', 'fecha', 'estado_id'))
+    _verificar_solapamientos(
+        serie.paciente_id, [fecha for _, fecha, _ in filas], serie.hora_inicio, serie.hora_fin, excluir_serie=serie,
+    )
+    serie.save()
+    ids = [pk for pk, _, _ in filas]
+    Cita.objects.filter(pk__in=ids).update(
+        tipo_cita=serie.tipo_cita_id,
+        motivo=serie.motivo_id,
+        hora_inicio=serie.hora_inicio,
+        hora_fin=serie.hora_fin,
+        observaciones=serie.observaciones,
+        updated_at=timezone.now(),
+    )
+    ahora = timezone.now().strftime('%Y-%m-%d %H:%M')
+    en_vivo.publicar(filas, en_vivo.MODIFICADA)
+    auditoria.registrar(Cita, ids, auditoria.MODIFICADO, {
+        'tipo_cita_id': serie.tipo_cita_id,
+        'motivo_id': serie.motivo_id,
+        'hora_inicio': serie.hora_inicio,
+        'hora_fin': serie.hora_fin,
+        'observaciones': serie.observaciones,
+    })
+    _agregar_notas(ids, lambda i: f"Cita modificada con su serie el {ahora}")
+    return len(ids)
+
+
+@transaccion_reintentable
+def cancelar_serie(serie):
+    """Cancela las citas pendientes de la serie. Devuelve cuántas se cancelaron."""
+    estado = referencias.obtener_o_crear(
+        EstadoCita, ESTADO_CANCELADA,
+        defaults={'descripcion': 'Cita cancelada por el paciente o el médico', 'color': '#dc3545'}
+    )
+    filas = list(pendientes(serie).values_list('pk', 'fecha'))
+    ids = [pk for pk, _ in filas]
+    Cita.objects.filter(pk__in=ids).update(estado=estado, updated_at=timezone.now())
+    en_vivo.publicar([(pk, fecha, estado.pk) for pk, fecha in filas], en_vivo.ESTADO)
+    auditoria.registrar(Cita, ids, auditoria.MODIFICADO, {'estado_id': estado.pk})
+    ahora = timezone.now().strftime('%Y-%m-%d %H:%M')
+    _agregar_notas(ids, lambda i: f"Cita cancelada junto con su serie el {ahora}")
+    return len(ids)
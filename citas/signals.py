@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Cita
+from . import en_vivo
+
+
+@receiver(post_save, sender=Cita)
+def publicar_cita_guardada(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Avisa a la página de citas de hoy que la cita es nueva o cambió
+    """
+    if created:
+        accion = en_vivo.CREADA
+    elif update_fields is not None and set(update_fields) <= {'estado', 'updated_at'}:
+        accion = en_vivo.ESTADO
+    else:
+        accion = en_vivo.MODIFICADA
+    en_vivo.publicar([(instance.pk, instance.fecha, instance.estado_id)], accion)
+
+
+@receiver(post_delete, sender=Cita)
+def publicar_cita_eliminada(sender, instance, **kwargs):
+    en_vivo.publicar([(instance.pk, instance.fecha, None)], en_vivo.ELIMINADA)
@@ -11,13 +11,25 @@ urlpatterns = [
     path('<int:cita_id>/destroy/', views.destroy, name='destroy'),
     path('search/', views.search, name='search'),
     path('hoy/', views.citas_hoy, name='hoy'),
+    path('hoy/eventos/', views.citas_hoy_eventos, name='hoy_eventos'),
     path('<int:cita_id>/estado/<int:estado_id>/', views.cambiar_estado, name='cambiar_estado'),
+
+    # Calendario (JSON y feed iCalendar)
+    path('calendario/eventos/', views.calendario_json, name='calendario_json'),
+    path('calendario/citas.ics', views.calendario_ics, name='calendario_ics'),
+
+    # Series de citas recurrentes
+    path('series/create/', views.create_serie, name='create_serie'),
+    path('series/<int:serie_id>/', views.show_serie, name='show_serie'),
+    path('series/<int:serie_id>/edit/', views.edit_serie, name='edit_serie'),
+    path('series/<int:serie_id>/cancelar/', views.cancelar_serie, name='cancelar_serie'),
     
     # URLs AJAX para crear tipos, motivos y estados
     path('ajax/crear-tipo-cita/', views.crear_tipo_cita_ajax, name='crear_tipo_cita_ajax'),
     path('ajax/crear-motivo-cita/', views.crear_motivo_cita_ajax, name='crear_motivo_cita_ajax'),
     path('ajax/crear-estado-cita/', views.crear_estado_cita_ajax, name='crear_estado_cita_ajax'),
     path('ajax/cambiar-estado/', views.cambiar_estado_ajax, name='cambiar_estado_ajax'),
+    path('ajax/cambiar-estado-masivo/', views.cambiar_estado_masivo, name='cambiar_estado_masivo'),
 
     # URLs de Exportación
     path('exportar/pdf/', views.exportar_citas_pdf, name='exportar_citas_pdf'),
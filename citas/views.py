@@ -3,28 +3,27 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.db.models import Q, Count
-from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 import json
-from django.http import HttpResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
-from io import BytesIO
-import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from sistema_medico.settings import BASE_DIR
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 
 from core.decorators import personal_medico_required
+from core import exportacion, referencias
+from core.asincronia import guardar_formulario
+from core.replicas import usar_replica
+from core.transacciones import relanzar_si_conflicto, vista_reintentable
 
-from .models import Cita, EstadoCita, TipoCita, MotivoCita, NotaCita, TipoNota
-from .forms import CitaForm, EstadoCitaForm, TipoCitaForm, MotivoCitaForm
+from . import calendario, en_vivo, estados, series
+from .models import Cita, EstadoCita, TipoCita, MotivoCita, NotaCita, SerieCitas
+from .forms import CitaForm, EstadoCitaForm, TipoCitaForm, MotivoCitaForm, SerieCitasForm, EditarSerieForm
 from pacientes.models import Paciente
 
 @personal_medico_required
@@ -39,11 +38,11 @@ def index(request):
     # Aplicar filtro por estado si se especifica
     if estado_filtro:
         if estado_filtro == 'pendientes':
-            citas_list = citas_list.filter(estado__nombre='Programada')
+            citas_list = citas_list.filter(estado_id=referencias.id_de(EstadoCita, 'Programada'))
         elif estado_filtro == 'completadas':
-            citas_list = citas_list.filter(estado__nombre='Completada')
+            citas_list = citas_list.filter(estado_id=referencias.id_de(EstadoCita, 'Completada'))
         elif estado_filtro == 'canceladas':
-            citas_list = citas_list.filter(estado__nombre='Cancelada')
+            citas_list = citas_list.filter(estado_id=referencias.id_de(EstadoCita, 'Cancelada'))
     
     # Aplicar búsqueda si se especifica
     if query:
@@ -65,9 +64,9 @@ def index(request):
     
     # Obtener estadísticas
     total_citas = Cita.objects.count()
-    citas_pendientes = Cita.objects.filter(estado__nombre='Programada').count()
-    citas_completadas = Cita.objects.filter(estado__nombre='Completada').count()
-    citas_canceladas = Cita.objects.filter(estado__nombre='Cancelada').count()
+    citas_pendientes = Cita.objects.filter(estado_id=referencias.id_de(EstadoCita, 'Programada')).count()
+    citas_completadas = Cita.objects.filter(estado_id=referencias.id_de(EstadoCita, 'Completada')).count()
+    citas_canceladas = Cita.objects.filter(estado_id=referencias.id_de(EstadoCita, 'Cancelada')).count()
     
     context = {
         'citas': citas,
@@ -78,13 +77,13 @@ def index(request):
         'citas_canceladas': citas_canceladas,
         'hoy': hoy,
         'query': query,
-        'estados_cita': EstadoCita.objects.all() # Añadir todos los estados para el modal
+        'estados_cita': referencias.todos(EstadoCita) # Añadir todos los estados para el modal
     }
     
     return render(request, 'citas/index.html', context)
 
 @personal_medico_required
-@transaction.atomic
+@vista_reintentable
 def create(request):
     if request.method == 'POST':
         form = CitaForm(request.POST)
@@ -93,10 +92,7 @@ def create(request):
                 cita = form.save()
                 
                 # Crear nota automática de creación
-                tipo_nota, created = TipoNota.objects.get_or_create(
-                    nombre='Sistema',
-                    defaults={'descripcion': 'Notas generadas automáticamente por el sistema'}
-                )
+                tipo_nota = estados.tipo_nota_sistema()
                 
                 NotaCita.objects.create(
                     cita=cita,
@@ -112,6 +108,7 @@ def create(request):
             except IntegrityError as e:
                 messages.error(request, 'Error de integridad de datos. La cita podría solaparse con otra existente.')
             except Exception as e:
+                relanzar_si_conflicto(e)
                 messages.error(request, f'Error inesperado al crear la cita: {str(e)}')
                 # Re-lanzar la excepción para que se revierta la transacción
                 raise
@@ -122,32 +119,30 @@ def create(request):
     
     # Obtener datos para selects
     pacientes = Paciente.objects.all().order_by('apellido', 'nombre')
-    estados = EstadoCita.objects.all()
-    tipos = TipoCita.objects.all()
-    motivos = MotivoCita.objects.all()
+    estados_cita = referencias.todos(EstadoCita)
+    tipos = referencias.todos(TipoCita)
+    motivos = referencias.todos(MotivoCita)
     
     return render(request, 'citas/create.html', {
         'form': form,
         'pacientes': pacientes,
-        'estados': estados,
+        'estados_cita': estados_cita,
         'tipos': tipos,
         'motivos': motivos,
     })
 
 # Vistas AJAX para crear tipos, motivos y estados desde el formulario
-@login_required
-@require_http_methods(["POST"])
-@csrf_exempt
-def crear_tipo_cita_ajax(request):
+# (async: bajo ASGI no ocupan un hilo mientras esperan a la base)
+async def _crear_desde_ajax(request, form_class):
     try:
         data = json.loads(request.body)
-        form = TipoCitaForm(data)
-        if form.is_valid():
-            tipo = form.save()
+        form = form_class(data)
+        instancia = await guardar_formulario(form)
+        if instancia is not None:
             return JsonResponse({
                 'success': True,
-                'id': tipo.id,
-                'nombre': tipo.nombre
+                'id': instancia.id,
+                'nombre': instancia.nombre
             })
         else:
             return JsonResponse({
@@ -163,83 +158,42 @@ def crear_tipo_cita_ajax(request):
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
-def crear_motivo_cita_ajax(request):
-    try:
-        data = json.loads(request.body)
-        form = MotivoCitaForm(data)
-        if form.is_valid():
-            motivo = form.save()
-            return JsonResponse({
-                'success': True,
-                'id': motivo.id,
-                'nombre': motivo.nombre
-            })
-        else:
-            return JsonResponse({
-                'success': False,
-                'errors': form.errors
-            })
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        })
+async def crear_tipo_cita_ajax(request):
+    return await _crear_desde_ajax(request, TipoCitaForm)
 
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
-def crear_estado_cita_ajax(request):
-    try:
-        data = json.loads(request.body)
-        form = EstadoCitaForm(data)
-        if form.is_valid():
-            estado = form.save()
-            return JsonResponse({
-                'success': True,
-                'id': estado.id,
-                'nombre': estado.nombre
-            })
-        else:
-            return JsonResponse({
-                'success': False,
-                'errors': form.errors
-            })
-    except Exception as e:
-        return JsonResponse({
-            'success': False,
-            'error': str(e)
-        })
+async def crear_motivo_cita_ajax(request):
+    return await _crear_desde_ajax(request, MotivoCitaForm)
+
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+async def crear_estado_cita_ajax(request):
+    return await _crear_desde_ajax(request, EstadoCitaForm)
 
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
-@transaction.atomic
-def cambiar_estado_ajax(request):
+async def cambiar_estado_ajax(request):
     try:
         data = json.loads(request.body)
         cita_id = data.get('cita_id')
         estado_id = data.get('estado_id')
 
-        cita = get_object_or_404(Cita, id=cita_id)
-        nuevo_estado = get_object_or_404(EstadoCita, id=estado_id)
-        
-        estado_anterior = cita.estado
+        nuevo_estado = await sync_to_async(referencias.obtener)(EstadoCita, estado_id)
+        if nuevo_estado is None:
+            raise Http404('Estado no encontrado.')
 
-        if estado_anterior.id == nuevo_estado.id:
+        # Lectura, UPDATE y nota de sistema en una transacción reintentable,
+        # en un solo paso por el hilo de la base
+        usuario = await request.auser()
+        resultado, = await sync_to_async(estados.cambiar_estados)([cita_id], nuevo_estado, usuario=usuario)
+        if resultado['resultado'] == estados.SIN_CAMBIOS:
             return JsonResponse({'success': True, 'message': 'El estado ya es el actual.'})
-
-        cita.estado = nuevo_estado
-        cita.save()
-
-        tipo_nota, _ = TipoNota.objects.get_or_create(
-            nombre='Sistema', 
-            defaults={'descripcion': 'Notas generadas automáticamente por el sistema'}
-        )
-        NotaCita.objects.create(
-            cita=cita,
-            tipo_nota=tipo_nota,
-            contenido=f"Estado cambiado de '{estado_anterior.nombre}' a '{nuevo_estado.nombre}' por {request.user.username}."
-        )
+        if resultado['resultado'] != estados.ACTUALIZADA:
+            raise Http404('Cita no encontrada.')
 
         return JsonResponse({
             'success': True,
@@ -264,7 +218,7 @@ def show(request, cita_id):
         return redirect('citas:index')
 
 @personal_medico_required
-@transaction.atomic
+@vista_reintentable
 def edit(request, cita_id):
     cita = get_object_or_404(Cita, id=cita_id)
     
@@ -275,10 +229,7 @@ def edit(request, cita_id):
                 form.save()
                 
                 # Crear nota de edición
-                tipo_nota, created = TipoNota.objects.get_or_create(
-                    nombre='Sistema',
-                    defaults={'descripcion': 'Notas generadas automáticamente por el sistema'}
-                )
+                tipo_nota = estados.tipo_nota_sistema()
                 
                 NotaCita.objects.create(
                     cita=cita,
@@ -294,6 +245,7 @@ def edit(request, cita_id):
             except IntegrityError as e:
                 messages.error(request, 'Error de integridad de datos. La cita podría solaparse con otra existente.')
             except Exception as e:
+                relanzar_si_conflicto(e)
                 messages.error(request, f'Error inesperado al actualizar la cita: {str(e)}')
                 raise
         else:
@@ -303,21 +255,21 @@ def edit(request, cita_id):
     
     # Obtener datos para selects
     pacientes = Paciente.objects.all().order_by('apellido', 'nombre')
-    estados = EstadoCita.objects.all()
-    tipos = TipoCita.objects.all()
-    motivos = MotivoCita.objects.all()
+    estados_cita = referencias.todos(EstadoCita)
+    tipos = referencias.todos(TipoCita)
+    motivos = referencias.todos(MotivoCita)
     
     return render(request, 'citas/edit.html', {
         'form': form,
         'cita': cita,
         'pacientes': pacientes,
-        'estados': estados,
+        'estados_cita': estados_cita,
         'tipos': tipos,
         'motivos': motivos,
     })
 
 @personal_medico_required
-@transaction.atomic
+@vista_reintentable
 def destroy(request, cita_id):
     cita = get_object_or_404(Cita, id=cita_id)
     
@@ -331,12 +283,86 @@ def destroy(request, cita_id):
             return redirect('citas:index')
             
         except Exception as e:
+            relanzar_si_conflicto(e)
             messages.error(request, f'Error al eliminar la cita: {str(e)}')
             return redirect('citas:show', cita_id=cita_id)
     
     return render(request, 'citas/destroy.html', {'cita': cita})
 
+# --- Series de citas recurrentes --- #
+
+@personal_medico_required
+def create_serie(request):
+    if request.method == 'POST':
+        form = SerieCitasForm(request.POST)
+        if form.is_valid():
+            try:
+                citas = series.crear_serie(form.save(commit=False), form.cleaned_data['estado'])
+                messages.success(request, f'Serie creada correctamente: {len(citas)} citas programadas.')
+                return redirect('citas:show_serie', serie_id=citas[0].serie_id)
+            except ValidationError as e:
+                form.add_error(None, e)
+            except IntegrityError:
+                messages.error(request, 'Error de integridad de datos. Alguna cita de la serie podría solaparse con otra existente.')
+        else:
+            messages.error(request, 'Por favor, corrija los errores en el formulario.')
+    else:
+        form = SerieCitasForm()
+
+    return render(request, 'citas/series/create.html', {'form': form})
+
 @personal_medico_required
+def show_serie(request, serie_id):
+    serie = get_object_or_404(SerieCitas.objects.select_related('paciente', 'tipo_cita', 'motivo'), id=serie_id)
+    citas = serie.citas.select_related('estado').order_by('fecha', 'hora_inicio')
+    return render(request, 'citas/series/show.html', {
+        'serie': serie,
+        'citas': citas,
+        'pendientes': series.pendientes(serie).count(),
+    })
+
+@personal_medico_required
+def edit_serie(request, serie_id):
+    serie = get_object_or_404(SerieCitas, id=serie_id)
+
+    if request.method == 'POST':
+        form = EditarSerieForm(request.POST, instance=serie)
+        if form.is_valid():
+            try:
+                cantidad = series.modificar_serie(form.save(commit=False))
+                messages.success(request, f'Serie actualizada: {cantidad} citas pendientes modificadas.')
+                return redirect('citas:show_serie', serie_id=serie.id)
+            except ValidationError as e:
+                form.add_error(None, e)
+            except IntegrityError:
+                messages.error(request, 'Error de integridad de datos. Alguna cita de la serie podría solaparse con otra existente.')
+        else:
+            messages.error(request, 'Por favor, corrija los errores en el formulario.')
+    else:
+        form = EditarSerieForm(instance=serie)
+
+    return render(request, 'citas/series/edit.html', {
+        'form': form,
+        'serie': serie,
+        'pendientes': series.pendientes(serie).count(),
+    })
+
+@personal_medico_required
+def cancelar_serie(request, serie_id):
+    serie = get_object_or_404(SerieCitas.objects.select_related('paciente'), id=serie_id)
+
+    if request.method == 'POST':
+        cantidad = series.cancelar_serie(serie)
+        messages.success(request, f'Serie cancelada: {cantidad} citas pendientes canceladas.')
+        return redirect('citas:show_serie', serie_id=serie.id)
+
+    return render(request, 'citas/series/cancelar.html', {
+        'serie': serie,
+        'pendientes': series.pendientes(serie).count(),
+    })
+
+@personal_medico_required
+@usar_replica
 def search(request):
     query = request.GET.get('q', '')
     citas = Cita.objects.all().select_related('paciente', 'tipo_cita', 'motivo', 'estado').order_by('-fecha', '-hora_inicio')
@@ -357,40 +383,100 @@ def search(request):
         'query': query
     })
 
+@personal_medico_required
+@require_http_methods(["POST"])
+def cambiar_estado_masivo(request):
+    """
+    Cambia el estado de varias citas: {"cita_ids": [...], "estado_id": n}.
+    Responde con el resultado de cada ID.
+    """
+    try:
+        data = json.loads(request.body)
+        cita_ids = data.get('cita_ids')
+        estado_id = data.get('estado_id')
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Solicitud inválida.'}, status=400)
+
+    if not isinstance(cita_ids, list) or not cita_ids:
+        return JsonResponse({'success': False, 'error': 'Seleccione al menos una cita.'}, status=400)
+    if len(cita_ids) > estados.MAX_CITAS_POR_LOTE:
+        return JsonResponse({
+            'success': False,
+            'error': f'Se pueden cambiar a lo sumo {estados.MAX_CITAS_POR_LOTE} citas por solicitud.'
+        }, status=400)
+    nuevo_estado = referencias.obtener(EstadoCita, estado_id)
+    if nuevo_estado is None:
+        return JsonResponse({'success': False, 'error': 'Estado no encontrado.'}, status=400)
+
+    resultados = estados.cambiar_estados(cita_ids, nuevo_estado, usuario=request.user)
+    return JsonResponse({
+        'success': True,
+        'nuevo_estado_nombre': nuevo_estado.nombre,
+        'nuevo_estado_color': nuevo_estado.color,
+        'actualizadas': sum(1 for r in resultados if r['resultado'] == estados.ACTUALIZADA),
+        'resultados': resultados,
+    })
+
 @personal_medico_required
 def citas_hoy(request):
     try:
-        hoy = timezone.now().date()
+        # Antes de leer las citas, para no perder cambios entre la consulta y la conexión al flujo
+        ultimo_evento = en_vivo.canal.ultimo_id()
+        hoy = timezone.localdate()
         citas = Cita.objects.filter(fecha=hoy).select_related(
             'paciente', 'estado', 'motivo'
         ).order_by('hora_inicio')
         
         return render(request, 'citas/hoy.html', {
             'citas': citas,
-            'hoy': hoy
+            'hoy': hoy,
+            'estados_cita': sorted(referencias.todos(EstadoCita), key=lambda estado: estado.nombre),
+            'ultimo_evento': ultimo_evento,
         })
     except Exception as e:
         messages.error(request, f'Error al cargar las citas de hoy: {str(e)}')
         return redirect('citas:index')
 
 @personal_medico_required
-@transaction.atomic
+@require_GET
+async def citas_hoy_eventos(request):
+    """
+    Server-sent events con los cambios de las citas de hoy (ver citas/en_vivo.py).
+    Retoma desde el ID de Last-Event-ID o del parámetro ?desde=.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Con WSGI cada conexión abierta ocuparía un worker: sin actualizaciones en
+        # vivo (el 204 le indica al navegador que no vuelva a intentar)
+        return HttpResponse(status=204)
+    desde = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+
+    async def flujo():
+        yield 'retry: 3000\n\n'
+        async for evento in en_vivo.canal.escuchar(desde):
+            yield en_vivo.mensaje_sse(evento)
+
+    response = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@personal_medico_required
+@vista_reintentable
 def cambiar_estado(request, cita_id, estado_id):
     try:
         cita = get_object_or_404(Cita, id=cita_id)
-        estado = get_object_or_404(EstadoCita, id=estado_id)
+        estado = referencias.obtener(EstadoCita, estado_id)
+        if estado is None:
+            raise Http404('Estado no encontrado.')
         
         # Guardar el estado anterior para la nota
         estado_anterior = cita.estado.nombre
         
         cita.estado = estado
-        cita.save()
+        cita.save(update_fields=['estado', 'updated_at'])
         
         # Crear nota de cambio de estado
-        tipo_nota, created = TipoNota.objects.get_or_create(
-            nombre='Sistema',
-            defaults={'descripcion': 'Notas generadas automáticamente por el sistema'}
-        )
+        tipo_nota = estados.tipo_nota_sistema()
         
         NotaCita.objects.create(
             cita=cita,
@@ -405,56 +491,71 @@ def cambiar_estado(request, cita_id, estado_id):
     except IntegrityError as e:
         messages.error(request, 'Error de integridad de datos al cambiar el estado.')
     except Exception as e:
+        relanzar_si_conflicto(e)
         messages.error(request, f'Error inesperado al cambiar el estado: {str(e)}')
     
     return redirect('citas:show', cita_id=cita_id)
 
+# --- Calendario --- #
+
+def _etag_calendario(formato):
+    def calcular(request):
+        try:
+            desde, hasta = calendario.rango(request.GET)
+        except calendario.RangoInvalido:
+            return None
+        return calendario.etag(desde, hasta, formato)
+    return calcular
+
+@personal_medico_required
+@usar_replica
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_calendario('json'))
+def calendario_json(request):
+    """Citas entre ?desde= y ?hasta= (AAAA-MM-DD) como eventos de calendario."""
+    try:
+        desde, hasta = calendario.rango(request.GET)
+    except calendario.RangoInvalido as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'eventos': calendario.eventos(desde, hasta),
+    })
+
+@personal_medico_required
+@usar_replica
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_calendario('ics'))
+def calendario_ics(request):
+    try:
+        desde, hasta = calendario.rango(request.GET)
+    except calendario.RangoInvalido as e:
+        return HttpResponse(str(e), status=400, content_type='text/plain; charset=utf-8')
+    response = HttpResponse(
+        calendario.ics(desde, hasta, request.get_host().split(':')[0]),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'inline; filename="citas_{desde:%Y%m%d}_{hasta:%Y%m%d}.ics"'
+    return response
+
 # --- Vistas de Exportación --- #
 
 @personal_medico_required
+@usar_replica
 def exportar_citas_pdf(request):
     citas = Cita.objects.all().select_related('paciente', 'tipo_cita', 'motivo', 'estado').order_by('-fecha', '-hora_inicio')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'citas': citas,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('citas/pdf_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_citas_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    return exportacion.respuesta_pdf('citas/pdf_template.html', {'citas': citas}, 'reporte_citas')
 
 @personal_medico_required
+@usar_replica
 def exportar_citas_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="listado_citas_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Citas"
-    ws.freeze_panes = 'A2'
     headers = ['Paciente', 'Tipo de Cita', 'Motivo', 'Fecha', 'Hora Inicio', 'Hora Fin', 'Estado']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="0d6efd", end_color="0d6efd", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
     citas = Cita.objects.all().select_related('paciente', 'tipo_cita', 'motivo', 'estado').order_by('-fecha', '-hora_inicio')
-    for cita in citas:
-        ws.append([
+    filas = (
+        [
             f"{cita.paciente.nombre} {cita.paciente.apellido}",
             cita.tipo_cita.nombre,
             cita.motivo.nombre,
@@ -462,20 +563,7 @@ def exportar_citas_excel(request):
             cita.hora_inicio,
             cita.hora_fin,
             cita.estado.nombre
-        ])
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
+        ]
+        for cita in citas
+    )
+    return exportacion.respuesta_excel('listado_citas', 'Citas', headers, filas, centrar=True)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.admin import UserAdmin
-from .models import PerfilUsuario
+from .models import EventoAuditoria, PerfilUsuario
 
 
 class PerfilUsuarioInline(admin.StackedInline):
@@ -25,3 +25,22 @@ class PerfilUsuarioAdmin(admin.ModelAdmin):
     list_filter = ('rol', 'created_at')
     search_fields = ('usuario__username', 'usuario__first_name', 'usuario__last_name')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(EventoAuditoria)
+class EventoAuditoriaAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'entidad', 'entidad_id', 'accion', 'usuario_nombre', 'origen')
+    list_filter = ('accion', 'entidad')
+    search_fields = ('usuario_nombre', 'origen')
+    date_hierarchy = 'fecha'
+    show_full_result_count = False
+
+    # Solo lectura: el registro no se modifica
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
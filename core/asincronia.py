@@ -0,0 +1,21 @@
+"""
+Utilidades para las vistas `async def` (endpoints AJAX servidos por ASGI).
+
+El ORM async de Django cubre las consultas simples (`aget`, `aget_or_create`,
+`async for`), pero la validación de un ModelForm (claves foráneas,
+`unique`) sigue siendo síncrona. `guardar_formulario` la ejecuta junto con
+el guardado en un solo paso por el hilo de la base, en lugar de un salto
+por cada consulta.
+"""
+from asgiref.sync import sync_to_async
+
+
+def _validar_y_guardar(form):
+    if not form.is_valid():
+        return None
+    return form.save()
+
+
+async def guardar_formulario(form):
+    """Valida `form` y guarda la instancia; devuelve None si no es válido (ver `form.errors`)."""
+    return await sync_to_async(_validar_y_guardar)(form)
@@ -0,0 +1,211 @@
+"""
+Registro de auditoría unificado (tabla `eventos_auditoria`).
+
+Las señales post_save y post_delete de los modelos de las apps del
+proyecto arman un `EventoAuditoria` en memoria; en el momento del cambio
+no se escribe nada. El evento pasa al lote de la petición cuando la
+transacción que hizo el cambio confirma (`transaction.on_commit`), así que
+un cambio deshecho por un rollback, o por un reintento de
+`transaccion_reintentable`, no deja rastro. Al terminar la petición
+`AuditoriaMiddleware` guarda el lote completo con un solo `bulk_create`, con
+el usuario y la ruta de la petición.
+
+Las operaciones masivas del ORM (`update`, `bulk_create`) no disparan
+señales: quien las usa anota sus cambios con `registrar()`, igual que
+publica los eventos en vivo de las citas.
+
+Fuera de una petición (comandos, shell) se agrupa con
+`with auditoria.lote(origen=...)`; sin lote, cada evento se guarda al
+confirmar su transacción.
+"""
+import contextlib
+import contextvars
+import functools
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps
+from django.db import DatabaseError, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .models import EventoAuditoria
+
+logger = logging.getLogger(__name__)
+
+CREADO = 'creado'
+MODIFICADO = 'modificado'
+ELIMINADO = 'eliminado'
+
+APPS_AUDITADAS = ('core', 'pacientes', 'citas', 'historiales', 'inventario')
+# Tablas derivadas que se regeneran con comandos, y el propio registro
+NO_AUDITADOS = {
+    'core.eventoauditoria',
+    'inventario.alertacaducidad',
+    'inventario.cierrestock',
+    'inventario.consumodiario',
+    'inventario.pronosticoconsumo',
+}
+
+TAMANIO_INSERCION = 1000
+
+_lote = contextvars.ContextVar('lote_auditoria', default=None)
+
+
+def modelos_auditados():
+    for etiqueta in APPS_AUDITADAS:
+        for modelo in apps.get_app_config(etiqueta).get_models():
+            if modelo._meta.label_lower not in NO_AUDITADOS:
+                yield modelo
+
+
+class Lote:
+    """Eventos confirmados pendientes de guardar, con el usuario y el origen que los produjo."""
+
+    def __init__(self, usuario=None, origen=''):
+        self.eventos = []
+        self.usuario = usuario
+        self.origen = origen
+        self.cerrado = False
+
+    def agregar(self, eventos):
+        if self.cerrado:
+            # La transacción confirmó después de cerrar el lote (p. ej. un
+            # lote abierto dentro de un atomic): se guardan de inmediato
+            _guardar(eventos, self.usuario, self.origen)
+        else:
+            self.eventos.extend(eventos)
+
+    def guardar(self):
+        self.cerrado = True
+        eventos, self.eventos = self.eventos, []
+        _guardar(eventos, self.usuario, self.origen)
+
+
+def _guardar(eventos, usuario=None, origen=''):
+    if not eventos:
+        return
+    autenticado = usuario is not None and usuario.is_authenticated
+    for evento in eventos:
+        if evento.usuario_id is None and autenticado:
+            evento.usuario_id = usuario.pk
+            evento.usuario_nombre = usuario.get_username()
+        evento.origen = evento.origen or origen[:255]
+    EventoAuditoria.objects.bulk_create(eventos, batch_size=TAMANIO_INSERCION)
+
+
+@contextlib.contextmanager
+def lote(usuario=None, origen=''):
+    """Agrupa los eventos confirmados dentro del bloque y los guarda con un INSERT al salir."""
+    actual = Lote(usuario, origen)
+    token = _lote.set(actual)
+    try:
+        yield actual
+    finally:
+        _lote.reset(token)
+        actual.guardar()
+
+
+def _valor(valor):
+    return valor.name if isinstance(valor, FieldFile) else valor
+
+
+def datos_de(instancia, campos=None):
+    """Valores de las columnas de `instancia` (solo `campos` si se indican)."""
+    return {
+        campo.attname: _valor(campo.value_from_object(instancia))
+        for campo in instancia._meta.concrete_fields
+        if not campo.primary_key and (campos is None or campo.name in campos or campo.attname in campos)
+    }
+
+
+def _encolar(eventos, using=None):
+    actual = _lote.get()
+    if actual is not None:
+        transaction.on_commit(functools.partial(actual.agregar, eventos), using=using)
+    else:
+        transaction.on_commit(functools.partial(_guardar, eventos), using=using)
+
+
+def _evento(modelo, pk, accion, datos, usuario=None):
+    return EventoAuditoria(
+        fecha=timezone.now(), accion=accion, entidad=modelo._meta.label_lower, entidad_id=pk, datos=datos,
+        usuario_id=usuario.pk if usuario is not None else None,
+        usuario_nombre=usuario.get_username() if usuario is not None else '',
+    )
+
+
+def registrar(modelo, ids, accion, datos=None, usuario=None, using=None):
+    """
+    Anota `accion` sobre los objetos `ids` de `modelo`, para los cambios que
+    no pasan por las señales (p. ej. un `update`). `datos` se guarda igual
+    en todos los eventos.
+    """
+    eventos = [_evento(modelo, pk, accion, datos or {}, usuario) for pk in ids]
+    if eventos:
+        _encolar(eventos, using)
+
+
+def registrar_objetos(objetos, accion, usuario=None, using=None):
+    """Como `registrar`, con los valores de cada objeto (p. ej. los devueltos por `bulk_create`)."""
+    eventos = [_evento(type(objeto), objeto.pk, accion, datos_de(objeto), usuario) for objeto in objetos]
+    if eventos:
+        _encolar(eventos, using)
+
+
+def auditar_guardado(sender, instance, created, raw=False, update_fields=None, using=None, **kwargs):
+    if raw:
+        return
+    campos = None if created or update_fields is None else update_fields
+    _encolar([_evento(sender, instance.pk, CREADO if created else MODIFICADO, datos_de(instance, campos))], using)
+
+
+def auditar_eliminacion(sender, instance, using=None, **kwargs):
+    _encolar([_evento(sender, instance.pk, ELIMINADO, datos_de(instance))], using)
+
+
+class AuditoriaMiddleware:
+    """Abre un lote por petición y lo guarda al terminar, con el usuario autenticado."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _cerrar(actual):
+        cantidad = len(actual.eventos)
+        try:
+            actual.guardar()
+        except DatabaseError:
+            # Los cambios ya están confirmados: la respuesta no debe fallar por la auditoría
+            logger.exception('No se pudieron guardar %d eventos de auditoría de %s', cantidad, actual.origen)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        actual = Lote(origen=f'{request.method} {request.path}')
+        token = _lote.set(actual)
+        try:
+            return self.get_response(request)
+        finally:
+            _lote.reset(token)
+            actual.usuario = getattr(request, 'user', None)
+            self._cerrar(actual)
+
+    async def __acall__(self, request):
+        # Las vistas async escriben con sync_to_async, en una copia del
+        # contexto que apunta al mismo Lote
+        actual = Lote(origen=f'{request.method} {request.path}')
+        token = _lote.set(actual)
+        try:
+            return await self.get_response(request)
+        finally:
+            _lote.reset(token)
+            actual.usuario = getattr(request, 'user', None)
+            if actual.eventos:
+                await sync_to_async(self._cerrar)(actual)
+            else:
+                actual.cerrado = True
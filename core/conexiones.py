@@ -0,0 +1,83 @@
+"""
+Estado y métricas de las conexiones a la base de datos.
+
+Hay dos modos, según DATABASES en settings:
+
+- conexiones persistentes (`CONN_MAX_AGE` > 0, por defecto): cada proceso
+  reutiliza su conexión entre peticiones y, con `CONN_HEALTH_CHECKS`, la
+  verifica antes de usarla tras un período de inactividad;
+- pool de psycopg 3 (`DB_POOL=True`): el proceso mantiene entre
+  `DB_POOL_MIN` y `DB_POOL_MAX` conexiones abiertas y las presta a cada
+  petición; si todas están ocupadas la petición espera hasta
+  `DB_POOL_TIMEOUT` segundos.
+
+Se cuentan las conexiones que abre el proceso (señal `connection_created`),
+que es lo que se quiere mantener bajo. Con pool, esa señal se emite cada
+vez que se toma una conexión del pool; las conexiones reales abiertas por
+el pool están en `estadisticas_pool()['conexiones_creadas']`.
+"""
+import threading
+from collections import Counter
+
+from django.db import connections
+
+_abiertas = Counter()
+_candado = threading.Lock()
+
+
+def registrar_conexion(alias):
+    with _candado:
+        _abiertas[alias] += 1
+
+
+def abiertas(alias='default'):
+    """Conexiones nuevas abiertas por este proceso desde que arrancó."""
+    with _candado:
+        return _abiertas[alias]
+
+
+def modo(alias='default'):
+    configuracion = connections[alias].settings_dict
+    if configuracion.get('OPTIONS', {}).get('pool'):
+        return 'pool'
+    if configuracion.get('CONN_MAX_AGE'):
+        return 'persistente'
+    return 'por_peticion'
+
+
+def estadisticas_pool(alias='default'):
+    """
+    Estadísticas del pool de psycopg 3 (tamaño, disponibles, peticiones en
+    espera y tiempo de espera acumulado), o None si no se usa pool.
+    """
+    conexion = connections[alias]
+    pool = getattr(conexion, 'pool', None) if modo(alias) == 'pool' else None
+    if pool is None:
+        return None
+    datos = pool.get_stats()
+    atendidas = datos.get('requests_num', 0)
+    return {
+        'minimo': datos.get('pool_min'),
+        'maximo': datos.get('pool_max'),
+        'tamanio': datos.get('pool_size'),
+        'disponibles': datos.get('pool_available'),
+        'en_espera': datos.get('requests_waiting', 0),
+        'peticiones': atendidas,
+        'encoladas': datos.get('requests_queued', 0),
+        'espera_total_ms': datos.get('requests_wait_ms', 0),
+        'espera_media_ms': round(datos.get('requests_wait_ms', 0) / atendidas, 2) if atendidas else 0,
+        'errores': datos.get('requests_errors', 0),
+        'conexiones_creadas': datos.get('connections_num', 0),
+    }
+
+
+def estado(alias='default'):
+    configuracion = connections[alias].settings_dict
+    return {
+        'alias': alias,
+        'modo': modo(alias),
+        'conn_max_age': configuracion.get('CONN_MAX_AGE'),
+        'health_checks': configuracion.get('CONN_HEALTH_CHECKS'),
+        'conexiones_abiertas': abiertas(alias),
+        'pool': estadisticas_pool(alias),
+    }
@@ -0,0 +1,19 @@
+from django.conf import settings
+
+
+def navegacion(request):
+    """
+    Rol del usuario para base.html, resuelto una sola vez por petición. Los
+    fragmentos de navegación en caché usan `rol_usuario` como clave y
+    `cache_fragmentos` como vigencia.
+    """
+    perfil = None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        # Sin perfil (p. ej. un superusuario creado antes de la señal) no hay rol
+        perfil = getattr(user, 'perfilusuario', None)
+    return {
+        'perfil_usuario': perfil,
+        'rol_usuario': perfil.rol if perfil else '',
+        'cache_fragmentos': settings.CACHE_FRAGMENTOS,
+    }
@@ -1,30 +1,51 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.contrib import messages
 from functools import wraps
 
+def _sin_permiso(request, allowed_roles):
+    """
+    Devuelve la redirección si el usuario no puede entrar a la vista, o None si puede.
+    """
+    if not request.user.is_authenticated:
+        return redirect(reverse_lazy('core:login'))
+
+    # Los superusuarios siempre tienen acceso
+    if request.user.is_superuser:
+        return None
+
+    # Si el perfil del usuario está en los roles permitidos, se ejecuta la vista
+    if hasattr(request.user, 'perfilusuario') and request.user.perfilusuario.rol in allowed_roles:
+        return None
+
+    # Si no tiene el rol, se muestra un mensaje y se redirige
+    messages.error(request, 'No tienes los permisos necesarios para acceder a esta página.')
+    return redirect(reverse_lazy('core:acceso_denegado'))
+
 def role_required(allowed_roles=[]):
     """
     Decorador para vistas basadas en funciones que comprueba si el usuario tiene uno de los roles permitidos o es un superusuario.
+    Sirve también para vistas async.
     """
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                # La sesión, el usuario y su perfil se leen de la base
+                respuesta = await sync_to_async(_sin_permiso)(request, allowed_roles)
+                if respuesta is not None:
+                    return respuesta
+                return await view_func(request, *args, **kwargs)
+            return _wrapped_view
+
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
-            if not request.user.is_authenticated:
-                return redirect(reverse_lazy('core:login'))
-
-            # Los superusuarios siempre tienen acceso
-            if request.user.is_superuser:
-                return view_func(request, *args, **kwargs)
-
-            # Si el perfil del usuario está en los roles permitidos, se ejecuta la vista
-            if hasattr(request.user, 'perfilusuario') and request.user.perfilusuario.rol in allowed_roles:
-                return view_func(request, *args, **kwargs)
-            else:
-                # Si no tiene el rol, se muestra un mensaje y se redirige
-                messages.error(request, 'No tienes los permisos necesarios para acceder a esta página.')
-                return redirect(reverse_lazy('core:acceso_denegado'))
+            respuesta = _sin_permiso(request, allowed_roles)
+            if respuesta is not None:
+                return respuesta
+            return view_func(request, *args, **kwargs)
         return _wrapped_view
     return decorator
 
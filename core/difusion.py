@@ -0,0 +1,109 @@
+"""
+Difusión de eventos en el proceso, para vistas async que mantienen una
+conexión abierta con el navegador (server-sent events).
+
+Un `Canal` numera los eventos que se publican en él y guarda los últimos
+en memoria. Cada conexión se suscribe con una cola de asyncio; `publicar`
+se puede llamar desde cualquier hilo (vistas sync, señales, comandos) y
+entrega el evento en el bucle de cada suscriptor. Quien se reconecta pasa
+el último ID que recibió y se le reenvía lo que se perdió; si ya no está
+en memoria recibe un evento 'recargar'.
+
+El canal vive en la memoria de un proceso: solo llegan los eventos
+publicados por el mismo proceso del servidor que atiende la conexión. Un
+ID de otro proceso (u otro arranque) no se puede continuar, y se escucha
+desde el último evento.
+"""
+import asyncio
+import collections
+import threading
+import uuid
+
+EVENTOS_EN_MEMORIA = 500
+EVENTOS_POR_SUSCRIPTOR = 200
+
+
+class _Suscriptor:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(EVENTOS_POR_SUSCRIPTOR)
+        self.desbordado = False
+
+    def entregar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # El navegador no está leyendo: se le pedirá que recargue
+            self.desbordado = True
+
+
+class Canal:
+    def __init__(self, nombre, en_memoria=EVENTOS_EN_MEMORIA):
+        self.nombre = nombre
+        # Distingue los IDs de este proceso de los de otro o de un arranque anterior
+        self.arranque = uuid.uuid4().hex[:8]
+        self._secuencia = 0
+        self._recientes = collections.deque(maxlen=en_memoria)
+        self._suscriptores = set()
+        self._candado = threading.Lock()
+
+    def _id(self, secuencia):
+        return f'{self.arranque}-{secuencia}'
+
+    def ultimo_id(self):
+        with self._candado:
+            return self._id(self._secuencia)
+
+    def publicar(self, tipo, datos):
+        with self._candado:
+            self._secuencia += 1
+            evento = (self._id(self._secuencia), tipo, datos)
+            self._recientes.append((self._secuencia, evento))
+            suscriptores = list(self._suscriptores)
+        for suscriptor in suscriptores:
+            try:
+                suscriptor.loop.call_soon_threadsafe(suscriptor.entregar, evento)
+            except RuntimeError:
+                # El bucle de esa conexión ya se cerró
+                with self._candado:
+                    self._suscriptores.discard(suscriptor)
+
+    def _pendientes(self, desde):
+        """Eventos posteriores al ID `desde`, o None si no se pueden reconstruir."""
+        arranque, _, secuencia = (desde or '').partition('-')
+        if arranque != self.arranque or not secuencia.isdigit():
+            return []
+        secuencia = int(secuencia)
+        if secuencia > self._secuencia:
+            return []
+        if secuencia < self._secuencia and (not self._recientes or self._recientes[0][0] > secuencia + 1):
+            return None
+        return [evento for numero, evento in self._recientes if numero > secuencia]
+
+    async def escuchar(self, desde=None, espera=15):
+        """
+        Genera los eventos (id, tipo, datos) publicados desde el ID `desde`.
+        Cada `espera` segundos sin eventos genera None para mantener viva la
+        conexión. Si se perdieron eventos genera (id, 'recargar', {}) y termina.
+        """
+        suscriptor = _Suscriptor()
+        with self._candado:
+            pendientes = self._pendientes(desde)
+            if pendientes is not None:
+                self._suscriptores.add(suscriptor)
+            ultimo = self._id(self._secuencia)
+        if pendientes is None:
+            yield (ultimo, 'recargar', {})
+            return
+        try:
+            for evento in pendientes:
+                yield evento
+            while not suscriptor.desbordado:
+                try:
+                    yield await asyncio.wait_for(suscriptor.cola.get(), espera)
+                except asyncio.TimeoutError:
+                    yield None
+            yield (self.ultimo_id(), 'recargar', {})
+        finally:
+            with self._candado:
+                self._suscriptores.discard(suscriptor)
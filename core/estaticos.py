@@ -0,0 +1,38 @@
+"""
+WhiteNoise para los dos modos de despliegue (WSGI y ASGI).
+
+WhiteNoiseMiddleware 6.x solo es síncrono: bajo ASGI, Django lo envuelve y
+cada petición ocupa un hilo mientras recorre el resto de la cadena, aunque
+la vista sea async. Esta subclase sirve los archivos estáticos igual que
+la original, pero deja pasar las demás peticiones sin salir del bucle de
+eventos.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as WhiteNoiseSincrono
+
+
+class WhiteNoiseMiddleware(WhiteNoiseSincrono):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _archivo(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        archivo = self._archivo(request)
+        if archivo is not None:
+            # Abrir el archivo es E/S bloqueante: fuera del bucle
+            return await sync_to_async(self.serve, thread_sensitive=False)(archivo, request)
+        return await self.get_response(request)
@@ -0,0 +1,88 @@
+"""
+Generación de los reportes PDF y Excel que descargan las vistas de exportación.
+
+xhtml2pdf (que arrastra reportlab, html5lib y PIL) y openpyxl se importan
+dentro de cada función y no al cargar el módulo: la mayoría de las
+peticiones nunca exporta nada, y así ningún proceso paga esas
+importaciones al arrancar ni al cargar las vistas; solo la primera
+exportación de cada proceso. `python manage.py perfil_importacion` muestra
+lo que cuesta cargar cada módulo al arrancar.
+"""
+import datetime
+from io import BytesIO
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import get_template
+
+TIPO_EXCEL = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+COLOR_ENCABEZADO = '0d6efd'
+
+
+def _nombre_archivo(prefijo, extension):
+    return '{}_{}.{}'.format(prefijo, datetime.datetime.now().strftime('%Y%m%d'), extension)
+
+
+def respuesta_pdf(plantilla, contexto, prefijo):
+    """
+    Renderiza `plantilla` como PDF y la devuelve como descarga
+    `<prefijo>_<AAAAMMDD>.pdf`. Agrega al contexto el logo y la fecha de
+    generación que usan todas las plantillas de reporte.
+    """
+    from xhtml2pdf import pisa
+
+    contexto = {
+        'logo_path': str(settings.BASE_DIR / 'static/img/logo.png'),
+        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M'),
+        **contexto,
+    }
+    html = get_template(plantilla).render(contexto)
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode('UTF-8')), result)
+
+    if pdf.err:
+        return HttpResponse('Error al generar el PDF.', status=400)
+    response = HttpResponse(result.getvalue(), content_type='application/pdf')
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(_nombre_archivo(prefijo, 'pdf'))
+    return response
+
+
+def respuesta_excel(prefijo, titulo, encabezados, filas, color=COLOR_ENCABEZADO, centrar=False):
+    """
+    Devuelve una hoja de cálculo `<prefijo>_<AAAAMMDD>.xlsx` con una fila de
+    encabezados resaltada y fija, las `filas` indicadas y el ancho de cada
+    columna ajustado a su contenido. Con `centrar=True` se centran todas las
+    celdas.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    response = HttpResponse(content_type=TIPO_EXCEL)
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(_nombre_archivo(prefijo, 'xlsx'))
+    wb = Workbook()
+    ws = wb.active
+    ws.title = titulo
+    ws.freeze_panes = 'A2'
+    ws.append(encabezados)
+
+    centrado = Alignment(horizontal='center', vertical='center')
+    fuente = Font(bold=True, color='FFFFFF')
+    relleno = PatternFill(start_color=color, end_color=color, fill_type='solid')
+    for cell in ws[1]:
+        cell.font = fuente
+        cell.fill = relleno
+        cell.alignment = centrado
+
+    for fila in filas:
+        ws.append(list(fila))
+
+    if centrar:
+        for row in ws.iter_rows(min_row=2):
+            for cell in row:
+                cell.alignment = centrado
+    for col in ws.columns:
+        ancho = max(len(str(cell.value)) for cell in col)
+        ws.column_dimensions[col[0].column_letter].width = ancho + 2
+
+    wb.save(response)
+    return response
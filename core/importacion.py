@@ -0,0 +1,90 @@
+"""
+Lectura en streaming de archivos CSV y XLSX para las importaciones masivas.
+
+Las filas se entregan una a una como diccionarios con los encabezados
+normalizados (minúsculas, sin acentos y con guiones bajos), de modo que el
+archivo nunca se carga completo en memoria y cada módulo de importación
+solo tiene que validar y agrupar en lotes.
+"""
+import csv
+import io
+import unicodedata
+from itertools import islice
+
+EXTENSIONES_PERMITIDAS = ('.csv', '.xlsx')
+
+
+class ArchivoInvalido(ValueError):
+    pass
+
+
+def normalizar_encabezado(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(texto.strip().lower().replace('-', ' ').split())
+
+
+def _limpiar(valor):
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    return valor
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    try:
+        yield from csv.reader(texto, dialecto)
+    finally:
+        # Evita que el wrapper cierre el archivo subido al ser recolectado
+        texto.detach()
+
+
+def _filas_xlsx(archivo):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Genera tuplas (número de fila, diccionario) a partir de un archivo CSV o
+    XLSX abierto en modo binario. La fila 1 son los encabezados; las filas
+    completamente vacías se omiten.
+    """
+    nombre = (nombre or '').lower()
+    if nombre.endswith('.csv'):
+        filas = _filas_csv(archivo)
+    elif nombre.endswith('.xlsx'):
+        filas = _filas_xlsx(archivo)
+    else:
+        raise ArchivoInvalido('Formato no soportado. Use un archivo .csv o .xlsx.')
+
+    try:
+        encabezados = [normalizar_encabezado(e) for e in next(filas)]
+    except StopIteration:
+        raise ArchivoInvalido('El archivo está vacío.')
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ArchivoInvalido(f'No se pudo leer el archivo: {e}')
+
+    for numero, fila in enumerate(filas, start=2):
+        valores = [_limpiar(v) for v in fila]
+        if not any(v is not None for v in valores):
+            continue
+        yield numero, dict(zip(encabezados, valores))
+
+
+def en_lotes(iterable, tamanio):
+    """Agrupa un iterable en listas de a lo sumo `tamanio` elementos."""
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamanio)):
+        yield lote
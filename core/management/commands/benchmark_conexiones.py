@@ -0,0 +1,86 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test import Client
+from django.urls import reverse
+
+from core import conexiones
+
+class Command(BaseCommand):
+    help = ('Mide la latencia por petición de una vista liviana con la configuración de conexiones '
+            'actual y abriendo una conexión nueva en cada petición')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por modo')
+        parser.add_argument('--url', help='URL a medir (por defecto, la carga de ciudades por AJAX)')
+        parser.add_argument('--usuario', help='Usuario con el que se autentican las peticiones')
+
+    def _host(self):
+        for host in settings.ALLOWED_HOSTS:
+            host = host.strip().lstrip('.')
+            if host and host != '*':
+                return host
+        return 'localhost'
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True).first()
+        if usuario is None:
+            raise CommandError('No hay un usuario con el que autenticar las peticiones (use --usuario)')
+
+        url = options['url'] or reverse('pacientes:cargar_ciudades') + '?estado_id=1'
+        # El Host por defecto del cliente ('testserver') no está en ALLOWED_HOSTS
+        cliente = Client(HTTP_HOST=self._host())
+        cliente.force_login(usuario)
+
+        configuracion = connections['default'].settings_dict
+        resultados = [(f"actual ({conexiones.modo()})", self._medir(cliente, url, options['peticiones']))]
+
+        # Sin persistencia ni pool: una conexión nueva por petición
+        original = (configuracion['CONN_MAX_AGE'], configuracion['OPTIONS'].get('pool'))
+        connections['default'].close()
+        configuracion['CONN_MAX_AGE'] = 0
+        configuracion['OPTIONS'].pop('pool', None)
+        try:
+            resultados.append(('conexión por petición', self._medir(cliente, url, options['peticiones'])))
+        finally:
+            connections['default'].close()
+            configuracion['CONN_MAX_AGE'] = original[0]
+            if original[1] is not None:
+                configuracion['OPTIONS']['pool'] = original[1]
+
+        self.stdout.write(f'{url} — {options["peticiones"]} peticiones por modo')
+        self.stdout.write(f'{"Modo":<28}{"media ms":>10}{"p50 ms":>10}{"p95 ms":>10}{"conexiones":>12}')
+        for nombre, (tiempos, nuevas) in resultados:
+            tiempos = sorted(t * 1000 for t in tiempos)
+            p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+            self.stdout.write(
+                f'{nombre:<28}{statistics.mean(tiempos):>10.2f}{statistics.median(tiempos):>10.2f}'
+                f'{p95:>10.2f}{nuevas:>12}'
+            )
+        actual, por_peticion = (statistics.mean(r[1][0]) for r in resultados)
+        self.stdout.write(self.style.SUCCESS(
+            f'Diferencia media por petición: {(por_peticion - actual) * 1000:.2f} ms'
+        ))
+
+    def _medir(self, cliente, url, peticiones):
+        # El cliente de pruebas no cierra conexiones al terminar cada
+        # petición; aquí se hace como lo haría el servidor, respetando
+        # CONN_MAX_AGE y los chequeos de salud.
+        antes = conexiones.abiertas()
+        tiempos = []
+        for _ in range(peticiones):
+            inicio = time.perf_counter()
+            close_old_connections()
+            respuesta = cliente.get(url)
+            close_old_connections()
+            tiempos.append(time.perf_counter() - inicio)
+            if respuesta.status_code != 200:
+                raise CommandError(f'{url} respondió {respuesta.status_code}')
+        return tiempos, conexiones.abiertas() - antes
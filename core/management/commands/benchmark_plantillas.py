@@ -0,0 +1,87 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from core.models import PerfilUsuario
+
+SIN_CACHE_FRAGMENTOS = {
+    **settings.CACHES,
+    'fragmentos': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def _plantillas_sin_cargador_en_cache():
+    plantillas = copy.deepcopy(settings.TEMPLATES)
+    opciones = plantillas[0]['OPTIONS']
+    opciones['loaders'] = [
+        cargador for _, cargadores in opciones['loaders'] for cargador in cargadores
+    ]
+    return plantillas
+
+
+class Command(BaseCommand):
+    help = ('Mide el costo de renderizar una página por rol sin caché, con el cargador de plantillas '
+            'en caché y con los fragmentos de navegación en caché')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=300, help='Renderizados por rol y escenario')
+        parser.add_argument('--plantilla', default='base.html', help='Plantilla a renderizar')
+
+    def handle(self, *args, **options):
+        usuarios = [('anónimo', AnonymousUser())]
+        for rol, nombre in PerfilUsuario.ROL_OPCIONES:
+            usuario = User.objects.filter(perfilusuario__rol=rol).select_related('perfilusuario').first()
+            if usuario is not None:
+                usuarios.append((nombre, usuario))
+        if len(usuarios) == 1:
+            raise CommandError('No hay usuarios con perfil para medir')
+
+        escenarios = [
+            ('sin caché', dict(TEMPLATES=_plantillas_sin_cargador_en_cache(), CACHES=SIN_CACHE_FRAGMENTOS)),
+            ('cargador en caché', dict(CACHES=SIN_CACHE_FRAGMENTOS)),
+            ('cargador + fragmentos', {}),
+        ]
+        fabrica = RequestFactory()
+        resultados = {}
+        html = {}
+        for escenario, ajustes in escenarios:
+            with override_settings(**ajustes):
+                for nombre, usuario in usuarios:
+                    request = fabrica.get('/')
+                    request.user = usuario
+                    tiempos = []
+                    for _ in range(options['renders']):
+                        inicio = time.perf_counter()
+                        salida = render_to_string(options['plantilla'], request=request)
+                        tiempos.append(time.perf_counter() - inicio)
+                    resultados[(escenario, nombre)] = sorted(t * 1000 for t in tiempos)
+                    html.setdefault(nombre, set()).add(salida)
+
+        self.stdout.write(f'{options["plantilla"]} — {options["renders"]} renderizados por rol y escenario')
+        self.stdout.write(f'{"Escenario":<24}{"Rol":<16}{"media ms":>10}{"p50 ms":>10}{"p95 ms":>10}')
+        for (escenario, nombre), tiempos in resultados.items():
+            p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+            self.stdout.write(
+                f'{escenario:<24}{nombre:<16}{statistics.mean(tiempos):>10.3f}'
+                f'{statistics.median(tiempos):>10.3f}{p95:>10.3f}'
+            )
+
+        distintos = [nombre for nombre, salidas in html.items() if len(salidas) > 1]
+        if distintos:
+            self.stdout.write(self.style.WARNING(
+                f'El HTML difiere entre escenarios para: {", ".join(distintos)}'
+            ))
+        antes, despues = (
+            statistics.mean(t for (e, _), ts in resultados.items() if e == escenario for t in ts)
+            for escenario in (escenarios[0][0], escenarios[-1][0])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Costo medio por página: {antes:.3f} ms sin caché, {despues:.3f} ms con caché '
+            f'({antes / despues:.1f}x)'
+        ))
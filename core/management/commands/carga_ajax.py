@@ -0,0 +1,128 @@
+import http.client
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from pacientes.models import Estado
+
+class Command(BaseCommand):
+    help = ('Prueba de carga de un endpoint AJAX contra servidores ya levantados en este equipo '
+            '(p. ej. gunicorn con WSGI y uvicorn con ASGI), con concurrencia creciente')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True,
+                            help='URL base de un servidor (repetir para comparar, p. ej. el WSGI y el ASGI)')
+        parser.add_argument('--ruta', help='Ruta a pedir (por defecto, la carga de ciudades por AJAX)')
+        parser.add_argument('--usuario', help='Usuario con el que se autentican las peticiones')
+        parser.add_argument('--concurrencia', default='1,10,50,100',
+                            help='Clientes simultáneos, separados por comas')
+        parser.add_argument('--peticiones', type=int, default=500, help='Peticiones por nivel de concurrencia')
+        parser.add_argument('--timeout', type=float, default=10, help='Segundos de espera por respuesta')
+
+    def handle(self, *args, **options):
+        try:
+            niveles = [int(n) for n in options['concurrencia'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrencia debe ser una lista de enteros, p. ej. 1,10,50')
+        if options['peticiones'] < 1 or min(niveles) < 1:
+            raise CommandError('--peticiones y --concurrencia deben ser mayores que cero')
+
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True).first()
+        if usuario is None:
+            raise CommandError('No hay un usuario con el que autenticar las peticiones (use --usuario)')
+
+        ruta = options['ruta']
+        if not ruta:
+            estado = Estado.objects.order_by('pk').first()
+            ruta = reverse('pacientes:cargar_ciudades') + f'?estado_id={estado.pk if estado else 1}'
+
+        # Sesión en la misma base que usan los servidores
+        sesion = SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.create()
+        cookie = f'{settings.SESSION_COOKIE_NAME}={sesion.session_key}'
+
+        try:
+            self.stdout.write(f'{ruta} — {options["peticiones"]} peticiones por nivel')
+            self.stdout.write(
+                f'{"Servidor":<28}{"clientes":>9}{"pet/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errores":>9}'
+            )
+            for url in options['url']:
+                for clientes in niveles:
+                    tiempos, errores, segundos = self._medir(
+                        url, ruta, cookie, clientes, options['peticiones'], options['timeout']
+                    )
+                    self._fila(url, clientes, tiempos, errores, segundos)
+        finally:
+            sesion.delete()
+
+        self.stdout.write(self.style.SUCCESS('Prueba terminada'))
+
+    def _medir(self, url, ruta, cookie, clientes, peticiones, timeout):
+        partes = urlsplit(url)
+        if partes.scheme not in ('http', 'https') or not partes.hostname:
+            raise CommandError(f'URL inválida: {url}')
+        ruta = partes.path.rstrip('/') + ruta
+        clase = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        turnos = itertools.count()
+        candado = threading.Lock()
+        tiempos, errores = [], []
+
+        def cliente():
+            conexion = None
+            while True:
+                with candado:
+                    if next(turnos) >= peticiones:
+                        break
+                if conexion is None:
+                    conexion = clase(partes.hostname, partes.port, timeout=timeout)
+                inicio = time.perf_counter()
+                try:
+                    conexion.request('GET', ruta, headers={'Cookie': cookie})
+                    respuesta = conexion.getresponse()
+                    respuesta.read()
+                    correcta = respuesta.status == 200
+                except (OSError, http.client.HTTPException):
+                    conexion.close()
+                    conexion = None
+                    correcta = False
+                transcurrido = time.perf_counter() - inicio
+                with candado:
+                    (tiempos if correcta else errores).append(transcurrido)
+            if conexion is not None:
+                conexion.close()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as grupo:
+            for _ in range(clientes):
+                grupo.submit(cliente)
+        return tiempos, len(errores), time.perf_counter() - inicio
+
+    def _fila(self, url, clientes, tiempos, errores, segundos):
+        if not tiempos:
+            self.stdout.write(f'{url:<28}{clientes:>9}{"-":>9}{"-":>9}{"-":>9}{"-":>9}{errores:>9}')
+            return
+        tiempos = sorted(t * 1000 for t in tiempos)
+
+        def percentil(p):
+            return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))]
+
+        self.stdout.write(
+            f'{url:<28}{clientes:>9}{len(tiempos) / segundos:>9.0f}{statistics.median(tiempos):>9.1f}'
+            f'{percentil(0.95):>9.1f}{percentil(0.99):>9.1f}{errores:>9}'
+        )
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Lo que hace un proceso del servidor al arrancar: cargar la aplicación WSGI
+# (settings, apps y modelos) y resolver las URLs, que importa todas las vistas.
+ARRANQUE = (
+    'from sistema_medico.wsgi import application\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+
+# Librerías que solo necesitan las exportaciones y no deberían cargarse al arrancar
+SOLO_EXPORTACION = ('xhtml2pdf', 'reportlab', 'html5lib', 'PIL', 'openpyxl')
+
+
+def _leer_importtime(salida):
+    """Lista de (modulo, propio_us, acumulado_us, nivel) de la salida de `-X importtime`."""
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        if not propio.strip().isdigit():
+            continue  # encabezado
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        modulos.append((nombre.strip(), int(propio), int(acumulado), nivel))
+    return modulos
+
+
+class Command(BaseCommand):
+    help = ('Mide cuánto cuesta importar cada módulo al arrancar un proceso del servidor '
+            '(aplicación WSGI y resolución de URLs)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Cantidad de módulos a mostrar')
+        parser.add_argument('--umbral', type=float, default=0,
+                            help='Omitir los módulos que cuestan menos de estos milisegundos')
+        parser.add_argument('--paquetes', action='store_true',
+                            help='Agrupar por paquete de primer nivel (suma del tiempo propio)')
+
+    def handle(self, *args, **options):
+        entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'sistema_medico.settings')}
+        inicio = time.monotonic()
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', ARRANQUE],
+            capture_output=True, text=True, env=entorno,
+        )
+        duracion = time.monotonic() - inicio
+        if proceso.returncode != 0:
+            raise CommandError(f'No se pudo arrancar la aplicación:\n{proceso.stderr[-2000:]}')
+
+        modulos = _leer_importtime(proceso.stderr)
+        total_us = sum(propio for _, propio, _, _ in modulos)
+
+        if options['paquetes']:
+            por_paquete = {}
+            for nombre, propio, _, _ in modulos:
+                paquete = nombre.split('.')[0]
+                por_paquete[paquete] = por_paquete.get(paquete, 0) + propio
+            filas = sorted(((p, us, us) for p, us in por_paquete.items()), key=lambda f: f[1], reverse=True)
+            columna = 'total ms'
+        else:
+            # Tiempo acumulado: el módulo más todo lo que importa por primera vez
+            filas = sorted(((n, p, a) for n, p, a, _ in modulos), key=lambda f: f[2], reverse=True)
+            columna = 'acum. ms'
+
+        filas = [f for f in filas if f[2] / 1000 >= options['umbral']][:options['top']]
+        ancho = max([len(f[0]) for f in filas] + [6]) + 2
+        self.stdout.write(f'{"Módulo":<{ancho}}{"propio ms":>12}{columna:>12}{"% total":>10}')
+        for nombre, propio, acumulado in filas:
+            self.stdout.write(
+                f'{nombre:<{ancho}}{propio / 1000:>12.1f}{acumulado / 1000:>12.1f}'
+                f'{acumulado / total_us * 100 if total_us else 0:>9.1f}%'
+            )
+
+        cargadas = sorted({
+            nombre.split('.')[0] for nombre, _, _, _ in modulos if nombre.split('.')[0] in SOLO_EXPORTACION
+        })
+        if cargadas:
+            self.stdout.write(self.style.WARNING(
+                f'Se cargan al arrancar librerías que solo usan las exportaciones: {", ".join(cargadas)}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(modulos)} módulos importados en {total_us / 1000:.1f} ms '
+            f'(proceso completo: {duracion:.2f} s)'
+        ))
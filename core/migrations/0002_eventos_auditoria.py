@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:49
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('usuario_nombre', models.CharField(blank=True, max_length=150)),
+                ('accion', models.CharField(choices=[('creado', 'Creado'), ('modificado', 'Modificado'), ('eliminado', 'Eliminado')], max_length=10)),
+                ('entidad', models.CharField(max_length=60)),
+                ('entidad_id', models.BigIntegerField()),
+                ('datos', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('origen', models.CharField(blank=True, max_length=255)),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Evento de Auditoría',
+                'verbose_name_plural': 'Eventos de Auditoría',
+                'db_table': 'eventos_auditoria',
+                'indexes': [models.Index(fields=['entidad', 'entidad_id', '-fecha'], name='eventos_aud_entidad_58f6d9_idx'), models.Index(fields=['usuario', '-fecha'], name='eventos_aud_usuario_ea8c09_idx'), models.Index(fields=['-fecha'], name='eventos_aud_fecha_568427_idx')],
+            },
+        ),
+    ]
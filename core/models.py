@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -32,6 +33,76 @@ def crear_perfil_usuario(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def guardar_perfil_usuario(sender, instance, **kwargs):
-    if hasattr(instance, 'perfilusuario'):
-        instance.perfilusuario.save()
+def guardar_perfil_usuario(sender, instance, created, update_fields=None, **kwargs):
+    # Solo se guarda el perfil ya cargado junto al usuario y con el rol
+    # cambiado: un guardado parcial (last_login al iniciar sesión) o sin
+    # cambios no lo reescribe ni deja un evento de auditoría vacío
+    if created or update_fields is not None or not User.perfilusuario.is_cached(instance):
+        return
+    perfil = instance.perfilusuario
+    if perfil is not None and PerfilUsuario.objects.filter(pk=perfil.pk).values_list('rol', flat=True).first() != perfil.rol:
+        perfil.save()
+
+
+class EventoAuditoriaQuerySet(models.QuerySet):
+    """Consultas por los índices del registro, de lo más reciente a lo más antiguo."""
+
+    def de_objeto(self, objeto):
+        return self.de_entidad(type(objeto), objeto.pk)
+
+    def de_entidad(self, modelo, pk):
+        return self.filter(entidad=modelo._meta.label_lower, entidad_id=pk).order_by('-fecha')
+
+    def de_usuario(self, usuario):
+        return self.filter(usuario_id=getattr(usuario, 'pk', usuario)).order_by('-fecha')
+
+
+class EventoAuditoria(models.Model):
+    """
+    Registro de auditoría de solo inserción: una fila por alta, modificación
+    o baja de un modelo de la aplicación (ver core/auditoria.py).
+    """
+    ACCION_OPCIONES = [
+        ('creado', 'Creado'),
+        ('modificado', 'Modificado'),
+        ('eliminado', 'Eliminado'),
+    ]
+
+    fecha = models.DateTimeField()
+    # Sin restricción ni borrado en cascada: el evento conserva el id y el
+    # nombre aunque el usuario se elimine
+    usuario = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, null=True, blank=True, related_name='+', db_constraint=False
+    )
+    usuario_nombre = models.CharField(max_length=150, blank=True)
+    accion = models.CharField(max_length=10, choices=ACCION_OPCIONES)
+    # 'app.modelo' e id del objeto; sin clave foránea para que sobreviva a la baja
+    entidad = models.CharField(max_length=60)
+    entidad_id = models.BigIntegerField()
+    # Valores guardados (solo los de update_fields cuando se indican)
+    datos = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # Ruta de la petición o comando que hizo el cambio
+    origen = models.CharField(max_length=255, blank=True)
+
+    objects = EventoAuditoriaQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.fecha:%Y-%m-%d %H:%M} {self.entidad} #{self.entidad_id} {self.accion} ({self.usuario_nombre or '-'})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Los eventos de auditoría no se modifican.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Los eventos de auditoría no se eliminan.')
+
+    class Meta:
+        db_table = 'eventos_auditoria'
+        indexes = [
+            models.Index(fields=['entidad', 'entidad_id', '-fecha']),
+            models.Index(fields=['usuario', '-fecha']),
+            models.Index(fields=['-fecha']),
+        ]
+        verbose_name = 'Evento de Auditoría'
+        verbose_name_plural = 'Eventos de Auditoría'
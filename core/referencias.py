@@ -0,0 +1,224 @@
+"""
+Registro en memoria de tablas de referencia (estados y tipos de cita,
+motivos, categorías, proveedores...): tablas chicas que casi no cambian
+pero que las vistas y formularios consultaban en cada petición.
+
+Cada proceso guarda en memoria el contenido de cada tabla registrada junto
+con un sello de versión. El sello vigente vive en la caché de Django
+(`CACHES['default']`), compartida entre procesos cuando se configura un
+backend compartido (ver CACHE_BACKEND en settings). Con la caché local por
+defecto el sello nuevo solo lo ve el proceso que hizo el cambio, así que
+los demás descartan su copia cuando cumple REFERENCIAS_EDAD_MAXIMA_LOCAL
+segundos y la recargan de la base. Al
+guardar o eliminar una fila de una tabla registrada se publica un sello
+nuevo al confirmar la transacción, y los demás procesos recargan la tabla
+la próxima vez que la consultan. Para no consultar la caché en cada
+acceso, el sello se revisa como mucho una vez cada
+REFERENCIAS_VERIFICAR_CADA segundos. Los formularios no dependen de ese
+sello: un valor que no está en la copia local se busca en la base antes
+de rechazarlo.
+
+Los objetos devueltos se comparten entre peticiones: se pueden usar para
+filtrar o asignar a una clave foránea, pero no se deben modificar.
+
+    from core import referencias
+    referencias.todos(EstadoCita)
+    referencias.id_de(EstadoCita, 'Programada')
+"""
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+_registro = {}
+
+
+class TablaReferencia:
+    def __init__(self, modelo, orden):
+        self.modelo = modelo
+        self.orden = orden
+        self.clave = f'referencias:{modelo._meta.label_lower}'
+        self._datos = None
+        self._verificado = 0.0
+        self._candado = threading.Lock()
+        # Cambios de esta tabla en una transacción todavía abierta, por hilo
+        self._local = threading.local()
+
+    def _version_compartida(self):
+        version = cache.get(self.clave)
+        if version is None:
+            cache.add(self.clave, time.time_ns(), None)
+            version = cache.get(self.clave)
+        return version
+
+    def _cargar(self, version):
+        # Siempre de la principal: una recarga dentro de una vista con
+        # @usar_replica guardaría filas atrasadas bajo el sello nuevo
+        filas = list(self.modelo.objects.using(DEFAULT_DB_ALIAS).order_by(*self.orden))
+        return {
+            'version': version,
+            'filas': filas,
+            'por_pk': {fila.pk: fila for fila in filas},
+            'por_nombre': {fila.nombre: fila for fila in filas if hasattr(fila, 'nombre')},
+            'cargado': time.monotonic(),
+        }
+
+    def datos(self):
+        if getattr(self._local, 'pendiente', False):
+            if connection.in_atomic_block:
+                # La transacción que modificó la tabla sigue abierta: se lee
+                # directo de la base sin guardar nada en memoria
+                return self._cargar(None)
+            # Ya terminó (confirmada o revertida): se descarta lo que hubiera
+            self._local.pendiente = False
+            self._datos = None
+
+        ahora = time.monotonic()
+        datos = self._datos
+        if datos is not None and ahora - self._verificado < settings.REFERENCIAS_VERIFICAR_CADA:
+            return datos
+        with self._candado:
+            version = self._version_compartida()
+            if self._datos is None or self._datos['version'] != version or self._vencida(ahora):
+                self._datos = self._cargar(version)
+            self._verificado = ahora
+            return self._datos
+
+    def _vencida(self, ahora):
+        edad_maxima = _edad_maxima()
+        return edad_maxima is not None and ahora - self._datos['cargado'] >= edad_maxima
+
+    def descartar(self):
+        """Descarta solo la copia local; se recarga en el próximo acceso."""
+        with self._candado:
+            self._datos = None
+
+    def invalidar(self):
+        """Descarta la copia local y publica un sello nuevo para los demás procesos."""
+        with self._candado:
+            self._datos = None
+            cache.set(self.clave, time.time_ns(), None)
+
+    def modificada(self):
+        if connection.in_atomic_block:
+            self._local.pendiente = True
+        transaction.on_commit(self.invalidar)
+
+
+def _edad_maxima():
+    # Sin caché compartida el sello no llega a los demás procesos
+    if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return settings.REFERENCIAS_EDAD_MAXIMA_LOCAL
+    return None
+
+
+def _tabla(modelo):
+    try:
+        return _registro[modelo]
+    except KeyError:
+        raise LookupError(f'{modelo._meta.label} no está registrado como tabla de referencia') from None
+
+
+def _al_modificar(sender, **kwargs):
+    _registro[sender].modificada()
+
+
+def registrar(modelo, orden=('pk',)):
+    """Registra `modelo` como tabla de referencia (se llama desde `AppConfig.ready`)."""
+    if modelo in _registro:
+        return
+    _registro[modelo] = TablaReferencia(modelo, orden)
+    post_save.connect(_al_modificar, sender=modelo, dispatch_uid=f'referencias_save_{modelo._meta.label_lower}')
+    post_delete.connect(_al_modificar, sender=modelo, dispatch_uid=f'referencias_delete_{modelo._meta.label_lower}')
+
+
+def todos(modelo):
+    return list(_tabla(modelo).datos()['filas'])
+
+
+def obtener(modelo, pk):
+    """Fila con clave primaria `pk` (acepta el valor como texto), o None."""
+    try:
+        pk = modelo._meta.pk.to_python(pk)
+    except ValidationError:
+        return None
+    return _tabla(modelo).datos()['por_pk'].get(pk)
+
+
+def por_nombre(modelo, nombre):
+    return _tabla(modelo).datos()['por_nombre'].get(nombre)
+
+
+def id_de(modelo, nombre):
+    fila = por_nombre(modelo, nombre)
+    return fila.pk if fila is not None else None
+
+
+def obtener_o_crear(modelo, nombre, defaults=None):
+    """Como `get_or_create(nombre=...)`, sin ir a la base cuando la fila ya existe."""
+    fila = por_nombre(modelo, nombre)
+    if fila is None:
+        fila, _ = modelo.objects.get_or_create(nombre=nombre, defaults=defaults or {})
+    return fila
+
+
+def version(modelo):
+    """Sello de la copia vigente de la tabla; cambia cada vez que se modifica."""
+    return _tabla(modelo).datos()['version']
+
+
+def invalidar(modelo=None):
+    tablas = [_tabla(modelo)] if modelo is not None else list(_registro.values())
+    for tabla in tablas:
+        tabla.invalidar()
+
+
+class _OpcionesReferencia(forms.models.ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for fila in todos(self.queryset.model):
+            yield self.choice(fila)
+
+    def __len__(self):
+        return len(todos(self.queryset.model)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(todos(self.queryset.model))
+
+
+class ReferenciaChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField que arma las opciones y valida el valor elegido con el
+    registro de referencias, sin consultar la base salvo que el valor no
+    esté en la copia local.
+    """
+    iterator = _OpcionesReferencia
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        fila = obtener(self.queryset.model, value)
+        if fila is None:
+            # Puede haberla creado otro proceso (p. ej. desde el modal AJAX)
+            # antes de que el sello nuevo llegue aquí: se confirma en la base
+            try:
+                fila = self.queryset.using(DEFAULT_DB_ALIAS).filter(pk=value).first()
+            except (ValueError, TypeError, ValidationError):
+                fila = None
+            if fila is not None:
+                _tabla(self.queryset.model).descartar()
+        if fila is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return fila
@@ -0,0 +1,146 @@
+"""
+Lecturas en réplica para reportes, exportaciones y búsquedas.
+
+Si DATABASES define el alias `replica` (ver DB_REPLICA en settings), las
+vistas marcadas con `@usar_replica` leen de ella y el resto de la
+aplicación sigue usando la base principal, de modo que un PDF o Excel
+pesado no compite con el registro de citas.
+
+Se lee de la principal, aunque la vista esté marcada, cuando:
+
+- no hay réplica configurada, o no respondió en el último intento de
+  conexión (se vuelve a probar pasados `SEGUNDOS_REPLICA_CAIDA`);
+- hay una transacción abierta en la principal;
+- el usuario escribió hace menos de `REPLICA_VENTANA_ESCRITURA` segundos
+  (cookie que pone `ReplicaMiddleware`), o ya escribió en esta misma
+  petición: así ve sus propios cambios aunque la réplica vaya atrasada.
+
+Para probarlo en local basta con DB_REPLICA=True sin host propio: el alias
+`replica` apunta a la misma base, pero en modo de solo lectura.
+"""
+import contextvars
+import functools
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+ALIAS_REPLICA = 'replica'
+COOKIE_ESCRITURA = 'escritura_reciente'
+SEGUNDOS_REPLICA_CAIDA = 30
+
+_leer_de_replica = contextvars.ContextVar('leer_de_replica', default=False)
+_escritura_reciente = contextvars.ContextVar('escritura_reciente', default=False)
+_escribio = contextvars.ContextVar('escribio', default=False)
+_replica_caida_hasta = 0.0
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def _replica_disponible():
+    global _replica_caida_hasta
+    if time.monotonic() < _replica_caida_hasta:
+        return False
+    conexion = connections[ALIAS_REPLICA]
+    if conexion.connection is None:
+        try:
+            conexion.ensure_connection()
+        except DatabaseError as error:
+            _replica_caida_hasta = time.monotonic() + SEGUNDOS_REPLICA_CAIDA
+            logger.warning('Réplica no disponible, se lee de la base principal: %s', error)
+            return False
+    return True
+
+
+def alias_lectura():
+    """Alias del que leería ahora una consulta marcada para réplica."""
+    if (
+        not _leer_de_replica.get()
+        or _escritura_reciente.get()
+        or _escribio.get()
+        or not replica_configurada()
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        or not _replica_disponible()
+    ):
+        return DEFAULT_DB_ALIAS
+    return ALIAS_REPLICA
+
+
+class RouterReplica:
+    """Router de DATABASE_ROUTERS: lecturas marcadas a la réplica, todo lo demás a la principal."""
+
+    def db_for_read(self, model, **hints):
+        return alias_lectura()
+
+    def db_for_write(self, model, **hints):
+        _escribio.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, ALIAS_REPLICA, None}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        return db != ALIAS_REPLICA
+
+
+def usar_replica(vista):
+    """Marca una vista de solo lectura para que sus consultas vayan a la réplica."""
+    @functools.wraps(vista)
+    def envoltura(*args, **kwargs):
+        token = _leer_de_replica.set(True)
+        try:
+            return vista(*args, **kwargs)
+        finally:
+            _leer_de_replica.reset(token)
+    return envoltura
+
+
+class ReplicaMiddleware:
+    """
+    Fija las lecturas a la base principal durante una ventana corta después
+    de que el usuario escribe (read-your-writes), mediante una cookie.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _marcar(self, response):
+        if _escribio.get():
+            response.set_cookie(
+                COOKIE_ESCRITURA, '1',
+                max_age=settings.REPLICA_VENTANA_ESCRITURA, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reciente = _escritura_reciente.set(COOKIE_ESCRITURA in request.COOKIES)
+        escribio = _escribio.set(False)
+        try:
+            return self._marcar(self.get_response(request))
+        finally:
+            _escribio.reset(escribio)
+            _escritura_reciente.reset(reciente)
+
+    async def __acall__(self, request):
+        # Las escrituras hechas con sync_to_async marcan _escribio en una copia
+        # del contexto que asgiref vuelve a aplicar sobre este al terminar
+        reciente = _escritura_reciente.set(COOKIE_ESCRITURA in request.COOKIES)
+        escribio = _escribio.set(False)
+        try:
+            return self._marcar(await self.get_response(request))
+        finally:
+            _escribio.reset(escribio)
+            _escritura_reciente.reset(reciente)
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User, Group
 from django.dispatch import receiver
 from .models import PerfilUsuario
+from . import auditoria, conexiones
 
 
 @receiver(post_save, sender=PerfilUsuario)
@@ -22,4 +24,18 @@ def actualizar_grupo_por_rol(sender, instance, **kwargs):
     else:  # recepcionista
         grupo, created = Group.objects.get_or_create(name='Recepcionistas')
     
-    usuario.groups.add(grupo)
\ No newline at end of file
+    usuario.groups.add(grupo)
+
+
+@receiver(connection_created)
+def contar_conexion(sender, connection, **kwargs):
+    """Cuenta las conexiones nuevas para las métricas de core/conexiones.py"""
+    conexiones.registrar_conexion(connection.alias)
+
+
+# Registro de auditoría: una conexión por modelo auditado (no a todos los
+# modelos, para no quitarles el borrado rápido a sesiones y tablas ajenas)
+for modelo in auditoria.modelos_auditados():
+    etiqueta = modelo._meta.label_lower
+    post_save.connect(auditoria.auditar_guardado, sender=modelo, dispatch_uid=f'auditoria_guardado_{etiqueta}')
+    post_delete.connect(auditoria.auditar_eliminacion, sender=modelo, dispatch_uid=f'auditoria_eliminacion_{etiqueta}')
@@ -0,0 +1,220 @@
+"""
+Transacciones con reintento automático ante conflictos de serialización.
+
+La base de datos trabaja con aislamiento serializable (ver DATABASES en
+settings): cuando dos transacciones concurrentes se cruzan, PostgreSQL
+aborta una de ellas con SQLSTATE 40001 (serialization_failure) o 40P01
+(deadlock_detected), y lo correcto es repetirla completa. Este módulo
+envuelve `transaction.atomic` para hacerlo, con una cantidad acotada de
+intentos y una espera aleatoria creciente entre ellos (backoff exponencial
+con jitter completo), en lugar de devolver un error 500 al usuario.
+
+Uso como decorador de funciones de escritura::
+
+    @transaccion_reintentable
+    def cambiar_estados(ids, estado): ...
+
+Las vistas usan `@vista_reintentable`, que además descarta los mensajes
+(`django.contrib.messages`) agregados en un intento fallido, para que el
+usuario no los vea repetidos. Un reintento vuelve a ejecutar la vista
+completa: lo que no está en la base (formularios, instancias) tiene que
+armarse de nuevo dentro de ella.
+
+Uso como gestor de contexto, repitiendo el bloque en cada intento::
+
+    for intento in transaccion_reintentable():
+        with intento:
+            ...
+
+Dentro del bloque no debe usarse `return`: si el conflicto ocurre al
+confirmar, el intento se repite en la siguiente vuelta del `for`.
+
+Si ya hay una transacción abierta (una función reintentable llamada desde
+otra), el bloque corre como un savepoint normal y el reintento queda a
+cargo de la transacción externa, que es la única que puede repetirse.
+
+Las vistas que capturan `Exception` para mostrar un mensaje deben llamar a
+`relanzar_si_conflicto(e)` primero, para no ocultar el conflicto.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+SQLSTATE_REINTENTABLES = frozenset({'40001', '40P01'})
+ESPERA_MAXIMA = 1.0
+
+_metricas = Counter()
+_candado = threading.Lock()
+
+
+def es_conflicto(error):
+    """True si `error` (o su causa) es un conflicto de serialización o un interbloqueo."""
+    while error is not None:
+        # psycopg 3 expone `sqlstate`; psycopg2, `pgcode`
+        codigo = getattr(error, 'sqlstate', None) or getattr(error, 'pgcode', None)
+        if codigo in SQLSTATE_REINTENTABLES:
+            return True
+        error = error.__cause__
+    return False
+
+
+def relanzar_si_conflicto(error):
+    if es_conflicto(error):
+        raise error
+
+
+def _registrar(nombre, evento):
+    with _candado:
+        _metricas[(nombre, evento)] += 1
+
+
+def metricas():
+    """
+    Contadores por operación desde que arrancó el proceso:
+    {nombre: {'reintentos': n, 'recuperadas': n, 'agotadas': n}}.
+    """
+    with _candado:
+        copia = dict(_metricas)
+    resultado = {}
+    for (nombre, evento), cantidad in sorted(copia.items()):
+        resultado.setdefault(nombre, {'reintentos': 0, 'recuperadas': 0, 'agotadas': 0})[evento] = cantidad
+    return resultado
+
+
+def reiniciar_metricas():
+    with _candado:
+        _metricas.clear()
+
+
+class Intento:
+    """Un intento de la transacción: gestor de contexto sobre `transaction.atomic`."""
+
+    def __init__(self, reintentos, numero):
+        self.reintentos = reintentos
+        self.numero = numero
+        self.fallido = False
+
+    def __enter__(self):
+        self._atomic = transaction.atomic(using=self.reintentos.using)
+        self._atomic.__enter__()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            self._atomic.__exit__(tipo, valor, traza)
+        except DatabaseError as error:
+            # El conflicto también puede aparecer al confirmar
+            if valor is not None or not es_conflicto(error):
+                raise
+            valor = error
+        if valor is None:
+            if self.numero > 1:
+                _registrar(self.reintentos.nombre, 'recuperadas')
+            return False
+        if not isinstance(valor, DatabaseError) or not es_conflicto(valor):
+            return False
+
+        if self.numero >= self.reintentos.intentos:
+            _registrar(self.reintentos.nombre, 'agotadas')
+            logger.error(
+                'Conflicto de serialización en %s: se agotaron los %d intentos',
+                self.reintentos.nombre, self.reintentos.intentos,
+            )
+            return False
+
+        _registrar(self.reintentos.nombre, 'reintentos')
+        espera = random.uniform(0, min(ESPERA_MAXIMA, self.reintentos.espera_base * 2 ** (self.numero - 1)))
+        logger.warning(
+            'Conflicto de serialización en %s (intento %d de %d); se reintenta en %.0f ms',
+            self.reintentos.nombre, self.numero, self.reintentos.intentos, espera * 1000,
+        )
+        time.sleep(espera)
+        self.fallido = True
+        return True
+
+
+class TransaccionReintentable:
+    def __init__(self, nombre=None, intentos=None, using=None):
+        self.nombre = nombre or 'transaccion'
+        self.intentos = max(1, intentos or settings.TRANSACCION_MAX_INTENTOS)
+        self.espera_base = settings.TRANSACCION_ESPERA_BASE
+        self.using = using or DEFAULT_DB_ALIAS
+
+    def __iter__(self):
+        if connections[self.using].in_atomic_block:
+            yield transaction.atomic(using=self.using)
+            return
+        for numero in range(1, self.intentos + 1):
+            intento = Intento(self, numero)
+            yield intento
+            if not intento.fallido:
+                return
+
+    def _nombre_para(self, funcion):
+        return self.nombre if self.nombre != 'transaccion' else f'{funcion.__module__}.{funcion.__qualname__}'
+
+    def __call__(self, funcion):
+        nombre = self._nombre_para(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            for intento in TransaccionReintentable(nombre, self.intentos, self.using):
+                with intento:
+                    resultado = funcion(*args, **kwargs)
+            return resultado
+
+        return envoltura
+
+
+def _mensajes(args):
+    """Almacén de mensajes de la petición de una vista función o de un método de vista de clase."""
+    if not args:
+        return None
+    request = args[0] if isinstance(args[0], HttpRequest) else getattr(args[0], 'request', None)
+    return getattr(request, '_messages', None)
+
+
+class VistaReintentable(TransaccionReintentable):
+    def __call__(self, vista):
+        nombre = self._nombre_para(vista)
+
+        @functools.wraps(vista)
+        def envoltura(*args, **kwargs):
+            almacen = _mensajes(args)
+            for intento in TransaccionReintentable(nombre, self.intentos, self.using):
+                pendientes = len(almacen._queued_messages) if almacen is not None else 0
+                with intento:
+                    resultado = vista(*args, **kwargs)
+                if getattr(intento, 'fallido', False) and almacen is not None:
+                    del almacen._queued_messages[pendientes:]
+            return resultado
+
+        return envoltura
+
+
+def vista_reintentable(vista=None, *, nombre=None, intentos=None, using=None):
+    """Como `transaccion_reintentable` para vistas (ver el docstring del módulo)."""
+    reintentos = VistaReintentable(nombre, intentos, using)
+    if vista is not None:
+        return reintentos(vista)
+    return reintentos
+
+
+def transaccion_reintentable(funcion=None, *, nombre=None, intentos=None, using=None):
+    """
+    Decorador (`@transaccion_reintentable` o `@transaccion_reintentable(intentos=5)`)
+    o iterable de intentos para usar con `with` (ver el docstring del módulo).
+    """
+    reintentos = TransaccionReintentable(nombre, intentos, using)
+    if funcion is not None:
+        return reintentos(funcion)
+    return reintentos
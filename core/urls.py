@@ -19,4 +19,5 @@ urlpatterns = [
     path('usuarios/<int:pk>/cambiar-contrasena/', views.UsuarioSetPasswordView.as_view(), name='cambiar_contrasena'),
     path('usuarios/<int:user_id>/cambiar-rol/', views.cambiar_rol, name='cambiar_rol'),
     path('perfil/', views.PerfilView.as_view(), name='perfil'),
+    path('metricas/conexiones/', views.metricas_conexiones, name='metricas_conexiones'),
 ]
\ No newline at end of file
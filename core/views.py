@@ -8,9 +8,11 @@ from django.contrib import messages
 from django.urls import reverse_lazy
 from django import forms
 from pacientes.models import Paciente
-from citas.models import Cita
+from citas.models import Cita, EstadoCita
 from historiales.models import HistorialMedico
 from .models import PerfilUsuario
+from .replicas import usar_replica
+from . import referencias
 from django.utils import timezone
 from django.db.models import Q
 
@@ -27,7 +29,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             fecha=timezone.now().date()
         ).count()
         context['citas_pendientes'] = Cita.objects.filter(
-            estado__nombre='Programada'
+            estado_id=referencias.id_de(EstadoCita, 'Programada')
         ).count()
         context['total_historiales'] = HistorialMedico.objects.count()
         
@@ -67,6 +69,7 @@ def handler500(request):
 
 
 @login_required
+@usar_replica
 def search_all(request):
     query = request.GET.get('q', '')
     results = {
@@ -144,7 +147,7 @@ from django.views.decorators.cache import never_cache
 from django.contrib.auth import logout
 from django.views import View
 from django.views.generic import CreateView
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.urls import reverse_lazy
 from django.shortcuts import render
 from django.contrib.auth.forms import UserCreationForm
@@ -207,6 +210,7 @@ class SignUpView(CreateView):
 
 
 from .decorators import AdminRequiredMixin, admin_required
+from . import conexiones, transacciones
 from .forms import AdminUserCreationForm, AdminUserChangeForm
 from django.views.generic import CreateView, ListView, UpdateView, DeleteView, FormView
 from django.contrib.auth.forms import SetPasswordForm
@@ -348,4 +352,13 @@ def cambiar_rol(request, user_id):
         'usuario': usuario,
         'roles': PerfilUsuario.ROL_OPCIONES
     }
-    return render(request, 'registration/cambiar_rol.html', context)
\ No newline at end of file
+    return render(request, 'registration/cambiar_rol.html', context)
+
+
+@admin_required
+def metricas_conexiones(request):
+    """Estado de las conexiones y reintentos de transacciones de este proceso."""
+    return JsonResponse({
+        'conexiones': conexiones.estado(),
+        'transacciones': transacciones.metricas(),
+    })
@@ -0,0 +1,266 @@
+"""
+Índice de antecedentes en mapas de bits para los reportes de prevalencia.
+
+Cada historial médico es una posición en el índice. Para cada bandera de
+antecedentes (antf_*, antp_*, func_*) y para cada valor de las dimensiones
+de reporte (tipo de afiliado, año, grupo de edad y género) se guarda un
+vector de bits empaquetado con NumPy, de modo que un conteo de cohorte es
+solo un AND/OR de vectores y un conteo de bits, sin recorrer las tablas
+anchas de HistoriaGeneral e HistoriaNutricion en cada reporte.
+"""
+import threading
+import time
+
+import numpy as np
+from django.db import models
+from django.utils import timezone
+
+from .models import HistorialMedico, HistoriaGeneral, HistoriaNutricion
+
+
+def _banderas_de(modelo, prefijos):
+    return [
+        campo.name for campo in modelo._meta.get_fields()
+        if isinstance(campo, models.BooleanField) and campo.name.startswith(prefijos)
+    ]
+
+
+BANDERAS_GENERAL = _banderas_de(HistoriaGeneral, ('antf_', 'antp_'))
+BANDERAS_NUTRICION = _banderas_de(HistoriaNutricion, ('antf_nutri_', 'antp_nutri_', 'func_'))
+BANDERAS = BANDERAS_GENERAL + BANDERAS_NUTRICION
+
+DIMENSIONES = ['tipo_afiliado', 'anio', 'grupo_edad', 'genero']
+
+# Grupos de edad (edad al momento de la consulta): (etiqueta, edad mínima)
+GRUPOS_EDAD = [
+    ('0-17', 0), ('18-24', 18), ('25-34', 25), ('35-44', 35),
+    ('45-54', 45), ('55-64', 55), ('65+', 65),
+]
+SIN_DATO = 'N/D'
+
+# Cada cuánto se consulta la base por historiales nuevos, y cada cuánto se
+# reconstruye todo (para recoger ediciones hechas en otros procesos).
+INTERVALO_REFRESCO = 60
+INTERVALO_RECONSTRUCCION = 15 * 60
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def contar_bits(vector):
+    return int(_POPCOUNT[vector].sum(dtype=np.int64))
+
+
+def grupo_edad(fecha_nacimiento, fecha_consulta):
+    if not fecha_nacimiento or not fecha_consulta:
+        return SIN_DATO
+    edad = fecha_consulta.year - fecha_nacimiento.year - (
+        (fecha_consulta.month, fecha_consulta.day) < (fecha_nacimiento.month, fecha_nacimiento.day)
+    )
+    etiqueta = SIN_DATO
+    for nombre, minimo in GRUPOS_EDAD:
+        if edad >= minimo:
+            etiqueta = nombre
+    return etiqueta
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+class IndiceAntecedentes:
+    """
+    Índice en memoria de las banderas de antecedentes por historial.
+
+    `refrescar()` solo carga los historiales con id mayor al último cargado y
+    los que fueron marcados como modificados (ver `marcar`), por lo que el
+    costo de mantenerlo al día es proporcional a los cambios y no al tamaño
+    de la tabla.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pendientes = set()
+        self._vaciar()
+
+    def _vaciar(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._banderas = np.zeros((0, len(BANDERAS)), dtype=bool)
+        self._dimensiones = {dim: np.empty(0, dtype=object) for dim in DIMENSIONES}
+        self._ultimo_id = 0
+        self._ultimo_refresco = 0.0
+        self._ultima_reconstruccion = 0.0
+        self._empaquetar()
+
+    # --- Carga ---
+
+    def _cargar(self, **filtros):
+        campos = (
+            ['id', 'fecha', 'paciente__fecha_nacimiento', 'paciente__genero', 'historia_general__tipo_afiliado']
+            + [f'historia_general__{b}' for b in BANDERAS_GENERAL]
+            + [f'historia_nutricion__{b}' for b in BANDERAS_NUTRICION]
+        )
+        filas = list(
+            HistorialMedico.objects.filter(**filtros).order_by('id').values_list(*campos)
+        )
+        # Año y edad según la fecha local de la consulta, no la UTC (una
+        # consulta del 31/12 después de las 20:00 es de ese año)
+        fechas = [timezone.localtime(f[1]).date() if f[1] else None for f in filas]
+        n = len(filas)
+        ids = np.fromiter((f[0] for f in filas), dtype=np.int64, count=n)
+        # Los historiales sin formato asociado traen NULL en las banderas
+        banderas = np.array([[bool(v) for v in f[5:]] for f in filas], dtype=bool).reshape(n, len(BANDERAS))
+        dimensiones = {
+            'tipo_afiliado': np.array([f[4] or SIN_DATO for f in filas], dtype=object),
+            'anio': np.array([fecha.year if fecha else SIN_DATO for fecha in fechas], dtype=object),
+            'grupo_edad': np.array([grupo_edad(f[2], fecha) for f, fecha in zip(filas, fechas)], dtype=object),
+            'genero': np.array([f[3] or SIN_DATO for f in filas], dtype=object),
+        }
+        return ids, banderas, dimensiones
+
+    def reconstruir(self):
+        with self._lock:
+            self._pendientes.clear()
+            ids, banderas, dimensiones = self._cargar()
+            self._ids, self._banderas, self._dimensiones = ids, banderas, dimensiones
+            self._ultimo_id = int(ids[-1]) if len(ids) else 0
+            self._ultimo_refresco = self._ultima_reconstruccion = time.monotonic()
+            self._empaquetar()
+
+    def refrescar(self, forzar=False):
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora - self._ultima_reconstruccion > INTERVALO_RECONSTRUCCION:
+                return self.reconstruir()
+            if not forzar and not self._pendientes and ahora - self._ultimo_refresco < INTERVALO_REFRESCO:
+                return
+
+            pendientes = [pk for pk in self._pendientes if pk <= self._ultimo_id]
+            self._pendientes.clear()
+            hubo_cambios = False
+
+            if pendientes:
+                # Se descartan las filas marcadas y se vuelven a cargar las que
+                # aún existen (las eliminadas simplemente no regresan).
+                conservar = ~np.isin(self._ids, np.array(pendientes, dtype=np.int64))
+                self._ids = self._ids[conservar]
+                self._banderas = self._banderas[conservar]
+                for dim in DIMENSIONES:
+                    self._dimensiones[dim] = self._dimensiones[dim][conservar]
+                self._agregar(*self._cargar(pk__in=pendientes))
+                hubo_cambios = True
+
+            ids, banderas, dimensiones = self._cargar(pk__gt=self._ultimo_id)
+            if len(ids):
+                self._agregar(ids, banderas, dimensiones)
+                self._ultimo_id = int(ids[-1])
+                hubo_cambios = True
+
+            self._ultimo_refresco = ahora
+            if hubo_cambios:
+                self._empaquetar()
+
+    def _agregar(self, ids, banderas, dimensiones):
+        self._ids = np.concatenate([self._ids, ids])
+        self._banderas = np.concatenate([self._banderas, banderas])
+        for dim in DIMENSIONES:
+            self._dimensiones[dim] = np.concatenate([self._dimensiones[dim], dimensiones[dim]])
+
+    def marcar(self, historial_id):
+        """Marca un historial para recargarlo en el próximo refresco."""
+        with self._lock:
+            self._pendientes.add(historial_id)
+
+    def _empaquetar(self):
+        n = len(self._ids)
+        self._universo = np.packbits(np.ones(n, dtype=bool))
+        self._mapas = {
+            bandera: np.packbits(self._banderas[:, i]) for i, bandera in enumerate(BANDERAS)
+        }
+        self._mapas_dimension = {}
+        for dim in DIMENSIONES:
+            columna = self._dimensiones[dim]
+            self._mapas_dimension[dim] = {
+                valor: np.packbits(columna == valor) for valor in sorted(set(columna.tolist()), key=str)
+            }
+
+    # --- Consultas ---
+
+    def _mapa(self, bandera):
+        try:
+            return self._mapas[bandera]
+        except KeyError:
+            raise ConsultaInvalida(f"Bandera desconocida: '{bandera}'.")
+
+    def _filtro(self, filtros):
+        resultado = self._universo
+        for dim, valor in (filtros or {}).items():
+            if dim not in DIMENSIONES:
+                raise ConsultaInvalida(f"Dimensión desconocida: '{dim}'.")
+            mapas = self._mapas_dimension[dim]
+            mapa = mapas.get(valor)
+            if mapa is None and dim == 'anio' and str(valor).isdigit():
+                mapa = mapas.get(int(valor))
+            if mapa is None:
+                return np.zeros_like(self._universo)
+            resultado = resultado & mapa
+        return resultado
+
+    def cohorte(self, todos=(), alguno=(), ninguno=(), filtros=None):
+        """
+        Vector de bits de los historiales que tienen todas las banderas de
+        `todos`, al menos una de `alguno`, ninguna de `ninguno` y cumplen los
+        `filtros` por dimensión (p. ej. {'tipo_afiliado': 'EST', 'anio': 2025}).
+        """
+        with self._lock:
+            resultado = self._filtro(filtros)
+            for bandera in todos:
+                resultado = resultado & self._mapa(bandera)
+            if alguno:
+                union = np.zeros_like(self._universo)
+                for bandera in alguno:
+                    union = union | self._mapa(bandera)
+                resultado = resultado & union
+            for bandera in ninguno:
+                resultado = resultado & ~self._mapa(bandera)
+            return resultado
+
+    def contar(self, todos=(), alguno=(), ninguno=(), filtros=None):
+        return contar_bits(self.cohorte(todos, alguno, ninguno, filtros))
+
+    def tabla_cruzada(self, por, todos=(), alguno=(), ninguno=(), filtros=None):
+        """
+        Casos y prevalencia de la cohorte para cada valor de la dimensión `por`.
+        El denominador de cada fila es el total de historiales con ese valor
+        (respetando los `filtros`).
+        """
+        if por not in DIMENSIONES:
+            raise ConsultaInvalida(f"Dimensión desconocida: '{por}'.")
+        with self._lock:
+            base = self._filtro(filtros)
+            casos = self.cohorte(todos, alguno, ninguno, filtros)
+            filas = []
+            for valor, mapa in self._mapas_dimension[por].items():
+                total = contar_bits(base & mapa)
+                if not total:
+                    continue
+                n_casos = contar_bits(casos & mapa)
+                filas.append({
+                    'valor': valor,
+                    'casos': n_casos,
+                    'total': total,
+                    'prevalencia': round(100.0 * n_casos / total, 2),
+                })
+            return filas
+
+    @property
+    def total(self):
+        return len(self._ids)
+
+
+_indice = IndiceAntecedentes()
+
+
+def obtener_indice():
+    """Devuelve el índice del proceso, refrescado de forma incremental."""
+    _indice.refrescar()
+    return _indice
@@ -0,0 +1,256 @@
+"""
+Estadísticas antropométricas y de signos vitales a partir de HistoriaGeneral.
+
+Se interpreta el campo libre `ta` (tensión arterial) como sistólica/diastólica,
+se calcula el IMC con `peso` y `talla`, y se clasifican ambos. Las
+distribuciones poblacionales se calculan con NumPy sobre toda la tabla en una
+sola pasada y se guardan en la caché.
+
+Las señales de historiales invalidan la caché `default`. Como con las tablas
+de referencia (core/referencias.py), la invalidación solo llega a todos los
+procesos si esa caché es compartida (CACHE_BACKEND en settings); con la
+caché local por defecto los resultados se guardan apenas
+TIEMPO_CACHE_LOCAL segundos, para que los demás procesos no muestren datos
+viejos por más tiempo.
+"""
+import re
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .analitica import GRUPOS_EDAD, SIN_DATO
+from .models import HistoriaGeneral
+
+CLAVE_POBLACION = 'antropometria:poblacion'
+CLAVE_PACIENTE = 'antropometria:paciente:{}'
+TIEMPO_CACHE = 60 * 60
+TIEMPO_CACHE_LOCAL = 60
+
+PERCENTILES = [5, 25, 50, 75, 95]
+BORDES_IMC = np.arange(10, 52.5, 2.5)
+BORDES_SISTOLICA = np.arange(70, 230, 10)
+
+# Clasificación OMS del IMC: (límite superior exclusivo, categoría)
+CATEGORIAS_IMC = [
+    (18.5, 'Bajo peso'),
+    (25, 'Normal'),
+    (30, 'Sobrepeso'),
+    (35, 'Obesidad I'),
+    (40, 'Obesidad II'),
+    (np.inf, 'Obesidad III'),
+]
+
+CATEGORIAS_TA = ['Normal', 'Elevada', 'HTA Estadio 1', 'HTA Estadio 2', 'Crisis Hipertensiva']
+
+_PATRON_TA = re.compile(r'(\d{2,3})\s*(?:/|-|x|sobre)\s*(\d{2,3})', re.IGNORECASE)
+
+
+def parsear_ta(texto):
+    """Devuelve (sistólica, diastólica) a partir de textos como '120/80' o '120 x 80'."""
+    if not texto:
+        return None, None
+    coincidencia = _PATRON_TA.search(texto)
+    if not coincidencia:
+        return None, None
+    sistolica, diastolica = int(coincidencia.group(1)), int(coincidencia.group(2))
+    if not (50 <= sistolica <= 300 and 30 <= diastolica <= 200) or diastolica >= sistolica:
+        return None, None
+    return sistolica, diastolica
+
+
+def calcular_imc(peso, talla):
+    """
+    IMC vectorizado. La talla se registra en cm, pero los valores menores a 3
+    se asumen cargados en metros.
+    """
+    peso = np.asarray(peso, dtype=float)
+    talla = np.asarray(talla, dtype=float)
+    talla_m = np.where(talla > 3, talla / 100.0, talla)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        imc = peso / (talla_m ** 2)
+    return np.where((talla_m > 0) & (peso > 0) & np.isfinite(imc), imc, np.nan)
+
+
+def categorizar_imc(imc):
+    imc = np.asarray(imc, dtype=float)
+    limites = np.array([limite for limite, _ in CATEGORIAS_IMC])
+    nombres = np.array([nombre for _, nombre in CATEGORIAS_IMC] + [SIN_DATO], dtype=object)
+    indices = np.searchsorted(limites, imc, side='right')
+    indices = np.where(np.isnan(imc), len(limites), indices)
+    return nombres[indices]
+
+
+def categorizar_ta(sistolica, diastolica):
+    """Clasificación ACC/AHA 2017 de la tensión arterial."""
+    s = np.asarray(sistolica, dtype=float)
+    d = np.asarray(diastolica, dtype=float)
+    condiciones = [
+        np.isnan(s) | np.isnan(d),
+        (s > 180) | (d > 120),
+        (s >= 140) | (d >= 90),
+        (s >= 130) | (d >= 80),
+        (s >= 120),
+    ]
+    opciones = [SIN_DATO, 'Crisis Hipertensiva', 'HTA Estadio 2', 'HTA Estadio 1', 'Elevada']
+    return np.select(condiciones, opciones, default='Normal').astype(object)
+
+
+def _tiempo_cache():
+    if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return TIEMPO_CACHE_LOCAL
+    return TIEMPO_CACHE
+
+
+def _a_flotantes(valores):
+    return np.array([np.nan if v is None else v for v in valores], dtype=float)
+
+
+def serie_paciente(paciente_id):
+    """Evolución de peso, talla, IMC y tensión arterial en los historiales del paciente."""
+    clave = CLAVE_PACIENTE.format(paciente_id)
+    serie = cache.get(clave)
+    if serie is not None:
+        return serie
+
+    filas = list(
+        HistoriaGeneral.objects
+        .filter(historial_padre__paciente_id=paciente_id)
+        .order_by('historial_padre__fecha')
+        .values_list('historial_padre_id', 'historial_padre__fecha', 'peso', 'talla', 'ta')
+    )
+    peso = _a_flotantes([f[2] for f in filas])
+    talla = _a_flotantes([f[3] for f in filas])
+    ta = [parsear_ta(f[4]) for f in filas]
+    sistolica = _a_flotantes([s for s, _ in ta])
+    diastolica = _a_flotantes([d for _, d in ta])
+    imc = calcular_imc(peso, talla)
+    cat_imc = categorizar_imc(imc)
+    cat_ta = categorizar_ta(sistolica, diastolica)
+
+    serie = [
+        {
+            'historial_id': fila[0],
+            'fecha': fila[1],
+            'peso': fila[2],
+            'talla': fila[3],
+            'imc': None if np.isnan(imc[i]) else round(float(imc[i]), 1),
+            'categoria_imc': cat_imc[i],
+            'sistolica': ta[i][0],
+            'diastolica': ta[i][1],
+            'categoria_ta': cat_ta[i],
+        }
+        for i, fila in enumerate(filas)
+    ]
+    cache.set(clave, serie, _tiempo_cache())
+    return serie
+
+
+def _percentiles(valores):
+    valores = valores[~np.isnan(valores)]
+    if not len(valores):
+        return None
+    return [round(float(p), 1) for p in np.percentile(valores, PERCENTILES)]
+
+
+def _histograma(valores, bordes):
+    valores = valores[~np.isnan(valores)]
+    conteos, _ = np.histogram(valores, bins=bordes)
+    maximo = int(conteos.max()) if len(conteos) and conteos.max() else 1
+    return [
+        {'desde': float(bordes[i]), 'hasta': float(bordes[i + 1]), 'n': int(n), 'porcentaje': int(round(100.0 * n / maximo))}
+        for i, n in enumerate(conteos)
+    ]
+
+
+def _conteo_categorias(categorias, nombres):
+    total = len(categorias)
+    conteos = [int(np.count_nonzero(categorias == nombre)) for nombre in nombres]
+    return [
+        {'categoria': nombre, 'n': n, 'porcentaje': round(100.0 * n / total, 1) if total else 0.0}
+        for nombre, n in zip(nombres, conteos)
+    ]
+
+
+def distribucion_poblacional():
+    """
+    Distribuciones de IMC y tensión arterial usando la medición más reciente
+    de cada paciente, con percentiles por grupo de edad y género.
+    """
+    resultado = cache.get(CLAVE_POBLACION)
+    if resultado is not None:
+        return resultado
+
+    filas = list(
+        HistoriaGeneral.objects
+        .order_by('historial_padre__paciente_id', 'historial_padre__fecha')
+        .values_list(
+            'historial_padre__paciente_id', 'historial_padre__fecha', 'peso', 'talla', 'ta',
+            'historial_padre__paciente__fecha_nacimiento', 'historial_padre__paciente__genero',
+        )
+    )
+
+    # Última medición de cada paciente: las filas vienen ordenadas por
+    # paciente y fecha, así que es la última aparición de cada id.
+    pacientes = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    _, primeras_invertidas = np.unique(pacientes[::-1], return_index=True)
+    ultimas = np.sort(len(filas) - 1 - primeras_invertidas)
+    filas = [filas[i] for i in ultimas]
+
+    peso = _a_flotantes([f[2] for f in filas])
+    talla = _a_flotantes([f[3] for f in filas])
+    ta = [parsear_ta(f[4]) for f in filas]
+    sistolica = _a_flotantes([s for s, _ in ta])
+    diastolica = _a_flotantes([d for _, d in ta])
+    imc = calcular_imc(peso, talla)
+
+    # Edad a la fecha local de la consulta, no a la fecha UTC
+    hoy = timezone.localdate()
+    medicion = np.array([timezone.localtime(f[1]).date() if f[1] else hoy for f in filas], dtype='datetime64[D]')
+    nacimiento = np.array([f[5] if f[5] else np.datetime64('NaT') for f in filas], dtype='datetime64[D]')
+    dias = medicion - nacimiento
+    edad = np.where(np.isnat(dias), np.nan, np.floor(dias.astype(float) / 365.25))
+    minimos = np.array([minimo for _, minimo in GRUPOS_EDAD])
+    nombres_grupo = np.array([nombre for nombre, _ in GRUPOS_EDAD] + [SIN_DATO], dtype=object)
+    indice_grupo = np.where(np.isnan(edad), len(minimos), np.searchsorted(minimos, np.nan_to_num(edad), side='right') - 1)
+    grupo = nombres_grupo[indice_grupo]
+    genero = np.array([f[6] or SIN_DATO for f in filas], dtype=object)
+
+    estratos = []
+    for nombre_grupo, _ in GRUPOS_EDAD:
+        for codigo_genero in ('F', 'M'):
+            mascara = (grupo == nombre_grupo) & (genero == codigo_genero)
+            if not mascara.any():
+                continue
+            estratos.append({
+                'grupo_edad': nombre_grupo,
+                'genero': codigo_genero,
+                'n': int(mascara.sum()),
+                'imc': _percentiles(imc[mascara]),
+                'sistolica': _percentiles(sistolica[mascara]),
+                'diastolica': _percentiles(diastolica[mascara]),
+            })
+
+    resultado = {
+        'pacientes': len(filas),
+        'con_imc': int(np.count_nonzero(~np.isnan(imc))),
+        'con_ta': int(np.count_nonzero(~np.isnan(sistolica))),
+        'percentiles': PERCENTILES,
+        'imc': _percentiles(imc),
+        'sistolica': _percentiles(sistolica),
+        'diastolica': _percentiles(diastolica),
+        'histograma_imc': _histograma(imc, BORDES_IMC),
+        'histograma_sistolica': _histograma(sistolica, BORDES_SISTOLICA),
+        'categorias_imc': _conteo_categorias(categorizar_imc(imc), [n for _, n in CATEGORIAS_IMC] + [SIN_DATO]),
+        'categorias_ta': _conteo_categorias(categorizar_ta(sistolica, diastolica), CATEGORIAS_TA + [SIN_DATO]),
+        'estratos': estratos,
+    }
+    cache.set(CLAVE_POBLACION, resultado, _tiempo_cache())
+    return resultado
+
+
+def invalidar(paciente_id=None):
+    cache.delete(CLAVE_POBLACION)
+    if paciente_id:
+        cache.delete(CLAVE_PACIENTE.format(paciente_id))
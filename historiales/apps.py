@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HistorialesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'historiales'
+
+    def ready(self):
+        import historiales.signals
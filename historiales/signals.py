@@ -0,0 +1,81 @@
+import functools
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from pacientes.models import Paciente
+from .models import HistorialMedico, HistoriaGeneral, HistoriaNutricion
+from .analitica import _indice
+from . import antropometria
+
+# Datos del paciente que el índice de antecedentes guarda por historial
+CAMPOS_PACIENTE_INDICE = ('fecha_nacimiento', 'genero')
+
+
+def _marcar_al_confirmar(ids, using=None):
+    # Si se marcara antes de confirmar, un refresco de otro hilo podría
+    # descartar la marca y volver a cargar la fila vieja
+    transaction.on_commit(functools.partial(_marcar, ids), using=using)
+
+
+def _marcar(ids):
+    for historial_id in ids:
+        _indice.marcar(historial_id)
+
+
+@receiver(post_save, sender=HistorialMedico)
+@receiver(post_delete, sender=HistorialMedico)
+def marcar_historial(sender, instance, using=None, **kwargs):
+    """
+    Marca el historial para que el índice de antecedentes lo recargue
+    """
+    _marcar_al_confirmar([instance.pk], using)
+
+
+@receiver(post_save, sender=HistoriaGeneral)
+@receiver(post_save, sender=HistoriaNutricion)
+@receiver(post_delete, sender=HistoriaGeneral)
+@receiver(post_delete, sender=HistoriaNutricion)
+def marcar_formato(sender, instance, using=None, **kwargs):
+    """
+    Los formatos cambian las banderas del historial padre
+    """
+    _marcar_al_confirmar([instance.historial_padre_id], using)
+
+
+@receiver(pre_save, sender=Paciente)
+def recordar_datos_paciente(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Guarda la fecha de nacimiento y el género previos del paciente editado
+    para saber si hay que recargar sus historiales en el índice
+    """
+    instance._datos_indice = None
+    if raw or not instance.pk or (update_fields is not None and not set(update_fields) & set(CAMPOS_PACIENTE_INDICE)):
+        return
+    instance._datos_indice = Paciente.objects.filter(pk=instance.pk).values_list(*CAMPOS_PACIENTE_INDICE).first()
+
+
+@receiver(post_save, sender=Paciente)
+def marcar_historiales_paciente(sender, instance, using=None, **kwargs):
+    """
+    El grupo de edad y el género de los historiales salen del paciente
+    """
+    anterior = getattr(instance, '_datos_indice', None)
+    if anterior is None or anterior == tuple(getattr(instance, campo) for campo in CAMPOS_PACIENTE_INDICE):
+        return
+    ids = list(HistorialMedico.objects.filter(paciente_id=instance.pk).values_list('pk', flat=True))
+    if ids:
+        _marcar_al_confirmar(ids, using)
+
+
+@receiver(post_save, sender=HistoriaGeneral)
+@receiver(post_delete, sender=HistoriaGeneral)
+def invalidar_antropometria(sender, instance, **kwargs):
+    """
+    Peso, talla y TA cambiaron: se descartan las estadísticas en caché
+    """
+    paciente_id = HistorialMedico.objects.filter(
+        pk=instance.historial_padre_id
+    ).values_list('paciente_id', flat=True).first()
+    antropometria.invalidar(paciente_id)
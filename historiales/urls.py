@@ -4,7 +4,7 @@ from .views import (
     HistorialMedicoUpdateView, HistorialMedicoDeleteView,
     # Importa las nuevas vistas de documentos
     JustificativoCreateView, ReferenciaCreateView, ReposoCreateView, RecipeCreateView,
-    search,
+    search, prevalencia, reporte_antropometria,
 )
 
 app_name = 'historiales'
@@ -17,6 +17,8 @@ urlpatterns = [
     path('<int:pk>/editar/', HistorialMedicoUpdateView.as_view(), name='edit'),
     path('<int:pk>/eliminar/', HistorialMedicoDeleteView.as_view(), name='destroy'),
     path('search/', search, name='search'),
+    path('reportes/prevalencia/', prevalencia, name='prevalencia'),
+    path('reportes/antropometria/', reporte_antropometria, name='antropometria'),
 
     # --- URLs para crear documentos asociados a un historial ---
     path('<int:historial_pk>/documentos/justificativo/crear/', JustificativoCreateView.as_view(), name='justificativo_create'),
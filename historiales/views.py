@@ -7,6 +7,8 @@ from django.db.models import Q
 from django.core.paginator import Paginator
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db import transaction # Importante para guardar múltiples formularios
+from django.http import Http404, JsonResponse
+from django.contrib import messages
 
 from .models import (
     HistorialMedico, HistoriaGeneral, HistoriaNutricion,
@@ -18,7 +20,11 @@ from .forms import (
 )
 from pacientes.models import Paciente, Telefono
 from core.decorators import medico_required # Asegúrate de tener los decoradores
+from core.replicas import usar_replica
+from core.transacciones import relanzar_si_conflicto, vista_reintentable
 from django.utils.decorators import method_decorator
+from . import antropometria
+from .analitica import obtener_indice, BANDERAS, DIMENSIONES, GRUPOS_EDAD, ConsultaInvalida
 
 # --- Vista de Creación ---
 @method_decorator(medico_required, name='dispatch')
@@ -53,7 +59,12 @@ class HistorialMedicoCreateView(LoginRequiredMixin, CreateView):
         context['creating_patient'] = creating_patient
         return context
 
+    @vista_reintentable
     def form_valid(self, form):
+        # En un reintento el formulario conserva el id que le asignó el
+        # intento revertido: se vuelve a tratar como un historial nuevo
+        form.instance.pk = None
+        form.instance._state.adding = True
         context = self.get_context_data()
         general_form = context['general_form']
         creating_patient = context['creating_patient']
@@ -80,6 +91,7 @@ class HistorialMedicoCreateView(LoginRequiredMixin, CreateView):
                         es_principal=True
                     )
                 except Exception as e:
+                    relanzar_si_conflicto(e)
                     form.add_error(None, f"Error al crear el paciente: {e}")
                     return self.form_invalid(form)
 
@@ -133,6 +145,7 @@ class HistorialMedicoUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateV
         context['creating_patient'] = False
         return context
 
+    @vista_reintentable
     def form_valid(self, form):
         context = self.get_context_data()
         general_form = context['general_form']
@@ -201,6 +214,7 @@ class HistorialMedicoListView(LoginRequiredMixin, ListView):
         return HistorialMedico.objects.filter(medico=self.request.user).order_by('-fecha')
 
 @method_decorator(medico_required, name='dispatch')
+@usar_replica
 def search(request):
     query = request.GET.get('q', '')
     historiales = HistorialMedico.objects.filter(medico=request.user).order_by('-fecha')
@@ -290,4 +304,75 @@ class RecipeCreateView(DocumentoCreateViewBase):
     model = DocumentoRecipe
     form_class = DocumentoRecipeForm
     
-# Añadir vistas de Update y Delete para los documentos si es necesario...
\ No newline at end of file
+# Añadir vistas de Update y Delete para los documentos si es necesario...
+# --- Reporte de prevalencia de antecedentes ---
+
+@medico_required
+def prevalencia(request):
+    indice = obtener_indice()
+
+    todos = request.GET.getlist('todos')
+    alguno = request.GET.getlist('alguno')
+    ninguno = request.GET.getlist('ninguno')
+    por = request.GET.get('por', 'tipo_afiliado')
+    filtros = {dim: request.GET[dim] for dim in DIMENSIONES if request.GET.get(dim)}
+
+    try:
+        casos = indice.contar(todos, alguno, ninguno, filtros)
+        total = indice.contar(filtros=filtros)
+        tabla = indice.tabla_cruzada(por, todos, alguno, ninguno, filtros)
+    except ConsultaInvalida as e:
+        if request.GET.get('formato') == 'json':
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        messages.error(request, str(e))
+        casos, total, tabla = 0, 0, []
+
+    resultado = {
+        'casos': casos,
+        'total': total,
+        'prevalencia': round(100.0 * casos / total, 2) if total else 0.0,
+        'por': por,
+        'tabla': tabla,
+    }
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({'success': True, **resultado})
+
+    etiquetas = {
+        campo.name: f"{campo.verbose_name} - {modelo._meta.verbose_name}"
+        for modelo in (HistoriaGeneral, HistoriaNutricion)
+        for campo in modelo._meta.get_fields() if campo.name in BANDERAS
+    }
+    return render(request, 'historiales/prevalencia.html', {
+        **resultado,
+        'banderas': [(b, etiquetas[b]) for b in BANDERAS],
+        'dimensiones': DIMENSIONES,
+        'todos': todos,
+        'alguno': alguno,
+        'ninguno': ninguno,
+        'filtros': filtros,
+        'tipos_afiliado': HistoriaGeneral.TIPO_AFILIADO_CHOICES,
+        'grupos_edad': [nombre for nombre, _ in GRUPOS_EDAD],
+        'titulo': 'Prevalencia de Antecedentes',
+    })
+
+
+# --- Reporte antropométrico y de signos vitales ---
+
+@medico_required
+@usar_replica
+def reporte_antropometria(request):
+    paciente = None
+    serie = []
+    paciente_id = request.GET.get('paciente_id', '')
+    if paciente_id:
+        if not paciente_id.isdigit():
+            raise Http404('Paciente no encontrado.')
+        paciente = get_object_or_404(Paciente, pk=paciente_id)
+        serie = antropometria.serie_paciente(paciente.pk)
+
+    return render(request, 'historiales/antropometria.html', {
+        'poblacion': antropometria.distribucion_poblacional(),
+        'paciente': paciente,
+        'serie': serie,
+        'titulo': 'Antropometría y Signos Vitales',
+    })
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Categoria, Proveedor, Medicamento, Inventario, MovimientoInventario
+from .models import Categoria, Proveedor, Medicamento, Inventario, MovimientoInventario, AlertaCaducidad, CierreStock, PronosticoConsumo, ConsumoDiario
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -28,4 +28,26 @@ class MovimientoInventarioAdmin(admin.ModelAdmin):
     list_display = ('medicamento', 'tipo', 'cantidad', 'fecha', 'usuario')
     list_filter = ('tipo', 'fecha', 'medicamento__categoria')
     search_fields = ('medicamento__nombre', 'usuario')
-    readonly_fields = ('fecha',)
\ No newline at end of file
+    readonly_fields = ('fecha',)
+@admin.register(AlertaCaducidad)
+class AlertaCaducidadAdmin(admin.ModelAdmin):
+    list_display = ('medicamento', 'rango', 'fecha_caducidad', 'dias_para_caducar', 'cantidad', 'generado_en')
+    list_filter = ('rango',)
+    search_fields = ('medicamento__nombre', 'inventario__lote')
+
+@admin.register(CierreStock)
+class CierreStockAdmin(admin.ModelAdmin):
+    list_display = ('medicamento', 'fecha_corte', 'stock', 'entradas_mes', 'salidas_mes')
+    list_filter = ('fecha_corte',)
+    search_fields = ('medicamento__nombre', 'medicamento__codigo')
+
+@admin.register(PronosticoConsumo)
+class PronosticoConsumoAdmin(admin.ModelAdmin):
+    list_display = ('medicamento', 'consumo_diario', 'consumo_pronosticado', 'stock', 'dias_cobertura', 'punto_reorden', 'actualizado_en')
+    search_fields = ('medicamento__nombre', 'medicamento__codigo')
+
+@admin.register(ConsumoDiario)
+class ConsumoDiarioAdmin(admin.ModelAdmin):
+    list_display = ('medicamento', 'dia', 'tipo', 'cantidad', 'movimientos')
+    list_filter = ('tipo', 'dia')
+    search_fields = ('medicamento__nombre', 'medicamento__codigo')
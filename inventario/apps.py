@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventario'
+
+    def ready(self):
+        import inventario.signals
+        from core import referencias
+        from .models import Categoria, Proveedor
+        referencias.registrar(Categoria, orden=('nombre',))
+        referencias.registrar(Proveedor, orden=('nombre',))
@@ -0,0 +1,76 @@
+"""
+Escaneo de caducidad de las existencias.
+
+`escanear()` recorre solo las existencias con stock que caducan dentro del
+rango más amplio de alerta (usando el índice de `fecha_caducidad`) y
+reescribe la tabla `AlertaCaducidad`. Los conteos por rango que muestra el
+inventario salen de esa tabla con una sola consulta agrupada.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, Sum, Max
+from django.utils import timezone
+
+from core.transacciones import transaccion_reintentable
+from .models import Inventario, AlertaCaducidad, RANGOS_CADUCIDAD
+
+HORIZONTE_DIAS = max(dias for _, _, dias in RANGOS_CADUCIDAD)
+
+
+def rango_para(dias):
+    """Clave del rango de alerta para unos días hasta caducar (None si no aplica)."""
+    for clave, _, limite in RANGOS_CADUCIDAD:
+        if dias <= limite:
+            return clave
+    return None
+
+
+@transaccion_reintentable
+def escanear(hoy=None):
+    """Regenera las alertas de caducidad y devuelve cuántas se generaron."""
+    hoy = hoy or date.today()
+    ahora = timezone.now()
+    existencias = (
+        Inventario.objects
+        .filter(cantidad__gt=0, fecha_caducidad__lte=hoy + timedelta(days=HORIZONTE_DIAS))
+        .values_list('id', 'medicamento_id', 'fecha_caducidad', 'cantidad')
+    )
+    alertas = []
+    for inventario_id, medicamento_id, fecha_caducidad, cantidad in existencias.iterator():
+        dias = (fecha_caducidad - hoy).days
+        alertas.append(AlertaCaducidad(
+            inventario_id=inventario_id,
+            medicamento_id=medicamento_id,
+            rango=rango_para(dias),
+            fecha_caducidad=fecha_caducidad,
+            dias_para_caducar=dias,
+            cantidad=cantidad,
+            generado_en=ahora,
+        ))
+    AlertaCaducidad.objects.all().delete()
+    AlertaCaducidad.objects.bulk_create(alertas, batch_size=1000)
+    return len(alertas)
+
+
+def resumen_alertas():
+    """
+    Conteo de existencias y unidades por rango, en el orden de
+    RANGOS_CADUCIDAD, más la fecha del último escaneo.
+    """
+    conteos = {
+        fila['rango']: fila
+        for fila in AlertaCaducidad.objects.values('rango').annotate(
+            existencias=Count('id'), unidades=Sum('cantidad'), generado_en=Max('generado_en')
+        )
+    }
+    rangos = [
+        {
+            'clave': clave,
+            'etiqueta': etiqueta,
+            'existencias': conteos.get(clave, {}).get('existencias', 0),
+            'unidades': conteos.get(clave, {}).get('unidades') or 0,
+        }
+        for clave, etiqueta, _ in RANGOS_CADUCIDAD
+    ]
+    generado_en = max((fila['generado_en'] for fila in conteos.values()), default=None)
+    return {'rangos': rangos, 'generado_en': generado_en}
@@ -0,0 +1,210 @@
+"""
+Cierres mensuales de stock y consultas de stock a una fecha.
+
+El stock de un medicamento en un instante es el saldo del cierre más
+cercano anterior a ese instante más las entradas y salidas ocurridas desde
+ese cierre. Así un reporte histórico solo suma los movimientos de a lo sumo
+un mes, en lugar de todo el historial.
+
+Como `MovimientoInventario.fecha` se asigna al crear el movimiento, un
+movimiento nuevo nunca cae en un mes ya cerrado. Editar o eliminar un
+movimiento anterior (p. ej. desde el admin) sí altera los cierres: las
+señales de inventario llaman a `ajustar_cierres`, que corrige en la misma
+transacción el mes del movimiento y los saldos de todos los cortes
+posteriores.
+"""
+import datetime
+
+from django.db.models import Sum, Q, Max, Min, F
+from django.utils import timezone
+
+from core.transacciones import transaccion_reintentable
+from .models import MovimientoInventario, CierreStock
+
+
+def inicio_mes(momento):
+    """Primer instante (en la zona horaria local) del mes de `momento`."""
+    local = timezone.localtime(momento)
+    return timezone.make_aware(datetime.datetime(local.year, local.month, 1))
+
+
+def mes_siguiente(corte):
+    local = timezone.localtime(corte)
+    anio, mes = (local.year + 1, 1) if local.month == 12 else (local.year, local.month + 1)
+    return timezone.make_aware(datetime.datetime(anio, mes, 1))
+
+
+def _movimientos_entre(desde, hasta, medicamentos=None):
+    """{medicamento_id: (entradas, salidas)} de los movimientos en [desde, hasta)."""
+    movimientos = MovimientoInventario.objects.filter(fecha__lt=hasta)
+    if desde is not None:
+        movimientos = movimientos.filter(fecha__gte=desde)
+    if medicamentos is not None:
+        movimientos = movimientos.filter(medicamento_id__in=medicamentos)
+    totales = movimientos.values('medicamento_id').annotate(
+        entradas=Sum('cantidad', filter=Q(tipo='entrada')),
+        salidas=Sum('cantidad', filter=Q(tipo='salida')),
+    )
+    return {
+        fila['medicamento_id']: (fila['entradas'] or 0, fila['salidas'] or 0)
+        for fila in totales
+    }
+
+
+def ajustar_cierres(movimientos, signo=1):
+    """
+    Suma (o resta, con `signo=-1`) movimientos ya registrados a los cierres
+    guardados después de su fecha. Lo usan las señales al editar o eliminar
+    un movimiento.
+    """
+    corte = ultimo_corte()
+    for movimiento in movimientos:
+        if corte is None or corte <= movimiento.fecha:
+            continue
+        cierres = CierreStock.objects.filter(medicamento_id=movimiento.medicamento_id, fecha_corte__gt=movimiento.fecha)
+        # Un medicamento sin historia en esos meses no tiene filas de cierre
+        cortes = CierreStock.objects.filter(fecha_corte__gt=movimiento.fecha).values_list('fecha_corte', flat=True).distinct()
+        faltantes = set(cortes) - set(cierres.values_list('fecha_corte', flat=True))
+        CierreStock.objects.bulk_create(
+            [CierreStock(medicamento_id=movimiento.medicamento_id, fecha_corte=f, stock=0) for f in faltantes],
+            ignore_conflicts=True,
+        )
+        cantidad = signo * movimiento.cantidad
+        cierres.update(stock=F('stock') + (cantidad if movimiento.tipo == 'entrada' else -cantidad))
+        del_mes = cierres.filter(fecha_corte=mes_siguiente(inicio_mes(movimiento.fecha)))
+        if movimiento.tipo == 'entrada':
+            del_mes.update(entradas_mes=F('entradas_mes') + cantidad)
+        else:
+            del_mes.update(salidas_mes=F('salidas_mes') + cantidad)
+
+
+def ultimo_corte(antes_de=None):
+    cierres = CierreStock.objects.all()
+    if antes_de is not None:
+        cierres = cierres.filter(fecha_corte__lte=antes_de)
+    return cierres.aggregate(corte=Max('fecha_corte'))['corte']
+
+
+def stock_en(momento, medicamentos=None):
+    """
+    Stock de cada medicamento considerando los movimientos anteriores a
+    `momento`. Devuelve {medicamento_id: stock}; los medicamentos sin
+    movimientos no aparecen (su stock es 0).
+    """
+    corte = ultimo_corte(momento)
+    saldos = {}
+    if corte is not None:
+        cierres = CierreStock.objects.filter(fecha_corte=corte)
+        if medicamentos is not None:
+            cierres = cierres.filter(medicamento_id__in=medicamentos)
+        saldos = dict(cierres.values_list('medicamento_id', 'stock'))
+    for medicamento_id, (entradas, salidas) in _movimientos_entre(corte, momento, medicamentos).items():
+        saldos[medicamento_id] = saldos.get(medicamento_id, 0) + entradas - salidas
+    return saldos
+
+
+def asignar_stock(medicamentos):
+    """
+    Asigna el stock actual a una lista de medicamentos con una sola llamada
+    a `stock_en`, para que `stock_actual` y `estado_stock` no consulten la
+    base por cada uno. Devuelve la lista.
+    """
+    medicamentos = list(medicamentos)
+    saldos = stock_en(timezone.now(), [medicamento.pk for medicamento in medicamentos])
+    for medicamento in medicamentos:
+        medicamento._stock = saldos.get(medicamento.pk, 0)
+    return medicamentos
+
+
+def stock_al_dia(fecha, medicamentos=None):
+    """Stock al final del día `fecha` (zona horaria local)."""
+    fin_del_dia = timezone.make_aware(datetime.datetime.combine(fecha + datetime.timedelta(days=1), datetime.time.min))
+    return stock_en(fin_del_dia, medicamentos)
+
+
+@transaccion_reintentable
+def generar_cierres(rehacer=False):
+    """
+    Genera los cierres de los meses completos que falten, encadenando cada
+    mes sobre el anterior. Con `rehacer=True` borra y recalcula todos.
+    Devuelve la cantidad de meses cerrados.
+    """
+    if rehacer:
+        CierreStock.objects.all().delete()
+
+    corte = ultimo_corte()
+    if corte is None:
+        primero = MovimientoInventario.objects.aggregate(fecha=Min('fecha'))['fecha']
+        if primero is None:
+            return 0
+        anterior, siguiente = None, mes_siguiente(inicio_mes(primero))
+        saldos = {}
+    else:
+        anterior, siguiente = corte, mes_siguiente(corte)
+        saldos = dict(CierreStock.objects.filter(fecha_corte=corte).values_list('medicamento_id', 'stock'))
+
+    limite = inicio_mes(timezone.now())
+    meses = 0
+    while siguiente <= limite:
+        movimientos = _movimientos_entre(anterior, siguiente)
+        cierres = []
+        for medicamento_id in set(saldos) | set(movimientos):
+            entradas, salidas = movimientos.get(medicamento_id, (0, 0))
+            saldos[medicamento_id] = saldos.get(medicamento_id, 0) + entradas - salidas
+            cierres.append(CierreStock(
+                medicamento_id=medicamento_id,
+                fecha_corte=siguiente,
+                stock=saldos[medicamento_id],
+                entradas_mes=entradas,
+                salidas_mes=salidas,
+            ))
+        CierreStock.objects.bulk_create(cierres, batch_size=1000)
+        anterior, siguiente = siguiente, mes_siguiente(siguiente)
+        meses += 1
+    return meses
+
+
+def verificar_anio(anio):
+    """
+    Comprueba que los cierres mensuales de `anio` cuadran con los
+    movimientos: cada cierre debe ser el anterior más las entradas menos las
+    salidas del mes. Devuelve la lista de diferencias encontradas (vacía si
+    todo cuadra); es el requisito para archivar los movimientos de ese año.
+    """
+    desde = timezone.make_aware(datetime.datetime(anio, 1, 1))
+    hasta = timezone.make_aware(datetime.datetime(anio + 1, 1, 1))
+    if not CierreStock.objects.filter(fecha_corte=hasta).exists():
+        return [f'No existe el cierre al {hasta:%d/%m/%Y}; ejecute generar_cierres_stock']
+
+    if CierreStock.objects.filter(fecha_corte=desde).exists():
+        saldos = dict(CierreStock.objects.filter(fecha_corte=desde).values_list('medicamento_id', 'stock'))
+    else:
+        saldos = {
+            medicamento_id: entradas - salidas
+            for medicamento_id, (entradas, salidas) in _movimientos_entre(None, desde).items()
+        }
+
+    diferencias = []
+    anterior = desde
+    while anterior < hasta:
+        corte = mes_siguiente(anterior)
+        movimientos = _movimientos_entre(anterior, corte)
+        guardados = {
+            cierre.medicamento_id: cierre
+            for cierre in CierreStock.objects.filter(fecha_corte=corte)
+        }
+        for medicamento_id in set(saldos) | set(movimientos) | set(guardados):
+            entradas, salidas = movimientos.get(medicamento_id, (0, 0))
+            saldos[medicamento_id] = saldos.get(medicamento_id, 0) + entradas - salidas
+            cierre = guardados.get(medicamento_id)
+            esperado = (saldos[medicamento_id], entradas, salidas)
+            if cierre is None:
+                if esperado != (0, 0, 0):
+                    diferencias.append(f'{corte:%d/%m/%Y}: falta el cierre del medicamento {medicamento_id}')
+            elif (cierre.stock, cierre.entradas_mes, cierre.salidas_mes) != esperado:
+                diferencias.append(
+                    f'{corte:%d/%m/%Y}: el cierre del medicamento {medicamento_id} registra '
+                    f'{cierre.stock} y los movimientos dan {saldos[medicamento_id]}'
+                )
+        anterior = corte
+    return diferencias
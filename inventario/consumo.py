@@ -0,0 +1,124 @@
+"""
+Acumulado diario de movimientos (`ConsumoDiario`) y reportes de consumo.
+
+Cada movimiento suma su cantidad a la fila (medicamento, día, tipo)
+correspondiente dentro de la misma transacción en que se registra, así que
+los reportes semanales, mensuales y de más dispensados leen una tabla de a
+lo sumo medicamentos × días × 2 filas en lugar de recorrer todo el libro de
+movimientos.
+"""
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum, Count, F
+from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.utils import timezone
+
+from core.transacciones import transaccion_reintentable
+from .models import ConsumoDiario, MovimientoInventario
+
+PERIODOS = {
+    'dia': None,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+}
+
+
+def _clave(movimiento):
+    return (movimiento.medicamento_id, timezone.localdate(movimiento.fecha), movimiento.tipo)
+
+
+def aplicar(deltas):
+    """
+    Suma a la tabla acumulada los `deltas`: {(medicamento_id, dia, tipo):
+    (cantidad, movimientos)}. Los valores pueden ser negativos (bajas).
+    """
+    for (medicamento_id, dia, tipo), (cantidad, movimientos) in deltas.items():
+        if not cantidad and not movimientos:
+            continue
+        filtro = ConsumoDiario.objects.filter(medicamento_id=medicamento_id, dia=dia, tipo=tipo)
+        cambios = {'cantidad': F('cantidad') + cantidad, 'movimientos': F('movimientos') + movimientos}
+        if filtro.update(**cambios):
+            continue
+        try:
+            with transaction.atomic():
+                ConsumoDiario.objects.create(
+                    medicamento_id=medicamento_id, dia=dia, tipo=tipo,
+                    cantidad=cantidad, movimientos=movimientos,
+                )
+        except IntegrityError:
+            # Otra transacción creó la fila entre el update y el insert
+            filtro.update(**cambios)
+
+
+def registrar_movimientos(movimientos, signo=1):
+    """
+    Actualiza el acumulado para una lista de movimientos. Lo usan las
+    señales y las cargas masivas con bulk_create (que no disparan señales).
+    """
+    cantidades = Counter()
+    conteos = Counter()
+    for movimiento in movimientos:
+        clave = _clave(movimiento)
+        cantidades[clave] += signo * movimiento.cantidad
+        conteos[clave] += signo
+    aplicar({clave: (cantidades[clave], conteos[clave]) for clave in cantidades})
+
+
+@transaccion_reintentable
+def reconstruir(desde=None):
+    """
+    Recalcula el acumulado desde el libro de movimientos (todo, o a partir
+    del día `desde`). Devuelve la cantidad de filas generadas.
+    """
+    movimientos = MovimientoInventario.objects.all()
+    acumulados = ConsumoDiario.objects.all()
+    if desde:
+        inicio = timezone.make_aware(datetime.datetime.combine(desde, datetime.time.min))
+        movimientos = movimientos.filter(fecha__gte=inicio)
+        acumulados = acumulados.filter(dia__gte=desde)
+    filas = (
+        movimientos
+        .annotate(dia=TruncDate('fecha'))
+        .values('medicamento_id', 'dia', 'tipo')
+        .annotate(total=Sum('cantidad'), n=Count('id'))
+        .values_list('medicamento_id', 'dia', 'tipo', 'total', 'n')
+    )
+    acumulados.delete()
+    nuevos = ConsumoDiario.objects.bulk_create(
+        [
+            ConsumoDiario(medicamento_id=m, dia=dia, tipo=tipo, cantidad=total, movimientos=n)
+            for m, dia, tipo, total, n in filas
+        ],
+        batch_size=2000,
+    )
+    return len(nuevos)
+
+
+# --- Reportes ---
+
+def consumo_por_periodo(desde, hasta, periodo='semana', tipo='salida', medicamento_id=None):
+    """Unidades y movimientos por período entre `desde` y `hasta` (inclusive)."""
+    consumos = ConsumoDiario.objects.filter(tipo=tipo, dia__gte=desde, dia__lte=hasta)
+    if medicamento_id:
+        consumos = consumos.filter(medicamento_id=medicamento_id)
+    truncar = PERIODOS[periodo]
+    agrupador = truncar('dia') if truncar else F('dia')
+    return list(
+        consumos.annotate(periodo=agrupador)
+        .values('periodo')
+        .annotate(unidades=Sum('cantidad'), movimientos=Sum('movimientos'))
+        .order_by('periodo')
+    )
+
+
+def mas_dispensados(desde, hasta, limite=10):
+    """Medicamentos con más unidades dispensadas (salidas) en el rango."""
+    return list(
+        ConsumoDiario.objects
+        .filter(tipo='salida', dia__gte=desde, dia__lte=hasta)
+        .values('medicamento_id', 'medicamento__nombre', 'medicamento__codigo')
+        .annotate(unidades=Sum('cantidad'), movimientos=Sum('movimientos'))
+        .order_by('-unidades')[:limite]
+    )
@@ -1,5 +1,7 @@
 from django import forms
 from django.core.validators import RegexValidator
+from core.importacion import EXTENSIONES_PERMITIDAS
+from core.referencias import ReferenciaChoiceField
 from .models import Categoria, Proveedor, Medicamento, Inventario
 
 class CategoriaForm(forms.ModelForm):
@@ -49,6 +51,7 @@ class MedicamentoForm(forms.ModelForm):
     class Meta:
         model = Medicamento
         fields = ['nombre', 'descripcion', 'categoria', 'proveedor', 'stock_minimo']
+        field_classes = {'categoria': ReferenciaChoiceField, 'proveedor': ReferenciaChoiceField}
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control'}),
             'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -87,11 +90,35 @@ class InventarioForm(forms.ModelForm):
             raise forms.ValidationError("La fecha de caducidad no puede ser anterior a la fecha actual.")
         return fecha_caducidad
 
+class IngresoLotesForm(forms.Form):
+    archivo = forms.FileField(
+        label="Nota de entrega (CSV o Excel)",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+        help_text="Columnas: codigo, cantidad, fecha_caducidad, lote"
+    )
+    simular = forms.BooleanField(
+        required=False,
+        label="Solo validar (no guardar)",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    descargar_reporte = forms.BooleanField(
+        required=False,
+        label="Descargar el reporte de errores en CSV",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data.get('archivo')
+        if archivo and not archivo.name.lower().endswith(EXTENSIONES_PERMITIDAS):
+            raise forms.ValidationError('Formato no soportado. Use un archivo .csv o .xlsx.')
+        return archivo
+
 # Formulario simplificado para el modal de creación rápida
 class MedicamentoModalForm(forms.ModelForm):
     class Meta:
         model = Medicamento
         fields = ['nombre', 'categoria', 'proveedor']
+        field_classes = {'categoria': ReferenciaChoiceField, 'proveedor': ReferenciaChoiceField}
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control'}),
             'categoria': forms.Select(attrs={'class': 'form-control'}),
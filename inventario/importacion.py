@@ -0,0 +1,201 @@
+"""
+Ingreso masivo de lotes desde la nota de entrega de un proveedor (CSV/XLSX).
+
+Los medicamentos se resuelven por `codigo` contra un mapa cargado una sola
+vez al inicio (una consulta para todo el archivo). Cada fila se valida
+(cantidad entera positiva, fecha de caducidad no vencida, lote no repetido
+dentro del archivo) y las válidas se insertan juntas: las existencias de
+`Inventario` y sus movimientos de entrada con `bulk_create`, en una sola
+transacción. Como `bulk_create` no dispara señales, el acumulado diario de
+consumo se actualiza explícitamente. Las filas rechazadas se devuelven con
+el número de fila y el motivo.
+
+Columnas reconocidas (encabezados sin distinguir mayúsculas ni acentos):
+codigo, cantidad, fecha_caducidad | vencimiento, lote.
+"""
+import csv
+import datetime
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+
+from core import auditoria
+from core.importacion import leer_filas
+from core.transacciones import transaccion_reintentable
+from . import consumo
+from .models import Medicamento, Inventario, MovimientoInventario
+
+ALIAS_COLUMNAS = {
+    'codigo_medicamento': 'codigo',
+    'cod': 'codigo',
+    'unidades': 'cantidad',
+    'vencimiento': 'fecha_caducidad',
+    'fecha_vencimiento': 'fecha_caducidad',
+    'fecha_de_vencimiento': 'fecha_caducidad',
+    'fecha_de_caducidad': 'fecha_caducidad',
+    'caducidad': 'fecha_caducidad',
+    'numero_lote': 'lote',
+    'nro_lote': 'lote',
+}
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%m/%Y')
+
+LONGITUD_LOTE = Inventario._meta.get_field('lote').max_length
+
+
+@dataclass
+class ResultadoIngreso:
+    leidas: int = 0
+    creados: int = 0
+    unidades: int = 0
+    errores: list = field(default_factory=list)
+
+    def agregar_error(self, fila, codigo, mensaje):
+        self.errores.append({'fila': fila, 'codigo': codigo or '', 'error': mensaje})
+
+    def escribir_reporte(self, salida):
+        """Escribe los errores como CSV en un archivo de texto abierto."""
+        escritor = csv.DictWriter(salida, fieldnames=['fila', 'codigo', 'error'])
+        escritor.writeheader()
+        escritor.writerows(self.errores)
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip() or None
+
+
+def _cantidad(valor):
+    try:
+        numero = float(str(valor).strip().replace(',', '.'))
+    except ValueError:
+        numero = None
+    if numero is None or not numero.is_integer():
+        raise ValidationError(f"Cantidad inválida: '{valor}'.")
+    cantidad = int(numero)
+    if cantidad <= 0:
+        raise ValidationError('La cantidad debe ser mayor que cero.')
+    return cantidad
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    for formato in FORMATOS_FECHA:
+        try:
+            fecha = datetime.datetime.strptime(str(valor).strip(), formato).date()
+        except ValueError:
+            continue
+        if formato == '%m/%Y':
+            # Vencimiento expresado solo con mes y año: vence el último día del mes
+            siguiente = (fecha.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+            fecha = siguiente - datetime.timedelta(days=1)
+        return fecha
+    raise ValidationError(f"Fecha de caducidad inválida: '{valor}'.")
+
+
+def _validar(fila, codigos, hoy):
+    """Convierte una fila en los datos del lote o lanza ValidationError."""
+    datos = {ALIAS_COLUMNAS.get(k, k): v for k, v in fila.items()}
+    errores = []
+
+    codigo = _texto(datos.get('codigo'))
+    medicamento_id = None
+    if not codigo:
+        errores.append('Falta el código del medicamento.')
+    else:
+        medicamento_id = codigos.get(codigo.upper())
+        if medicamento_id is None:
+            errores.append(f"No existe un medicamento con código '{codigo}'.")
+
+    cantidad = None
+    if datos.get('cantidad') is None:
+        errores.append('Falta la cantidad.')
+    else:
+        try:
+            cantidad = _cantidad(datos['cantidad'])
+        except ValidationError as e:
+            errores.extend(e.messages)
+
+    fecha_caducidad = None
+    if datos.get('fecha_caducidad') is None:
+        errores.append('Falta la fecha de caducidad.')
+    else:
+        try:
+            fecha_caducidad = _fecha(datos['fecha_caducidad'])
+            if fecha_caducidad < hoy:
+                errores.append('La fecha de caducidad no puede ser anterior a la fecha actual.')
+        except ValidationError as e:
+            errores.extend(e.messages)
+
+    lote = _texto(datos.get('lote'))
+    if lote and len(lote) > LONGITUD_LOTE:
+        errores.append(f'El lote debe tener a lo sumo {LONGITUD_LOTE} caracteres.')
+
+    if errores:
+        raise ValidationError(errores)
+
+    return {
+        'medicamento_id': medicamento_id,
+        'cantidad': cantidad,
+        'fecha_caducidad': fecha_caducidad,
+        'lote': lote,
+    }
+
+
+@transaccion_reintentable
+def _insertar(validas, usuario):
+    existencias = Inventario.objects.bulk_create([Inventario(**datos) for datos in validas])
+    movimientos = MovimientoInventario.objects.bulk_create([
+        MovimientoInventario(
+            medicamento_id=existencia.medicamento_id,
+            tipo='entrada',
+            cantidad=existencia.cantidad,
+            descripcion=f"Ingreso de lote #{existencia.lote}",
+            usuario=usuario,
+        )
+        for existencia in existencias
+    ])
+    consumo.registrar_movimientos(movimientos)
+    auditoria.registrar_objetos(existencias, auditoria.CREADO)
+    return len(existencias)
+
+
+def ingresar_lotes(archivo, nombre, usuario, simular=False):
+    """
+    Registra los lotes del archivo y devuelve un ResultadoIngreso. Con
+    `simular=True` solo valida y reporta, sin escribir en la base.
+    """
+    resultado = ResultadoIngreso()
+    codigos = {codigo.upper(): pk for pk, codigo in Medicamento.objects.values_list('id', 'codigo')}
+    hoy = datetime.date.today()
+
+    validas = []
+    vistos = {}
+    for numero, fila in leer_filas(archivo, nombre):
+        resultado.leidas += 1
+        codigo = _texto(fila.get('codigo') or fila.get('codigo_medicamento') or fila.get('cod'))
+        try:
+            datos = _validar(fila, codigos, hoy)
+        except ValidationError as e:
+            resultado.agregar_error(numero, codigo, ' '.join(e.messages))
+            continue
+        if datos['lote']:
+            clave = (datos['medicamento_id'], datos['lote'])
+            if clave in vistos:
+                resultado.agregar_error(numero, codigo, f"El lote '{datos['lote']}' ya figura en la fila {vistos[clave]}.")
+                continue
+            vistos[clave] = numero
+        validas.append(datos)
+        resultado.unidades += datos['cantidad']
+
+    if validas and not simular:
+        resultado.creados = _insertar(validas, usuario)
+    else:
+        resultado.creados = len(validas)
+    return resultado
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.pronostico import actualizar_pronosticos, PLAZO_ENTREGA_DIAS, VENTANA_DIAS
+
+class Command(BaseCommand):
+    help = 'Recalcula el pronóstico de consumo y el punto de reorden de cada medicamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plazo', type=int, default=PLAZO_ENTREGA_DIAS, help='Plazo de entrega del proveedor en días')
+        parser.add_argument('--ventana', type=int, default=VENTANA_DIAS, help='Días de historial a considerar')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        total = actualizar_pronosticos(plazo=options['plazo'], ventana=options['ventana'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Pronóstico actualizado para {total} medicamentos en {time.monotonic() - inicio:.1f}s'
+        ))
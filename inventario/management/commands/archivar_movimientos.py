@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.cierres import verificar_anio
+from inventario.particiones import archivar_anio, anios_archivables, disponible
+
+class Command(BaseCommand):
+    help = ('Archiva los movimientos de inventario de años cerrados en una partición anual, '
+            'previa verificación de los cierres de stock del año')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, action='append', help='Año a archivar (repetible; por defecto todos los cerrados)')
+        parser.add_argument('--tablespace', help='Tablespace de destino para las particiones archivadas')
+        parser.add_argument('--solo-verificar', action='store_true', help='Solo verifica los cierres, sin archivar')
+
+    def handle(self, *args, **options):
+        particionada = disponible()
+        if not particionada and not options['solo_verificar']:
+            raise CommandError('La tabla de movimientos no está particionada en esta base de datos')
+
+        anios = options['anio'] or anios_archivables()
+        if not anios:
+            self.stdout.write(self.style.NOTICE('No hay años cerrados pendientes de archivar'))
+            return
+
+        for anio in sorted(anios):
+            diferencias = verificar_anio(anio)
+            if diferencias:
+                for diferencia in diferencias[:20]:
+                    self.stderr.write(f'  {diferencia}')
+                raise CommandError(
+                    f'Los cierres de {anio} no cuadran con los movimientos ({len(diferencias)} diferencias); '
+                    'ejecute generar_cierres_stock --rehacer antes de archivar'
+                )
+            if options['solo_verificar']:
+                self.stdout.write(self.style.SUCCESS(f'{anio}: cierres verificados'))
+                continue
+
+            inicio = time.monotonic()
+            filas = archivar_anio(anio, tablespace=options['tablespace'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{anio}: {filas} movimientos archivados en {time.monotonic() - inicio:.1f}s'
+            ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from inventario.caducidad import escanear, resumen_alertas
+
+class Command(BaseCommand):
+    help = 'Genera las alertas de caducidad del inventario (programar diariamente)'
+
+    def handle(self, *args, **options):
+        total = escanear()
+        for rango in resumen_alertas()['rangos']:
+            self.stdout.write(f"{rango['etiqueta']}: {rango['existencias']} existencias ({rango['unidades']} unidades)")
+        self.stdout.write(self.style.SUCCESS(f'{total} alertas de caducidad generadas'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventario.cierres import generar_cierres, ultimo_corte
+
+class Command(BaseCommand):
+    help = 'Genera los cierres mensuales de stock por medicamento (programar a inicio de cada mes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rehacer', action='store_true', help='Borra y recalcula todos los cierres')
+
+    def handle(self, *args, **options):
+        meses = generar_cierres(rehacer=options['rehacer'])
+        corte = ultimo_corte()
+        if corte:
+            self.stdout.write(self.style.SUCCESS(f'{meses} meses cerrados. Último corte: {corte:%d/%m/%Y}'))
+        else:
+            self.stdout.write(self.style.NOTICE('No hay movimientos de inventario para cerrar'))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import ArchivoInvalido
+from inventario.importacion import ingresar_lotes
+
+class Command(BaseCommand):
+    help = 'Registra los lotes de una nota de entrega (CSV o XLSX) con sus movimientos de entrada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--usuario', default='sistema', help='Usuario que figura en los movimientos')
+        parser.add_argument('--simular', action='store_true', help='Solo valida, sin guardar')
+        parser.add_argument('--reporte', help='Ruta del CSV donde escribir las filas rechazadas')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = ingresar_lotes(
+                    archivo, options['archivo'], options['usuario'], simular=options['simular'],
+                )
+        except (OSError, ArchivoInvalido) as e:
+            raise CommandError(str(e))
+        duracion = time.monotonic() - inicio
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                resultado.escribir_reporte(salida)
+        else:
+            for error in resultado.errores[:50]:
+                self.stdout.write(self.style.WARNING(f"Fila {error['fila']} ({error['codigo']}): {error['error']}"))
+            if len(resultado.errores) > 50:
+                self.stdout.write(self.style.NOTICE(f'... y {len(resultado.errores) - 50} errores más (use --reporte)'))
+
+        accion = 'válidos' if options['simular'] else 'registrados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.leidas} filas leídas, {resultado.creados} lotes {accion} '
+            f'({resultado.unidades} unidades), {len(resultado.errores)} filas rechazadas en {duracion:.1f}s'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from inventario.particiones import asegurar_particiones, disponible, MESES_ADELANTE
+
+class Command(BaseCommand):
+    help = 'Crea las particiones mensuales de los movimientos de inventario para los próximos meses (programar mensualmente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=MESES_ADELANTE, help='Meses por adelantado a crear')
+
+    def handle(self, *args, **options):
+        if not disponible():
+            self.stdout.write(self.style.NOTICE('La tabla de movimientos no está particionada en esta base de datos'))
+            return
+        creadas = asegurar_particiones(options['meses'])
+        for nombre in creadas:
+            self.stdout.write(f'  {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'{len(creadas)} particiones creadas'))
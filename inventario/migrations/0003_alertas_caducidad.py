@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_remove_medicamento_precio_unitario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaCaducidad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rango', models.CharField(choices=[('caducado', 'Caducado'), ('7_dias', 'Caduca en 7 días o menos'), ('30_dias', 'Caduca en 30 días o menos'), ('90_dias', 'Caduca en 90 días o menos')], max_length=10)),
+                ('fecha_caducidad', models.DateField()),
+                ('dias_para_caducar', models.IntegerField()),
+                ('cantidad', models.IntegerField()),
+                ('generado_en', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Alerta de Caducidad',
+                'verbose_name_plural': 'Alertas de Caducidad',
+                'db_table': 'inventario_alertas_caducidad',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['fecha_caducidad'], name='inventario__fecha_c_d35f5d_idx'),
+        ),
+        migrations.AddField(
+            model_name='alertacaducidad',
+            name='inventario',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='alerta_caducidad', to='inventario.inventario'),
+        ),
+        migrations.AddField(
+            model_name='alertacaducidad',
+            name='medicamento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventario.medicamento'),
+        ),
+        migrations.AddIndex(
+            model_name='alertacaducidad',
+            index=models.Index(fields=['rango', 'fecha_caducidad'], name='inventario__rango_22e5b8_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_alertas_caducidad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_corte', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+                ('entradas_mes', models.IntegerField(default=0)),
+                ('salidas_mes', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cierre de Stock',
+                'verbose_name_plural': 'Cierres de Stock',
+                'db_table': 'inventario_cierres_stock',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['medicamento', 'fecha'], name='inventario__medicam_e5a24f_idx'),
+        ),
+        migrations.AddField(
+            model_name='cierrestock',
+            name='medicamento',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cierres', to='inventario.medicamento'),
+        ),
+        migrations.AddIndex(
+            model_name='cierrestock',
+            index=models.Index(fields=['fecha_corte'], name='inventario__fecha_c_1dd3d6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cierrestock',
+            unique_together={('medicamento', 'fecha_corte')},
+        ),
+    ]
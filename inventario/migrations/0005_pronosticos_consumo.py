@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0004_cierres_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoConsumo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumo_diario', models.FloatField(help_text='Promedio móvil de unidades dispensadas por día')),
+                ('consumo_pronosticado', models.FloatField(help_text='Consumo diario esperado para la próxima semana, con estacionalidad semanal')),
+                ('desviacion_diaria', models.FloatField(default=0)),
+                ('stock', models.IntegerField(help_text='Stock al momento del cálculo')),
+                ('dias_cobertura', models.FloatField(blank=True, help_text='Vacío si no hay consumo', null=True)),
+                ('fecha_agotamiento', models.DateField(blank=True, null=True)),
+                ('punto_reorden', models.IntegerField(help_text='Stock mínimo sugerido')),
+                ('actualizado_en', models.DateTimeField()),
+                ('medicamento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pronostico', to='inventario.medicamento')),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de Consumo',
+                'verbose_name_plural': 'Pronósticos de Consumo',
+                'db_table': 'inventario_pronosticos',
+            },
+        ),
+    ]
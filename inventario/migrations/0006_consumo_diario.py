@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_pronosticos_consumo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('movimientos', models.IntegerField(default=0)),
+                ('medicamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos_diarios', to='inventario.medicamento')),
+            ],
+            options={
+                'verbose_name': 'Consumo Diario',
+                'verbose_name_plural': 'Consumos Diarios',
+                'db_table': 'inventario_consumo_diario',
+                'indexes': [models.Index(fields=['tipo', 'dia'], name='inventario__tipo_8d083d_idx')],
+                'unique_together': {('medicamento', 'dia', 'tipo')},
+            },
+        ),
+    ]
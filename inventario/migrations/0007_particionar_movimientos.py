@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.db import migrations
+
+# Convierte inventario_movimientos en una tabla particionada por rango mensual
+# sobre `fecha` (solo PostgreSQL; en otros motores no hace nada). La llave
+# primaria pasa a ser (id, fecha) porque PostgreSQL exige que incluya la
+# columna de partición; `id` sigue siendo único porque lo asigna la identidad.
+# Las filas que no caigan en ninguna partición mensual van a la partición
+# por defecto hasta que `particionar_movimientos` cree la que corresponda.
+# Los meses se cortan en la zona horaria del proyecto, igual que los cierres
+# de stock.
+
+PARTICIONAR = """
+DO $$
+DECLARE
+    mes timestamptz;
+    limite timestamptz;
+    definicion record;
+BEGIN
+    ALTER TABLE inventario_movimientos RENAME TO inventario_movimientos_old;
+
+    CREATE TABLE inventario_movimientos (
+        LIKE inventario_movimientos_old INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS
+    ) PARTITION BY RANGE (fecha);
+
+    CREATE TABLE inventario_movimientos_default PARTITION OF inventario_movimientos DEFAULT;
+
+    SELECT date_trunc('month', COALESCE(min(fecha), now())) INTO mes FROM inventario_movimientos_old;
+    limite := date_trunc('month', now()) + interval '3 months';
+    WHILE mes <= limite LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF inventario_movimientos FOR VALUES FROM (%L) TO (%L)',
+            'inventario_movimientos_p' || to_char(mes, 'YYYY_MM'), mes, mes + interval '1 month'
+        );
+        mes := mes + interval '1 month';
+    END LOOP;
+
+    INSERT INTO inventario_movimientos SELECT * FROM inventario_movimientos_old;
+    PERFORM setval(
+        pg_get_serial_sequence('inventario_movimientos', 'id'),
+        COALESCE((SELECT max(id) FROM inventario_movimientos), 0) + 1,
+        false
+    );
+
+    CREATE TEMP TABLE _definiciones ON COMMIT DROP AS
+        SELECT indexdef AS sql FROM pg_indexes
+        WHERE tablename = 'inventario_movimientos_old' AND indexname <> 'inventario_movimientos_pkey'
+        UNION ALL
+        SELECT format('ALTER TABLE inventario_movimientos ADD CONSTRAINT %I %s', conname, pg_get_constraintdef(oid))
+        FROM pg_constraint
+        WHERE conrelid = 'inventario_movimientos_old'::regclass AND contype = 'f';
+
+    DROP TABLE inventario_movimientos_old;
+
+    ALTER TABLE inventario_movimientos ADD CONSTRAINT inventario_movimientos_pkey PRIMARY KEY (id, fecha);
+    FOR definicion IN SELECT sql FROM _definiciones LOOP
+        EXECUTE replace(definicion.sql, 'inventario_movimientos_old', 'inventario_movimientos');
+    END LOOP;
+END
+$$;
+"""
+
+DESPARTICIONAR = """
+DO $$
+DECLARE
+    definicion record;
+BEGIN
+    ALTER TABLE inventario_movimientos RENAME TO inventario_movimientos_part;
+
+    CREATE TABLE inventario_movimientos (
+        LIKE inventario_movimientos_part INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS
+    );
+    INSERT INTO inventario_movimientos SELECT * FROM inventario_movimientos_part;
+    PERFORM setval(
+        pg_get_serial_sequence('inventario_movimientos', 'id'),
+        COALESCE((SELECT max(id) FROM inventario_movimientos), 0) + 1,
+        false
+    );
+
+    CREATE TEMP TABLE _definiciones ON COMMIT DROP AS
+        SELECT indexdef AS sql FROM pg_indexes
+        WHERE tablename = 'inventario_movimientos_part' AND indexname <> 'inventario_movimientos_pkey'
+        UNION ALL
+        SELECT format('ALTER TABLE inventario_movimientos ADD CONSTRAINT %I %s', conname, pg_get_constraintdef(oid))
+        FROM pg_constraint
+        WHERE conrelid = 'inventario_movimientos_part'::regclass AND contype = 'f';
+
+    DROP TABLE inventario_movimientos_part CASCADE;
+
+    ALTER TABLE inventario_movimientos ADD CONSTRAINT inventario_movimientos_pkey PRIMARY KEY (id);
+    FOR definicion IN SELECT sql FROM _definiciones LOOP
+        EXECUTE replace(
+            replace(definicion.sql, ' ON ONLY ', ' ON '),
+            'inventario_movimientos_part', 'inventario_movimientos'
+        );
+    END LOOP;
+END
+$$;
+"""
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("SELECT set_config('TimeZone', %s, true)", [settings.TIME_ZONE])
+        # Sin parámetros: los %I y %L de format() son del PL/pgSQL, no del driver
+        schema_editor.execute(PARTICIONAR, params=None)
+
+
+def desparticionar(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DESPARTICIONAR, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_consumo_diario'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -1,6 +1,14 @@
 from django.db import models
-from django.db.models import Sum
-from datetime import date
+from django.utils import timezone
+from datetime import date, timedelta
+
+# Rangos de alerta de caducidad: (clave, etiqueta, días máximos hasta caducar)
+RANGOS_CADUCIDAD = [
+    ('caducado', 'Caducado', -1),
+    ('7_dias', 'Caduca en 7 días o menos', 7),
+    ('30_dias', 'Caduca en 30 días o menos', 30),
+    ('90_dias', 'Caduca en 90 días o menos', 90),
+]
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -63,17 +71,22 @@ class Medicamento(models.Model):
     
     @property
     def stock_actual(self):
-        # Calcular el stock real a partir de los movimientos de inventario
-        entradas = self.movimientoinventario_set.filter(tipo='entrada').aggregate(total=Sum('cantidad'))['total'] or 0
-        salidas = self.movimientoinventario_set.filter(tipo='salida').aggregate(total=Sum('cantidad'))['total'] or 0
-        return entradas - salidas
+        # Stock del último cierre mensual más los movimientos posteriores, así
+        # la consulta solo lee las particiones recientes de los movimientos.
+        # Los listados lo asignan para toda la página con `cierres.asignar_stock`;
+        # suelto, se calcula una sola vez por instancia
+        if not hasattr(self, '_stock'):
+            from .cierres import stock_en
+            self._stock = stock_en(timezone.now(), [self.pk]).get(self.pk, 0)
+        return self._stock
     
     @property
     def estado_stock(self):
         # Determinar el estado del stock
-        if self.stock_actual <= 0:
+        stock = self.stock_actual
+        if stock <= 0:
             return 'agotado'
-        elif self.stock_actual <= self.stock_minimo:
+        elif stock <= self.stock_minimo:
             return 'bajo'
         else:
             return 'normal'
@@ -83,6 +96,38 @@ class Medicamento(models.Model):
         verbose_name = 'Medicamento'
         verbose_name_plural = 'Medicamentos'
 
+class InventarioQuerySet(models.QuerySet):
+    """
+    Filtros por caducidad sin cargar cada existencia. Trabajan sobre
+    `fecha_caducidad` (indexada).
+    """
+
+    def caducados(self, hoy=None):
+        return self.filter(fecha_caducidad__lt=hoy or date.today())
+
+    def por_caducar(self, dias, hoy=None):
+        hoy = hoy or date.today()
+        return self.filter(fecha_caducidad__gte=hoy, fecha_caducidad__lte=hoy + timedelta(days=dias))
+
+    def en_rango(self, rango, hoy=None):
+        """
+        Existencias con unidades de un rango de RANGOS_CADUCIDAD (los rangos
+        son excluyentes): el mismo conjunto que cuentan las alertas de caducidad.
+        """
+        hoy = hoy or date.today()
+        limites = {clave: dias for clave, _, dias in RANGOS_CADUCIDAD}
+        if rango not in limites:
+            raise ValueError(f"Rango de caducidad desconocido: '{rango}'.")
+        if rango == 'caducado':
+            return self.caducados(hoy).filter(cantidad__gt=0)
+        claves = [clave for clave, _, _ in RANGOS_CADUCIDAD]
+        anterior = limites[claves[claves.index(rango) - 1]]
+        return self.filter(
+            cantidad__gt=0,
+            fecha_caducidad__gt=hoy + timedelta(days=anterior),
+            fecha_caducidad__lte=hoy + timedelta(days=limites[rango]),
+        )
+
 class Inventario(models.Model):
     medicamento = models.ForeignKey(Medicamento, on_delete=models.CASCADE)
     cantidad = models.IntegerField()
@@ -90,6 +135,8 @@ class Inventario(models.Model):
     lote = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = InventarioQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.medicamento.nombre} - {self.cantidad} unidades"
@@ -118,6 +165,9 @@ class Inventario(models.Model):
     
     class Meta:
         db_table = 'inventario_existencias'
+        indexes = [
+            models.Index(fields=['fecha_caducidad']),
+        ]
         verbose_name = 'Existencia'
         verbose_name_plural = 'Existencias'
 
@@ -139,5 +189,112 @@ class MovimientoInventario(models.Model):
     
     class Meta:
         db_table = 'inventario_movimientos'
+        indexes = [
+            models.Index(fields=['medicamento', 'fecha']),
+        ]
         verbose_name = 'Movimiento de Inventario'
-        verbose_name_plural = 'Movimientos de Inventario'
\ No newline at end of file
+        verbose_name_plural = 'Movimientos de Inventario'
+
+class AlertaCaducidad(models.Model):
+    """
+    Foto de las existencias próximas a caducar, generada por el comando
+    `escanear_caducidad`. Las pantallas leen los conteos de aquí en lugar de
+    recorrer todo el inventario.
+    """
+    RANGO_OPCIONES = [(clave, etiqueta) for clave, etiqueta, _ in RANGOS_CADUCIDAD]
+
+    inventario = models.OneToOneField(Inventario, on_delete=models.CASCADE, related_name='alerta_caducidad')
+    medicamento = models.ForeignKey(Medicamento, on_delete=models.CASCADE)
+    rango = models.CharField(max_length=10, choices=RANGO_OPCIONES)
+    fecha_caducidad = models.DateField()
+    dias_para_caducar = models.IntegerField()
+    cantidad = models.IntegerField()
+    generado_en = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.medicamento.nombre} - {self.get_rango_display()}"
+
+    class Meta:
+        db_table = 'inventario_alertas_caducidad'
+        indexes = [
+            models.Index(fields=['rango', 'fecha_caducidad']),
+        ]
+        verbose_name = 'Alerta de Caducidad'
+        verbose_name_plural = 'Alertas de Caducidad'
+
+
+class CierreStock(models.Model):
+    """
+    Saldo de cada medicamento al cierre de un mes: incluye todos los
+    movimientos con fecha anterior a `fecha_corte` (primer instante del mes
+    siguiente). Lo genera el comando `generar_cierres_stock`.
+    """
+    medicamento = models.ForeignKey(Medicamento, on_delete=models.CASCADE, related_name='cierres')
+    fecha_corte = models.DateTimeField()
+    stock = models.IntegerField()
+    entradas_mes = models.IntegerField(default=0)
+    salidas_mes = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.medicamento.nombre} al {self.fecha_corte:%d/%m/%Y}: {self.stock}"
+
+    class Meta:
+        db_table = 'inventario_cierres_stock'
+        unique_together = ('medicamento', 'fecha_corte')
+        indexes = [
+            models.Index(fields=['fecha_corte']),
+        ]
+        verbose_name = 'Cierre de Stock'
+        verbose_name_plural = 'Cierres de Stock'
+
+class PronosticoConsumo(models.Model):
+    """
+    Pronóstico de consumo por medicamento calculado por el comando
+    `actualizar_pronosticos` a partir del historial de salidas.
+    """
+    medicamento = models.OneToOneField(Medicamento, on_delete=models.CASCADE, related_name='pronostico')
+    consumo_diario = models.FloatField(help_text="Promedio móvil de unidades dispensadas por día")
+    consumo_pronosticado = models.FloatField(help_text="Consumo diario esperado para la próxima semana, con estacionalidad semanal")
+    desviacion_diaria = models.FloatField(default=0)
+    stock = models.IntegerField(help_text="Stock al momento del cálculo")
+    dias_cobertura = models.FloatField(null=True, blank=True, help_text="Vacío si no hay consumo")
+    fecha_agotamiento = models.DateField(null=True, blank=True)
+    punto_reorden = models.IntegerField(help_text="Stock mínimo sugerido")
+    actualizado_en = models.DateTimeField()
+
+    def __str__(self):
+        return f"Pronóstico de {self.medicamento.nombre}"
+
+    @property
+    def requiere_reorden(self):
+        return self.stock <= self.punto_reorden and self.consumo_pronosticado > 0
+
+    class Meta:
+        db_table = 'inventario_pronosticos'
+        verbose_name = 'Pronóstico de Consumo'
+        verbose_name_plural = 'Pronósticos de Consumo'
+
+class ConsumoDiario(models.Model):
+    """
+    Acumulado diario de los movimientos por medicamento y tipo. Se mantiene
+    al día con señales sobre MovimientoInventario (ver inventario/consumo.py)
+    y se reconstruye con el comando `reconstruir_consumo_diario`.
+    """
+    medicamento = models.ForeignKey(Medicamento, on_delete=models.CASCADE, related_name='consumos_diarios')
+    dia = models.DateField()
+    tipo = models.CharField(max_length=10, choices=MovimientoInventario.TIPO_MOVIMIENTO)
+    cantidad = models.IntegerField(default=0)
+    movimientos = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.medicamento.nombre} {self.dia}: {self.tipo} {self.cantidad}"
+
+    class Meta:
+        db_table = 'inventario_consumo_diario'
+        unique_together = ('medicamento', 'dia', 'tipo')
+        indexes = [
+            models.Index(fields=['tipo', 'dia']),
+        ]
+        verbose_name = 'Consumo Diario'
+        verbose_name_plural = 'Consumos Diarios'
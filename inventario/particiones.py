@@ -0,0 +1,177 @@
+"""
+Particiones mensuales y archivo anual de `inventario_movimientos`.
+
+En PostgreSQL la tabla de movimientos está particionada por rango mensual
+sobre `fecha` (migración 0007): una partición `inventario_movimientos_pAAAA_MM`
+por mes y una partición por defecto para lo que no tenga la suya. Las
+consultas filtradas por fecha (listado de movimientos recientes, stock a
+partir del último cierre) solo leen las particiones de los meses recientes.
+
+Los años cerrados se archivan: sus doce particiones mensuales se funden en
+una sola partición `inventario_movimientos_aAAAA`, opcionalmente en otro
+tablespace, una vez verificado que los cierres de stock de ese año cuadran
+con los movimientos. A partir de ahí el stock actual se calcula desde los
+cierres y esas filas no se vuelven a leer salvo en consultas históricas.
+
+En otros motores (SQLite en desarrollo) la tabla no está particionada y
+estas funciones no hacen nada.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cierres import inicio_mes, mes_siguiente
+
+TABLA = 'inventario_movimientos'
+PARTICION_POR_DEFECTO = f'{TABLA}_default'
+MESES_ADELANTE = 3
+
+
+class ParticionError(Exception):
+    pass
+
+
+def disponible():
+    """True si la base de datos es PostgreSQL y la tabla está particionada."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLA]
+        )
+        return cursor.fetchone() is not None
+
+
+def nombre_mensual(mes):
+    local = timezone.localtime(mes)
+    return f'{TABLA}_p{local.year:04d}_{local.month:02d}'
+
+
+def nombre_anual(anio):
+    return f'{TABLA}_a{anio:04d}'
+
+
+def _literal(momento):
+    # Solo se usa con fechas generadas aquí; los límites de una partición no
+    # admiten parámetros en el DDL.
+    return "'" + timezone.localtime(momento).isoformat() + "'"
+
+
+def particiones():
+    """Nombres de las particiones actuales de la tabla de movimientos."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+            [TABLA],
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _crear(nombre, desde, hasta, origenes=(), tablespace=None):
+    """
+    Crea la partición [desde, hasta) y la llena con las tablas `origenes`
+    (particiones ya desprendidas, que se eliminan) y con las filas de ese
+    rango que hubieran caído en la partición por defecto. Se crea como tabla
+    suelta y se adjunta al final, para no bloquear la tabla padre mientras
+    se copian filas.
+    """
+    espacio = f' TABLESPACE {connection.ops.quote_name(tablespace)}' if tablespace else ''
+    nombre_sql = connection.ops.quote_name(nombre)
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {nombre_sql} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){espacio}')
+        for origen in origenes:
+            origen_sql = connection.ops.quote_name(origen)
+            cursor.execute(f'INSERT INTO {nombre_sql} SELECT * FROM {origen_sql}')
+            cursor.execute(f'DROP TABLE {origen_sql}')
+        cursor.execute(
+            f'WITH movidos AS (DELETE FROM {PARTICION_POR_DEFECTO} WHERE fecha >= %s AND fecha < %s RETURNING *) '
+            f'INSERT INTO {nombre_sql} SELECT * FROM movidos',
+            [desde, hasta],
+        )
+        cursor.execute(
+            f'ALTER TABLE {TABLA} ATTACH PARTITION {nombre_sql} '
+            f'FOR VALUES FROM ({_literal(desde)}) TO ({_literal(hasta)})'
+        )
+
+
+@transaction.atomic
+def asegurar_particiones(meses_adelante=MESES_ADELANTE):
+    """
+    Crea las particiones mensuales que falten desde el mes más antiguo con
+    filas en la partición por defecto (o el mes actual) hasta
+    `meses_adelante` meses en el futuro. Devuelve los nombres creados.
+    """
+    if not disponible():
+        return []
+    existentes = set(particiones())
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(fecha) FROM {PARTICION_POR_DEFECTO}')
+        huerfana = cursor.fetchone()[0]
+
+    mes = inicio_mes(timezone.now())
+    if huerfana is not None:
+        mes = min(mes, inicio_mes(huerfana))
+    limite = inicio_mes(timezone.now())
+    for _ in range(meses_adelante):
+        limite = mes_siguiente(limite)
+
+    creadas = []
+    while mes <= limite:
+        nombre = nombre_mensual(mes)
+        anual = nombre_anual(timezone.localtime(mes).year)
+        if nombre not in existentes and anual not in existentes:
+            _crear(nombre, mes, mes_siguiente(mes))
+            creadas.append(nombre)
+        mes = mes_siguiente(mes)
+    return creadas
+
+
+def anios_archivables():
+    """Años completos cuyas particiones todavía son mensuales."""
+    if not disponible():
+        return []
+    anio_actual = timezone.localdate().year
+    anios = set()
+    for nombre in particiones():
+        if nombre.startswith(f'{TABLA}_p'):
+            anio = int(nombre[len(TABLA) + 2:len(TABLA) + 6])
+            if anio < anio_actual:
+                anios.add(anio)
+    return sorted(anios)
+
+
+@transaction.atomic
+def archivar_anio(anio, tablespace=None):
+    """
+    Funde las particiones mensuales de `anio` en una partición anual. Quien
+    llama debe haber verificado antes los cierres del año
+    (`cierres.verificar_anio`). Devuelve la cantidad de filas archivadas.
+    """
+    if anio >= timezone.localdate().year:
+        raise ParticionError(f'El año {anio} todavía no está cerrado')
+    if not disponible():
+        raise ParticionError('La tabla de movimientos no está particionada en esta base de datos')
+
+    existentes = set(particiones())
+    anual = nombre_anual(anio)
+    if anual in existentes:
+        return 0
+
+    desde = timezone.make_aware(datetime.datetime(anio, 1, 1))
+    hasta = timezone.make_aware(datetime.datetime(anio + 1, 1, 1))
+    mensuales = []
+    mes = desde
+    while mes < hasta:
+        if nombre_mensual(mes) in existentes:
+            mensuales.append(nombre_mensual(mes))
+        mes = mes_siguiente(mes)
+
+    with connection.cursor() as cursor:
+        for nombre in mensuales:
+            cursor.execute(f'ALTER TABLE {TABLA} DETACH PARTITION {connection.ops.quote_name(nombre)}')
+    _crear(anual, desde, hasta, origenes=mensuales, tablespace=tablespace)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {connection.ops.quote_name(anual)}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,134 @@
+"""
+Pronóstico de consumo y punto de reorden por medicamento.
+
+Las salidas de los últimos `VENTANA_DIAS` días se leen del acumulado diario
+(`ConsumoDiario`) en una sola consulta y se vuelcan en una matriz
+(medicamentos × días). Sobre ella, con operaciones vectorizadas de NumPy:
+
+- consumo diario: promedio móvil de los últimos `DIAS_PROMEDIO` días;
+- estacionalidad: factor por día de la semana (consumo medio de ese día
+  sobre el consumo medio general de la ventana);
+- días de cobertura: primer día en que el consumo pronosticado acumulado
+  alcanza el stock actual;
+- punto de reorden: consumo pronosticado durante el plazo de entrega más un
+  stock de seguridad (z · desviación · √plazo).
+"""
+import datetime
+import math
+
+import numpy as np
+from django.utils import timezone
+
+from core.transacciones import transaccion_reintentable
+from .cierres import stock_en
+from .models import Medicamento, ConsumoDiario, PronosticoConsumo
+
+VENTANA_DIAS = 91
+DIAS_PROMEDIO = 28
+PLAZO_ENTREGA_DIAS = 7
+# z para un nivel de servicio de ~95%
+Z_SERVICIO = 1.65
+HORIZONTE_DIAS = 365
+
+
+def serie_salidas(medicamento_ids, hoy, ventana=VENTANA_DIAS):
+    """
+    Matriz (len(medicamento_ids) × ventana) de unidades dispensadas por día;
+    la última columna es `hoy`.
+    """
+    posiciones = {pk: i for i, pk in enumerate(medicamento_ids)}
+    desde = hoy - datetime.timedelta(days=ventana - 1)
+    filas = (
+        ConsumoDiario.objects
+        .filter(tipo='salida', dia__gte=desde, dia__lte=hoy)
+        .values_list('medicamento_id', 'dia', 'cantidad')
+    )
+    matriz = np.zeros((len(medicamento_ids), ventana), dtype=float)
+    filas = [(posiciones[m], (dia - desde).days, total) for m, dia, total in filas if m in posiciones]
+    if filas:
+        i, j, cantidades = (np.array(columna) for columna in zip(*filas))
+        validos = (j >= 0) & (j < ventana)
+        np.add.at(matriz, (i[validos], j[validos]), cantidades[validos])
+    return matriz
+
+
+def calcular(matriz, stock, hoy, plazo=PLAZO_ENTREGA_DIAS, dias_promedio=DIAS_PROMEDIO):
+    """
+    Calcula los indicadores para todas las filas de `matriz` a la vez.
+    `stock` es un vector con el stock actual de cada medicamento.
+    """
+    n, ventana = matriz.shape
+    dias_promedio = min(dias_promedio, ventana)
+    recientes = matriz[:, -dias_promedio:]
+    consumo_diario = recientes.mean(axis=1)
+    desviacion = recientes.std(axis=1)
+
+    # Factores por día de la semana (0 = lunes) sobre toda la ventana
+    desde = hoy - datetime.timedelta(days=ventana - 1)
+    dias_semana = (np.arange(ventana) + desde.weekday()) % 7
+    media_general = matriz.mean(axis=1, keepdims=True)
+    factores = np.ones((n, 7))
+    for dia in range(7):
+        columnas = dias_semana == dia
+        if columnas.any():
+            media_dia = matriz[:, columnas].mean(axis=1, keepdims=True)
+            factores[:, dia] = np.divide(
+                media_dia, media_general, out=np.ones_like(media_dia), where=media_general > 0
+            )[:, 0]
+
+    # Pronóstico diario para el horizonte, a partir de mañana
+    futuros = (np.arange(1, HORIZONTE_DIAS + 1) + hoy.weekday()) % 7
+    pronostico = consumo_diario[:, None] * factores[:, futuros]
+    consumo_pronosticado = pronostico[:, :7].mean(axis=1)
+
+    acumulado = np.cumsum(pronostico, axis=1)
+    stock = np.asarray(stock, dtype=float)
+    alcanza = acumulado >= stock[:, None]
+    # Más allá del horizonte se extrapola con el consumo promedio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        extrapolado = np.floor(stock / consumo_diario)
+    dias_cobertura = np.where(alcanza.any(axis=1), alcanza.argmax(axis=1) + 1.0, extrapolado)
+    dias_cobertura = np.where(stock <= 0, 0.0, dias_cobertura)
+    dias_cobertura = np.where(consumo_diario > 0, dias_cobertura, np.nan)
+
+    demanda_plazo = pronostico[:, :plazo].sum(axis=1)
+    seguridad = Z_SERVICIO * desviacion * math.sqrt(plazo)
+    punto_reorden = np.ceil(demanda_plazo + seguridad).astype(int)
+
+    return {
+        'consumo_diario': consumo_diario,
+        'consumo_pronosticado': consumo_pronosticado,
+        'desviacion_diaria': desviacion,
+        'dias_cobertura': dias_cobertura,
+        'punto_reorden': punto_reorden,
+    }
+
+
+@transaccion_reintentable
+def actualizar_pronosticos(plazo=PLAZO_ENTREGA_DIAS, ventana=VENTANA_DIAS):
+    """Recalcula y guarda el pronóstico de todos los medicamentos."""
+    ahora = timezone.now()
+    hoy = timezone.localdate(ahora)
+    medicamento_ids = list(Medicamento.objects.order_by('id').values_list('id', flat=True))
+    saldos = stock_en(ahora)
+    stock = np.array([saldos.get(pk, 0) for pk in medicamento_ids], dtype=float)
+
+    resultado = calcular(serie_salidas(medicamento_ids, hoy, ventana), stock, hoy, plazo=plazo)
+
+    pronosticos = []
+    for i, pk in enumerate(medicamento_ids):
+        dias = resultado['dias_cobertura'][i]
+        pronosticos.append(PronosticoConsumo(
+            medicamento_id=pk,
+            consumo_diario=round(float(resultado['consumo_diario'][i]), 3),
+            consumo_pronosticado=round(float(resultado['consumo_pronosticado'][i]), 3),
+            desviacion_diaria=round(float(resultado['desviacion_diaria'][i]), 3),
+            stock=int(stock[i]),
+            dias_cobertura=None if np.isnan(dias) else float(dias),
+            fecha_agotamiento=None if np.isnan(dias) else hoy + datetime.timedelta(days=int(dias)),
+            punto_reorden=int(resultado['punto_reorden'][i]),
+            actualizado_en=ahora,
+        ))
+    PronosticoConsumo.objects.all().delete()
+    PronosticoConsumo.objects.bulk_create(pronosticos, batch_size=1000)
+    return len(pronosticos)
@@ -0,0 +1,36 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import MovimientoInventario
+from . import cierres, consumo
+
+
+@receiver(pre_save, sender=MovimientoInventario)
+def recordar_movimiento_anterior(sender, instance, **kwargs):
+    """
+    Guarda la versión previa de un movimiento editado para poder
+    descontarla del acumulado diario y de los cierres de stock
+    """
+    instance._anterior = None
+    if instance.pk:
+        instance._anterior = MovimientoInventario.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=MovimientoInventario)
+def acumular_movimiento(sender, instance, created, **kwargs):
+    """
+    Suma el movimiento al acumulado diario en la misma transacción y, si es
+    una edición, corrige los cierres de stock posteriores a su fecha
+    """
+    anterior = getattr(instance, '_anterior', None)
+    if anterior is not None:
+        consumo.registrar_movimientos([anterior], signo=-1)
+        cierres.ajustar_cierres([anterior], signo=-1)
+        cierres.ajustar_cierres([instance])
+    consumo.registrar_movimientos([instance])
+
+
+@receiver(post_delete, sender=MovimientoInventario)
+def descontar_movimiento(sender, instance, **kwargs):
+    consumo.registrar_movimientos([instance], signo=-1)
+    cierres.ajustar_cierres([instance], signo=-1)
@@ -34,6 +34,7 @@ urlpatterns = [
     # URLs para Inventario
     path('inventario/', views.listar_inventario, name='listar_inventario'),
     path('inventario/crear/', views.crear_inventario, name='crear_inventario'),
+    path('inventario/ingresar-lotes/', views.ingresar_lotes_archivo, name='ingresar_lotes'),
     path('inventario/<int:inventario_id>/editar/', views.editar_inventario, name='editar_inventario'),
     path('inventario/<int:inventario_id>/eliminar/', views.eliminar_inventario, name='eliminar_inventario'),
     path('inventario/exportar/pdf/', views.exportar_inventario_pdf, name='exportar_inventario_pdf'),
@@ -41,12 +42,14 @@ urlpatterns = [
     
     # URLs para Stock de Medicamentos
     path('stock/', views.stock_medicamentos, name='stock_medicamentos'),
+    path('stock/historico/', views.stock_historico, name='stock_historico'),
     path('stock/exportar/pdf/', views.exportar_stock_pdf, name='exportar_stock_pdf'),
     path('stock/exportar/excel/', views.exportar_stock_excel, name='exportar_stock_excel'),
     
     # URLs para Movimientos
     path('movimientos/', views.listar_movimientos, name='listar_movimientos'),
     path('movimientos/salida/', views.crear_salida_inventario, name='crear_salida_inventario'),
+    path('movimientos/consumo/', views.reporte_consumo, name='reporte_consumo'),
 
     # URL para AJAX
     path('ajax/crear-medicamento/', views.crear_medicamento_ajax, name='crear_medicamento_ajax'),
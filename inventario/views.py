@@ -5,19 +5,24 @@ from django.db.models import Q
 from django.utils import timezone
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
-from django.template.loader import get_template
-from xhtml2pdf import pisa
-from io import BytesIO
 import datetime
-from sistema_medico.settings import BASE_DIR
 import json
 
 from django.contrib.auth.decorators import login_required
 
 from core.decorators import personal_medico_required
-
-from .models import Categoria, Proveedor, Medicamento, Inventario, MovimientoInventario
-from .forms import CategoriaForm, ProveedorForm, MedicamentoForm, InventarioForm, MedicamentoModalForm, CategoriaModalForm, ProveedorModalForm, MovimientoSalidaForm
+from core import exportacion
+from core.asincronia import guardar_formulario
+from core.replicas import usar_replica
+from core.transacciones import vista_reintentable
+
+from .models import Categoria, Proveedor, Medicamento, Inventario, MovimientoInventario, RANGOS_CADUCIDAD
+from .caducidad import resumen_alertas
+from .cierres import asignar_stock, stock_al_dia, ultimo_corte, inicio_mes
+from .consumo import consumo_por_periodo, mas_dispensados, PERIODOS
+from .importacion import ingresar_lotes
+from core.importacion import ArchivoInvalido
+from .forms import CategoriaForm, ProveedorForm, MedicamentoForm, InventarioForm, MedicamentoModalForm, CategoriaModalForm, ProveedorModalForm, MovimientoSalidaForm, IngresoLotesForm
 
 # Vistas para Categorías
 @personal_medico_required
@@ -152,16 +157,30 @@ def eliminar_medicamento(request, medicamento_id):
 # Vistas para Inventario
 @personal_medico_required
 def listar_inventario(request):
-    inventario_list = Inventario.objects.select_related('medicamento').all().order_by('-created_at')
+    inventario_list = Inventario.objects.select_related('medicamento')
+    rango = request.GET.get('caducidad', '')
+    if rango in [clave for clave, _, _ in RANGOS_CADUCIDAD]:
+        inventario_list = inventario_list.en_rango(rango)
+    else:
+        rango = ''
+    orden = request.GET.get('orden', '')
+    if orden == 'caducidad':
+        inventario_list = inventario_list.order_by('fecha_caducidad', 'id')
+    else:
+        inventario_list = inventario_list.order_by('-created_at')
     paginator = Paginator(inventario_list, 10)
     page_number = request.GET.get('page')
     inventario = paginator.get_page(page_number)
     return render(request, 'inventario/inventario/listar.html', {
         'inventario': inventario,
+        'rangos_caducidad': RANGOS_CADUCIDAD,
+        'rango': rango,
+        'orden': orden,
         'today': timezone.now().date()
     })
 
 @personal_medico_required
+@vista_reintentable
 def crear_inventario(request):
     if request.method == 'POST':
         form = InventarioForm(request.POST)
@@ -184,6 +203,38 @@ def crear_inventario(request):
         form = InventarioForm()
     return render(request, 'inventario/inventario/formulario.html', {'form': form, 'titulo': 'Agregar Existencia'})
 
+@personal_medico_required
+def ingresar_lotes_archivo(request):
+    resultado = None
+    if request.method == 'POST':
+        form = IngresoLotesForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            simular = form.cleaned_data['simular']
+            try:
+                resultado = ingresar_lotes(archivo, archivo.name, request.user.username, simular=simular)
+            except (ArchivoInvalido, UnicodeDecodeError) as e:
+                messages.error(request, f'No se pudo procesar el archivo: {e}')
+            else:
+                if form.cleaned_data['descargar_reporte']:
+                    response = HttpResponse(content_type='text/csv; charset=utf-8')
+                    response['Content-Disposition'] = 'attachment; filename="errores_ingreso_lotes.csv"'
+                    resultado.escribir_reporte(response)
+                    return response
+                accion = 'válidos' if simular else 'registrados'
+                messages.success(request, f'{resultado.creados} lotes {accion} ({resultado.unidades} unidades).')
+                if resultado.errores:
+                    messages.warning(request, f'{len(resultado.errores)} filas fueron rechazadas.')
+        else:
+            messages.error(request, 'Por favor, corrija los errores en el formulario.')
+    else:
+        form = IngresoLotesForm()
+    return render(request, 'inventario/inventario/ingresar_lotes.html', {
+        'form': form,
+        'resultado': resultado,
+        'errores': resultado.errores[:500] if resultado else [],
+    })
+
 @personal_medico_required
 def editar_inventario(request, inventario_id):
     inventario = get_object_or_404(Inventario, id=inventario_id)
@@ -209,294 +260,114 @@ def eliminar_inventario(request, inventario_id):
 # Vista para mostrar stock total por medicamento
 @personal_medico_required
 def stock_medicamentos(request):
-    medicamentos_list = Medicamento.objects.select_related('categoria', 'proveedor').all().order_by('nombre')
-    for medicamento in medicamentos_list:
-        medicamento.stock = medicamento.stock_actual
-        medicamento.estado = medicamento.estado_stock
-    
+    medicamentos_list = Medicamento.objects.select_related('categoria', 'proveedor', 'pronostico').all().order_by('nombre')
     paginator = Paginator(medicamentos_list, 10)
     page_number = request.GET.get('page')
     medicamentos = paginator.get_page(page_number)
-    
+
+    # Stock de la página en una sola consulta agrupada (cierre + movimientos)
+    for medicamento in asignar_stock(medicamentos):
+        medicamento.stock = medicamento.stock_actual
+        medicamento.estado = medicamento.estado_stock
+        # El pronóstico es opcional: sin él el acceso lanza RelatedObjectDoesNotExist
+        medicamento.pronostico_actual = getattr(medicamento, 'pronostico', None)
+
     return render(request, 'inventario/stock_medicamentos.html', {'medicamentos': medicamentos})
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+@personal_medico_required
+@usar_replica
+def stock_historico(request):
+    fecha = None
+    medicamentos = []
+    fecha_texto = request.GET.get('fecha')
+    if fecha_texto:
+        try:
+            fecha = datetime.date.fromisoformat(fecha_texto)
+        except ValueError:
+            messages.error(request, 'La fecha indicada no es válida.')
+    if fecha:
+        saldos = stock_al_dia(fecha)
+        medicamentos = list(Medicamento.objects.select_related('categoria').order_by('nombre'))
+        for medicamento in medicamentos:
+            medicamento.stock = saldos.get(medicamento.id, 0)
+    return render(request, 'inventario/stock_historico.html', {
+        'fecha': fecha,
+        'medicamentos': medicamentos,
+        'ultimo_corte': ultimo_corte(),
+    })
+
 
 # --- Vistas de Exportación --- #
 
 @personal_medico_required
+@usar_replica
 def exportar_stock_pdf(request):
-    medicamentos = Medicamento.objects.select_related('categoria', 'proveedor').all().order_by('nombre')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'medicamentos': medicamentos,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('inventario/pdf/stock_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_stock_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    medicamentos = asignar_stock(Medicamento.objects.select_related('categoria', 'proveedor').all().order_by('nombre'))
+    return exportacion.respuesta_pdf('inventario/pdf/stock_template.html', {'medicamentos': medicamentos}, 'reporte_stock')
 
 @personal_medico_required
+@usar_replica
 def exportar_medicamentos_pdf(request):
     medicamentos = Medicamento.objects.select_related('categoria', 'proveedor').all().order_by('nombre')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'medicamentos': medicamentos,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('inventario/pdf/medicamentos_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_medicamentos_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    return exportacion.respuesta_pdf('inventario/pdf/medicamentos_template.html', {'medicamentos': medicamentos}, 'reporte_medicamentos')
 
 @personal_medico_required
+@usar_replica
 def exportar_proveedores_pdf(request):
     proveedores = Proveedor.objects.all().order_by('nombre')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'proveedores': proveedores,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('inventario/pdf/proveedores_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_proveedores_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    return exportacion.respuesta_pdf('inventario/pdf/proveedores_template.html', {'proveedores': proveedores}, 'reporte_proveedores')
 
 @personal_medico_required
+@usar_replica
 def exportar_categorias_pdf(request):
     categorias = Categoria.objects.all().order_by('nombre')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'categorias': categorias,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('inventario/pdf/categorias_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_categorias_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    return exportacion.respuesta_pdf('inventario/pdf/categorias_template.html', {'categorias': categorias}, 'reporte_categorias')
 
 @personal_medico_required
+@usar_replica
 def exportar_inventario_pdf(request):
     inventario = Inventario.objects.select_related('medicamento').all().order_by('-created_at')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'inventario': inventario,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('inventario/pdf/inventario_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="reporte_inventario_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    return exportacion.respuesta_pdf('inventario/pdf/inventario_template.html', {'inventario': inventario}, 'reporte_inventario')
 
 @personal_medico_required
+@usar_replica
 def exportar_stock_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="reporte_stock_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Stock de Medicamentos"
-    ws.freeze_panes = 'A2'
     headers = ['Código', 'Medicamento', 'Categoría', 'Stock Actual', 'Stock Mínimo', 'Estado']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="198754", end_color="198754", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    medicamentos = Medicamento.objects.all().order_by('nombre')
-    for med in medicamentos:
-        ws.append([med.codigo, med.nombre, med.categoria.nombre, med.stock_actual, med.stock_minimo, med.estado_stock])
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
+    medicamentos = asignar_stock(Medicamento.objects.select_related('categoria').order_by('nombre'))
+    filas = ([med.codigo, med.nombre, med.categoria.nombre, med.stock_actual, med.stock_minimo, med.estado_stock] for med in medicamentos)
+    return exportacion.respuesta_excel('reporte_stock', 'Stock de Medicamentos', headers, filas, color='198754')
 
 @personal_medico_required
+@usar_replica
 def exportar_medicamentos_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="listado_medicamentos_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Medicamentos"
-    ws.freeze_panes = 'A2'
     headers = ['Código', 'Nombre', 'Descripción', 'Categoría', 'Proveedor', 'Precio Unitario', 'Stock Mínimo']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="0d6efd", end_color="0d6efd", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
     medicamentos = Medicamento.objects.select_related('categoria', 'proveedor').all().order_by('nombre')
-    for med in medicamentos:
-        ws.append([med.codigo, med.nombre, med.descripcion, med.categoria.nombre, med.proveedor.nombre, med.precio_unitario, med.stock_minimo])
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
+    filas = ([med.codigo, med.nombre, med.descripcion, med.categoria.nombre, med.proveedor.nombre, med.precio_unitario, med.stock_minimo] for med in medicamentos)
+    return exportacion.respuesta_excel('listado_medicamentos', 'Medicamentos', headers, filas)
 
 @personal_medico_required
+@usar_replica
 def exportar_proveedores_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="listado_proveedores_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Proveedores"
-    ws.freeze_panes = 'A2'
     headers = ['Nombre', 'Contacto', 'Teléfono', 'Email', 'Dirección']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="0d6efd", end_color="0d6efd", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
     proveedores = Proveedor.objects.all().order_by('nombre')
-    for p in proveedores:
-        ws.append([p.nombre, p.contacto, p.telefono, p.email, p.direccion])
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
+    filas = ([p.nombre, p.contacto, p.telefono, p.email, p.direccion] for p in proveedores)
+    return exportacion.respuesta_excel('listado_proveedores', 'Proveedores', headers, filas)
 
 @personal_medico_required
+@usar_replica
 def exportar_categorias_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="listado_categorias_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Categorías"
-    ws.freeze_panes = 'A2'
     headers = ['Nombre', 'Descripción']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="0d6efd", end_color="0d6efd", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
     categorias = Categoria.objects.all().order_by('nombre')
-    for cat in categorias:
-        ws.append([cat.nombre, cat.descripcion])
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
+    filas = ([cat.nombre, cat.descripcion] for cat in categorias)
+    return exportacion.respuesta_excel('listado_categorias', 'Categorías', headers, filas)
 
 @personal_medico_required
+@usar_replica
 def exportar_inventario_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="reporte_inventario_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Inventario"
-    ws.freeze_panes = 'A2'
     headers = ['Medicamento', 'Código', 'Lote', 'Cantidad', 'Fecha de Ingreso', 'Fecha de Caducidad', 'Estado']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="0d6efd", end_color="0d6efd", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
     inventario = Inventario.objects.select_related('medicamento').all().order_by('-created_at')
-    for item in inventario:
-        ws.append([
+    filas = (
+        [
             item.medicamento.nombre,
             item.medicamento.codigo,
             item.lote or 'N/A',
@@ -504,31 +375,39 @@ def exportar_inventario_excel(request):
             item.created_at.strftime('%d/%m/%Y'),
             item.fecha_caducidad.strftime('%d/%m/%Y') if item.fecha_caducidad else 'N/A',
             item.estado
-        ])
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except: pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
+        ]
+        for item in inventario
+    )
+    return exportacion.respuesta_excel('reporte_inventario', 'Inventario', headers, filas)
 
 
 # Vistas para Movimientos
+MESES_RECIENTES = 3
+
 @personal_medico_required
 def listar_movimientos(request):
-    movimientos_list = MovimientoInventario.objects.select_related('medicamento').all().order_by('-fecha')
+    # Por defecto solo los meses recientes, para que la consulta (y el conteo
+    # del paginador) lea únicamente las particiones recientes de la tabla
+    periodo = request.GET.get('periodo', 'recientes')
+    movimientos_list = MovimientoInventario.objects.select_related('medicamento').order_by('-fecha')
+    desde = None
+    if periodo != 'todos':
+        periodo = 'recientes'
+        desde = inicio_mes(timezone.now())
+        for _ in range(MESES_RECIENTES - 1):
+            desde = inicio_mes(desde - datetime.timedelta(days=1))
+        movimientos_list = movimientos_list.filter(fecha__gte=desde)
     paginator = Paginator(movimientos_list, 10)
     page_number = request.GET.get('page')
     movimientos = paginator.get_page(page_number)
-    return render(request, 'inventario/movimientos/listar.html', {'movimientos': movimientos})
+    return render(request, 'inventario/movimientos/listar.html', {
+        'movimientos': movimientos,
+        'periodo': periodo,
+        'desde': desde,
+    })
 
 @personal_medico_required
+@vista_reintentable
 def crear_salida_inventario(request):
     if request.method == 'POST':
         form = MovimientoSalidaForm(request.POST)
@@ -556,32 +435,69 @@ def crear_salida_inventario(request):
     })
 
 
+@personal_medico_required
+@usar_replica
+def reporte_consumo(request):
+    hoy = timezone.localdate()
+    try:
+        hasta = datetime.date.fromisoformat(request.GET.get('hasta', ''))
+    except ValueError:
+        hasta = hoy
+    try:
+        desde = datetime.date.fromisoformat(request.GET.get('desde', ''))
+    except ValueError:
+        desde = hasta - datetime.timedelta(days=89)
+    periodo = request.GET.get('periodo', 'semana')
+    if periodo not in PERIODOS:
+        periodo = 'semana'
+    medicamento_id = request.GET.get('medicamento')
+    medicamento_id = int(medicamento_id) if medicamento_id and medicamento_id.isdigit() else None
+
+    serie = consumo_por_periodo(desde, hasta, periodo, medicamento_id=medicamento_id)
+    maximo = max((fila['unidades'] for fila in serie), default=0) or 1
+    for fila in serie:
+        fila['porcentaje'] = round(100 * fila['unidades'] / maximo)
+
+    return render(request, 'inventario/reporte_consumo.html', {
+        'desde': desde,
+        'hasta': hasta,
+        'periodo': periodo,
+        'periodos': list(PERIODOS),
+        'medicamento_id': medicamento_id,
+        'medicamentos': Medicamento.objects.order_by('nombre').only('id', 'nombre', 'codigo'),
+        'serie': serie,
+        'mas_dispensados': mas_dispensados(desde, hasta),
+    })
+
+
 # Vista principal del inventario
 @personal_medico_required
 def index(request):
-    return render(request, 'inventario/index.html')
+    return render(request, 'inventario/index.html', {
+        'alertas_caducidad': resumen_alertas(),
+    })
 
-# Vista para creación de medicamentos vía AJAX
+# Vistas AJAX async: bajo ASGI no ocupan un hilo mientras esperan a la base
 @login_required
 @require_POST
-def crear_medicamento_ajax(request):
+async def crear_medicamento_ajax(request):
     data = request.POST.copy()
 
     # Manejar creación de categoría al vuelo
     categoria_val = data.get('categoria')
     if categoria_val and not categoria_val.isdigit():
-        categoria, _ = Categoria.objects.get_or_create(nombre=categoria_val.strip())
+        categoria, _ = await Categoria.objects.aget_or_create(nombre=categoria_val.strip())
         data['categoria'] = categoria.id
 
     # Manejar creación de proveedor al vuelo
     proveedor_val = data.get('proveedor')
     if proveedor_val and not proveedor_val.isdigit():
-        proveedor, _ = Proveedor.objects.get_or_create(nombre=proveedor_val.strip())
+        proveedor, _ = await Proveedor.objects.aget_or_create(nombre=proveedor_val.strip())
         data['proveedor'] = proveedor.id
 
     form = MedicamentoModalForm(data)
-    if form.is_valid():
-        medicamento = form.save()
+    medicamento = await guardar_formulario(form)
+    if medicamento is not None:
         return JsonResponse({'success': True, 'id': medicamento.id, 'nombre': medicamento.nombre})
     else:
         errors = {field: error[0] for field, error in form.errors.items()}
@@ -589,12 +505,12 @@ def crear_medicamento_ajax(request):
 
 @login_required
 @require_POST
-def crear_categoria_ajax(request):
+async def crear_categoria_ajax(request):
     try:
         data = json.loads(request.body)
         form = CategoriaModalForm(data)
-        if form.is_valid():
-            categoria = form.save()
+        categoria = await guardar_formulario(form)
+        if categoria is not None:
             return JsonResponse({'success': True, 'id': categoria.id, 'nombre': categoria.nombre})
         else:
             errors = {field: error[0] for field, error in form.errors.items()}
@@ -604,12 +520,12 @@ def crear_categoria_ajax(request):
 
 @login_required
 @require_POST
-def crear_proveedor_ajax(request):
+async def crear_proveedor_ajax(request):
     try:
         data = json.loads(request.body)
         form = ProveedorModalForm(data)
-        if form.is_valid():
-            proveedor = form.save()
+        proveedor = await guardar_formulario(form)
+        if proveedor is not None:
             return JsonResponse({'success': True, 'id': proveedor.id, 'nombre': proveedor.nombre})
         else:
             errors = {field: error[0] for field, error in form.errors.items()}
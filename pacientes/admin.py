@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Paciente, TipoDocumento, Pais, Estado, Ciudad, TipoTelefono, Direccion, Telefono
+from .models import Paciente, TipoDocumento, Pais, Estado, Ciudad, TipoTelefono, Direccion, Telefono, PosibleDuplicado
 
 @admin.register(TipoDocumento)
 class TipoDocumentoAdmin(admin.ModelAdmin):
@@ -45,4 +45,10 @@ class DireccionAdmin(admin.ModelAdmin):
 class TelefonoAdmin(admin.ModelAdmin):
     list_display = ('paciente', 'tipo_telefono', 'numero', 'es_principal')
     list_filter = ('tipo_telefono', 'es_principal')
-    search_fields = ('paciente__nombre', 'paciente__apellido', 'numero')
\ No newline at end of file
+    search_fields = ('paciente__nombre', 'paciente__apellido', 'numero')
+@admin.register(PosibleDuplicado)
+class PosibleDuplicadoAdmin(admin.ModelAdmin):
+    list_display = ('paciente_a', 'paciente_b', 'puntaje', 'estado', 'revisado_por', 'created_at')
+    list_filter = ('estado',)
+    search_fields = ('paciente_a__nombre', 'paciente_a__apellido', 'paciente_b__nombre', 'paciente_b__apellido')
+    readonly_fields = ('created_at', 'updated_at')
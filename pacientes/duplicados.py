@@ -0,0 +1,230 @@
+"""
+Detección y fusión de pacientes duplicados.
+
+Los nombres y apellidos son texto libre y los historiales pueden crear
+pacientes al vuelo, así que se acumulan duplicados con errores de tipeo o
+con nombre y apellido invertidos. Para no comparar todos contra todos, los
+pacientes se agrupan en bloques (por clave fonética del nombre completo y
+por fecha de nacimiento) y solo se puntúan los pares dentro de cada bloque.
+Los pares que superan el umbral van a la cola de revisión
+(`PosibleDuplicado`) y un administrador decide si fusionarlos.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.db import transaction
+
+from citas.models import Cita, NotaCita
+from core.transacciones import transaccion_reintentable
+from historiales.models import HistorialMedico
+from .models import Paciente, Direccion, Telefono, PosibleDuplicado
+
+UMBRAL = 0.85
+# Bloques más grandes que esto (p. ej. una fecha de nacimiento por defecto
+# repetida cientos de veces) no aportan candidatos útiles y son cuadráticos.
+MAXIMO_BLOQUE = 50
+
+_REEMPLAZOS_FONETICOS = [
+    (r'[^a-z ]', ''),
+    (r'h', ''),
+    (r'qu', 'k'),
+    (r'c([ei])', r's\1'),
+    (r'g([ei])', r'j\1'),
+    (r'gu([ei])', r'g\1'),
+    (r'[ck]', 'k'),
+    (r'z', 's'),
+    (r'v', 'b'),
+    (r'll', 'y'),
+    (r'i(?=[aeou])', 'y'),
+    (r'w', 'u'),
+    (r'x', 'ks'),
+    (r'(.)\1+', r'\1'),
+]
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return ' '.join(texto.lower().split())
+
+
+def clave_fonetica(palabra):
+    """
+    Clave fonética simplificada para el español: unifica grafías que suenan
+    igual (b/v, c/s/z, ll/y, h muda...) y conserva la primera letra más el
+    esqueleto de consonantes.
+    """
+    palabra = normalizar(palabra)
+    for patron, reemplazo in _REEMPLAZOS_FONETICOS:
+        palabra = re.sub(patron, reemplazo, palabra)
+    if not palabra:
+        return ''
+    return palabra[0] + re.sub(r'[aeiou ]', '', palabra[1:])
+
+
+def clave_nombre(nombre, apellido):
+    """
+    Primer nombre y primer apellido en clave fonética, ordenados, para que
+    los nombres invertidos caigan en el mismo bloque.
+    """
+    primeros = [normalizar(nombre).split()[:1], normalizar(apellido).split()[:1]]
+    claves = sorted(clave_fonetica(p[0]) for p in primeros if p)
+    return '|'.join(claves)
+
+
+def similitud(a, b):
+    """
+    Puntaje entre 0 y 1. Compara el nombre completo en ambos órdenes y
+    ajusta según la fecha de nacimiento y el género.
+    """
+    nombre_a = normalizar(f"{a['nombre'] or ''} {a['apellido'] or ''}")
+    nombre_b = normalizar(f"{b['nombre'] or ''} {b['apellido'] or ''}")
+    invertido_b = normalizar(f"{b['apellido'] or ''} {b['nombre'] or ''}")
+    puntaje = max(
+        SequenceMatcher(None, nombre_a, nombre_b).ratio(),
+        SequenceMatcher(None, nombre_a, invertido_b).ratio(),
+    )
+    if a['fecha_nacimiento'] and b['fecha_nacimiento']:
+        puntaje += 0.1 if a['fecha_nacimiento'] == b['fecha_nacimiento'] else -0.2
+    if a['genero'] and b['genero'] and a['genero'] != b['genero']:
+        puntaje -= 0.1
+    return max(0.0, min(1.0, puntaje))
+
+
+def _motivo(a, b):
+    motivos = []
+    if a['clave'] == b['clave']:
+        motivos.append('nombre fonéticamente igual')
+    if a['fecha_nacimiento'] and a['fecha_nacimiento'] == b['fecha_nacimiento']:
+        motivos.append('misma fecha de nacimiento')
+    return ', '.join(motivos)
+
+
+def buscar_candidatos(umbral=UMBRAL):
+    """
+    Recorre todos los pacientes una sola vez y devuelve la lista de pares
+    (id_a, id_b, puntaje, motivo) con id_a < id_b y puntaje >= umbral.
+    """
+    pacientes = {}
+    bloques = defaultdict(list)
+    for fila in Paciente.objects.values('id', 'nombre', 'apellido', 'fecha_nacimiento', 'genero').iterator():
+        fila['clave'] = clave_nombre(fila['nombre'], fila['apellido'])
+        pacientes[fila['id']] = fila
+        if fila['clave']:
+            bloques[('nombre', fila['clave'])].append(fila['id'])
+        if fila['fecha_nacimiento']:
+            bloques[('fecha', fila['fecha_nacimiento'])].append(fila['id'])
+
+    evaluados = set()
+    candidatos = []
+    for ids in bloques.values():
+        if len(ids) < 2 or len(ids) > MAXIMO_BLOQUE:
+            continue
+        for par in combinations(sorted(ids), 2):
+            if par in evaluados:
+                continue
+            evaluados.add(par)
+            a, b = pacientes[par[0]], pacientes[par[1]]
+            puntaje = similitud(a, b)
+            if puntaje >= umbral:
+                candidatos.append((par[0], par[1], round(puntaje, 3), _motivo(a, b)))
+    return candidatos
+
+
+def detectar_duplicados(umbral=UMBRAL):
+    """
+    Agrega a la cola de revisión los pares nuevos. Los pares ya registrados
+    (incluidos los descartados) no se vuelven a agregar. Devuelve
+    (candidatos encontrados, pares nuevos en la cola).
+    """
+    candidatos = buscar_candidatos(umbral)
+    antes = PosibleDuplicado.objects.count()
+    PosibleDuplicado.objects.bulk_create(
+        [
+            PosibleDuplicado(paciente_a_id=a, paciente_b_id=b, puntaje=puntaje, motivo=motivo)
+            for a, b, puntaje, motivo in candidatos
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(candidatos), PosibleDuplicado.objects.count() - antes
+
+
+@transaccion_reintentable
+def fusionar_pacientes(conservar, eliminar, usuario=None):
+    """
+    Fusiona `eliminar` en `conservar`: mueve sus citas, historiales,
+    teléfonos y dirección, completa los datos vacíos del paciente que se
+    conserva y elimina el duplicado. Todo ocurre en una sola transacción.
+    """
+    if conservar.pk == eliminar.pk:
+        raise ValueError('No se puede fusionar un paciente consigo mismo.')
+
+    # Citas: (paciente, fecha, hora_inicio) es único. Si ambos tienen una cita
+    # en el mismo horario se conserva la del paciente que queda y se le
+    # trasladan las notas de la otra.
+    horarios = {
+        (fecha, hora): pk for pk, fecha, hora in
+        Cita.objects.filter(paciente=conservar).values_list('id', 'fecha', 'hora_inicio')
+    }
+    repetidas = {}
+    for pk, fecha, hora in Cita.objects.filter(paciente=eliminar).values_list('id', 'fecha', 'hora_inicio'):
+        if (fecha, hora) in horarios:
+            repetidas[pk] = horarios[(fecha, hora)]
+    for origen, destino in repetidas.items():
+        NotaCita.objects.filter(cita_id=origen).update(cita_id=destino)
+    Cita.objects.filter(pk__in=repetidas).delete()
+    Cita.objects.filter(paciente=eliminar).update(paciente=conservar)
+
+    historiales = list(HistorialMedico.objects.filter(paciente=eliminar).values_list('id', flat=True))
+    HistorialMedico.objects.filter(pk__in=historiales).update(paciente=conservar)
+
+    # Teléfonos: (paciente, numero) es único
+    numeros = set(Telefono.objects.filter(paciente=conservar).values_list('numero', flat=True))
+    Telefono.objects.filter(paciente=eliminar, numero__in=numeros).delete()
+    tiene_principal = Telefono.objects.filter(paciente=conservar, es_principal=True).exists()
+    movidos = Telefono.objects.filter(paciente=eliminar)
+    if tiene_principal:
+        movidos.update(paciente=conservar, es_principal=False)
+    else:
+        movidos.update(paciente=conservar)
+
+    # Dirección: uno a uno. Se mueve si el paciente conservado no tiene; si
+    # tiene, solo se completan sus campos vacíos.
+    direccion_eliminar = Direccion.objects.filter(paciente=eliminar).first()
+    if direccion_eliminar:
+        direccion_conservar = Direccion.objects.filter(paciente=conservar).first()
+        if direccion_conservar is None:
+            direccion_eliminar.paciente = conservar
+            direccion_eliminar.save()
+        else:
+            for campo in ('ciudad', 'direccion', 'codigo_postal'):
+                if not getattr(direccion_conservar, campo):
+                    setattr(direccion_conservar, campo, getattr(direccion_eliminar, campo))
+            direccion_conservar.save()
+            direccion_eliminar.delete()
+
+    for campo in ('nombre', 'apellido', 'fecha_nacimiento', 'genero', 'email'):
+        if not getattr(conservar, campo) and getattr(eliminar, campo):
+            setattr(conservar, campo, getattr(eliminar, campo))
+    conservar.save()
+
+    PosibleDuplicado.objects.filter(
+        paciente_a_id=min(conservar.pk, eliminar.pk), paciente_b_id=max(conservar.pk, eliminar.pk)
+    ).update(estado='fusionado', revisado_por=usuario)
+    # Los demás pares pendientes del paciente eliminado los borra la señal
+    # pre_delete (pacientes/signals.py)
+    eliminar.delete()
+
+    def _invalidar_historiales():
+        # update() no dispara señales: se avisa a los índices de historiales
+        from historiales import antropometria
+        from historiales.analitica import _indice
+        for historial_id in historiales:
+            _indice.marcar(historial_id)
+        antropometria.invalidar(conservar.pk)
+
+    transaction.on_commit(_invalidar_historiales)
+    return conservar
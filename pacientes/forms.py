@@ -1,6 +1,7 @@
 from django import forms
 from django.forms import inlineformset_factory
 from django.core.exceptions import ValidationError
+from core.importacion import EXTENSIONES_PERMITIDAS
 from .models import Paciente, TipoDocumento, Genero, Direccion, Telefono, Ciudad, Estado, Pais, TipoTelefono
 
 
@@ -154,4 +155,27 @@ class TipoTelefonoForm(forms.ModelForm):
         fields = ['nombre']
         widgets = {
             'nombre': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: Móvil, Casa, Trabajo'}),
-        }
\ No newline at end of file
+        }
+
+class ImportarPacientesForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo CSV o Excel",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+        help_text="Columnas: cedula, nombre, apellido, fecha_nacimiento, genero, email, direccion, codigo_postal, telefono, tipo_telefono"
+    )
+    simular = forms.BooleanField(
+        required=False,
+        label="Solo validar (no guardar)",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    descargar_reporte = forms.BooleanField(
+        required=False,
+        label="Descargar el reporte de errores en CSV",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data.get('archivo')
+        if archivo and not archivo.name.lower().endswith(EXTENSIONES_PERMITIDAS):
+            raise ValidationError('Formato no soportado. Use un archivo .csv o .xlsx.')
+        return archivo
@@ -0,0 +1,246 @@
+"""
+Importación masiva de pacientes (con dirección y teléfono) desde CSV/XLSX.
+
+Pensada para la inscripción de estudiantes al inicio de cada semestre: el
+archivo se lee en streaming, se valida por lotes, las cédulas existentes se
+cargan una sola vez en un conjunto para descartar duplicados sin consultar
+la base por cada fila, y cada lote se inserta con `bulk_create` dentro de
+su propia transacción. Las filas rechazadas se devuelven en un reporte con
+el número de fila y el motivo.
+
+Columnas reconocidas (encabezados sin distinguir mayúsculas ni acentos):
+cedula | numero_documento, nombre, apellido, fecha_nacimiento, genero,
+email, direccion, codigo_postal, telefono, tipo_telefono.
+"""
+import csv
+import datetime
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError
+
+from core import auditoria
+from core.importacion import leer_filas, en_lotes
+from core.transacciones import transaccion_reintentable
+from .models import Paciente, Direccion, Telefono, Ciudad, TipoTelefono, Genero
+
+TAMANIO_LOTE = 1000
+
+ALIAS_COLUMNAS = {
+    'cedula': 'numero_documento',
+    'ci': 'numero_documento',
+    'documento': 'numero_documento',
+    'nombres': 'nombre',
+    'apellidos': 'apellido',
+    'sexo': 'genero',
+    'correo': 'email',
+    'correo_electronico': 'email',
+    'fecha_de_nacimiento': 'fecha_nacimiento',
+    'numero': 'telefono',
+}
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+GENEROS = {
+    'm': Genero.MASCULINO, 'masculino': Genero.MASCULINO,
+    'f': Genero.FEMENINO, 'femenino': Genero.FEMENINO,
+}
+
+
+@dataclass
+class ResultadoImportacion:
+    leidas: int = 0
+    creados: int = 0
+    duplicados: int = 0
+    errores: list = field(default_factory=list)
+
+    def agregar_error(self, fila, documento, mensaje):
+        self.errores.append({'fila': fila, 'numero_documento': documento or '', 'error': mensaje})
+
+    def escribir_reporte(self, salida):
+        """Escribe los errores como CSV en un archivo de texto abierto."""
+        escritor = csv.DictWriter(salida, fieldnames=['fila', 'numero_documento', 'error'])
+        escritor.writeheader()
+        escritor.writerows(self.errores)
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip() or None
+
+
+def _fecha(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.datetime.strptime(str(valor).strip(), formato).date()
+        except ValueError:
+            continue
+    raise ValidationError(f"Fecha de nacimiento inválida: '{valor}'.")
+
+
+def _validar(fila, tipos_telefono):
+    """Convierte una fila en los datos del paciente o lanza ValidationError."""
+    datos = {ALIAS_COLUMNAS.get(k, k): v for k, v in fila.items()}
+    errores = []
+
+    documento = _texto(datos.get('numero_documento'))
+    if not documento:
+        errores.append('Falta el número de cédula.')
+    elif not documento.isdigit() or len(documento) != 8:
+        errores.append('El número de cédula debe tener exactamente 8 dígitos.')
+
+    nombre = _texto(datos.get('nombre'))
+    apellido = _texto(datos.get('apellido'))
+    if not nombre or not apellido:
+        errores.append('Nombre y apellido son obligatorios.')
+
+    try:
+        fecha_nacimiento = _fecha(datos.get('fecha_nacimiento'))
+        if fecha_nacimiento and fecha_nacimiento > datetime.date.today():
+            errores.append('La fecha de nacimiento no puede ser futura.')
+    except ValidationError as e:
+        fecha_nacimiento = None
+        errores.extend(e.messages)
+
+    genero = _texto(datos.get('genero'))
+    if genero:
+        genero = GENEROS.get(genero.lower())
+        if genero is None:
+            errores.append("Género inválido (use M o F).")
+
+    email = _texto(datos.get('email'))
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errores.append(f"Email inválido: '{email}'.")
+
+    codigo_postal = _texto(datos.get('codigo_postal'))
+    if codigo_postal and len(codigo_postal) > 4:
+        errores.append('El código postal debe tener a lo sumo 4 caracteres.')
+
+    telefono = _texto(datos.get('telefono'))
+    if telefono and (len(telefono) != 11 or not telefono.isdigit()):
+        errores.append('El número de teléfono debe tener exactamente 11 dígitos.')
+
+    tipo_telefono = None
+    nombre_tipo = _texto(datos.get('tipo_telefono'))
+    if telefono and nombre_tipo:
+        tipo_telefono = tipos_telefono.get(nombre_tipo.lower())
+        if tipo_telefono is None:
+            errores.append(f"Tipo de teléfono desconocido: '{nombre_tipo}'.")
+
+    if errores:
+        raise ValidationError(errores)
+
+    return {
+        'paciente': {
+            'numero_documento': documento,
+            'nombre': nombre,
+            'apellido': apellido,
+            'fecha_nacimiento': fecha_nacimiento,
+            'genero': genero or Genero.MASCULINO,
+            'email': email,
+        },
+        'direccion': _texto(datos.get('direccion')),
+        'codigo_postal': codigo_postal,
+        'telefono': telefono,
+        'tipo_telefono': tipo_telefono,
+    }
+
+
+def _insertar_lote(validas, ciudad):
+    for intento in transaccion_reintentable(nombre='importar_pacientes'):
+        with intento:
+            pacientes = Paciente.objects.bulk_create(
+                [Paciente(**datos['paciente']) for _, datos in validas]
+            )
+            direcciones = []
+            telefonos = []
+            for paciente, (_, datos) in zip(pacientes, validas):
+                if datos['direccion'] or datos['codigo_postal']:
+                    direcciones.append(Direccion(
+                        paciente=paciente, ciudad=ciudad,
+                        direccion=datos['direccion'], codigo_postal=datos['codigo_postal'],
+                    ))
+                if datos['telefono']:
+                    telefonos.append(Telefono(
+                        paciente=paciente, tipo_telefono=datos['tipo_telefono'],
+                        numero=datos['telefono'], es_principal=True,
+                    ))
+            Direccion.objects.bulk_create(direcciones)
+            Telefono.objects.bulk_create(telefonos)
+            for objetos in (pacientes, direcciones, telefonos):
+                auditoria.registrar_objetos(objetos, auditoria.CREADO)
+    return len(pacientes)
+
+
+def importar_pacientes(archivo, nombre, tamanio_lote=TAMANIO_LOTE, simular=False):
+    """
+    Importa los pacientes del archivo y devuelve un ResultadoImportacion.
+    Con `simular=True` solo valida y reporta, sin escribir en la base.
+    """
+    resultado = ResultadoImportacion()
+
+    # Consultas únicas: cédulas existentes, ciudad por defecto y tipos de teléfono
+    existentes = set(Paciente.objects.values_list('numero_documento', flat=True))
+    en_archivo = set()
+    ciudad = Ciudad.objects.filter(nombre="Caracas", estado__nombre="Distrito Capital").first()
+    tipos_telefono = {t.nombre.lower(): t for t in TipoTelefono.objects.all()}
+
+    for lote in en_lotes(leer_filas(archivo, nombre), tamanio_lote):
+        validas = []
+        for numero, fila in lote:
+            resultado.leidas += 1
+            try:
+                datos = _validar(fila, tipos_telefono)
+            except ValidationError as e:
+                resultado.agregar_error(numero, _texto(fila.get('cedula') or fila.get('numero_documento')), ' '.join(e.messages))
+                continue
+            documento = datos['paciente']['numero_documento']
+            if documento in existentes:
+                resultado.duplicados += 1
+                resultado.agregar_error(numero, documento, 'La cédula ya está registrada.')
+                continue
+            if documento in en_archivo:
+                resultado.duplicados += 1
+                resultado.agregar_error(numero, documento, 'La cédula está repetida en el archivo.')
+                continue
+            en_archivo.add(documento)
+            validas.append((numero, datos))
+
+        if not validas or simular:
+            resultado.creados += len(validas)
+            continue
+
+        try:
+            resultado.creados += _insertar_lote(validas, ciudad)
+        except IntegrityError:
+            # Otro proceso registró alguna de estas cédulas después de cargar
+            # el conjunto: se descartan las que ya existen y se reintenta.
+            documentos = [d['paciente']['numero_documento'] for _, d in validas]
+            tomadas = set(
+                Paciente.objects.filter(numero_documento__in=documentos).values_list('numero_documento', flat=True)
+            )
+            restantes = []
+            for numero, datos in validas:
+                documento = datos['paciente']['numero_documento']
+                if documento in tomadas:
+                    resultado.duplicados += 1
+                    resultado.agregar_error(numero, documento, 'La cédula ya está registrada.')
+                else:
+                    restantes.append((numero, datos))
+            if restantes:
+                resultado.creados += _insertar_lote(restantes, ciudad)
+
+    return resultado
@@ -0,0 +1,218 @@
+"""
+Línea de tiempo del paciente: citas (con sus notas) e historiales médicos
+(con sus formatos y documentos) en un solo flujo ordenado del más reciente
+al más antiguo.
+
+La paginación es por cursor (keyset) y no por desplazamiento: cada página
+trae a lo sumo `limite + 1` filas de cada flujo a partir del último evento
+entregado, y los formatos, notas y documentos se cargan con un número fijo
+de consultas de prefetch. El costo de una página no depende de cuántas
+consultas tenga el paciente.
+"""
+import base64
+import binascii
+import datetime
+import heapq
+
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from citas.models import Cita, NotaCita
+from historiales.models import HistorialMedico
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 100
+
+# En empates de fecha, 'historial' va antes que 'cita' (orden descendente)
+TIPO_CITA = 'cita'
+TIPO_HISTORIAL = 'historial'
+TIPOS = (TIPO_CITA, TIPO_HISTORIAL)
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(momento, tipo, pk):
+    texto = f'{momento.isoformat()}|{tipo}|{pk}'
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        momento, tipo, pk = base64.urlsafe_b64decode(cursor + relleno).decode().split('|')
+        momento = datetime.datetime.fromisoformat(momento)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorInvalido('Cursor inválido.')
+    if tipo not in TIPOS or timezone.is_naive(momento):
+        raise CursorInvalido('Cursor inválido.')
+    return momento, tipo, pk
+
+
+def _momento_cita(cita):
+    return timezone.make_aware(datetime.datetime.combine(cita.fecha, cita.hora_inicio))
+
+
+def _citas(paciente_id, cursor, limite):
+    citas = (
+        Cita.objects.filter(paciente_id=paciente_id)
+        .select_related('tipo_cita', 'motivo', 'estado')
+        .prefetch_related(
+            Prefetch('notas', queryset=NotaCita.objects.select_related('tipo_nota').order_by('created_at'))
+        )
+        .order_by('-fecha', '-hora_inicio', '-id')
+    )
+    if cursor:
+        momento, tipo, pk = cursor
+        local = timezone.localtime(momento)
+        fecha, hora = local.date(), local.time()
+        # Un historial en el mismo instante va antes que las citas, así que
+        # si el cursor es un historial se incluyen todas las citas empatadas.
+        empate = Q(fecha=fecha, hora_inicio=hora)
+        if tipo == TIPO_CITA:
+            empate &= Q(id__lt=pk)
+        citas = citas.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, hora_inicio__lt=hora) | empate)
+    return list(citas[:limite + 1])
+
+
+def _historiales(paciente_id, cursor, limite):
+    historiales = (
+        HistorialMedico.objects.filter(paciente_id=paciente_id)
+        .select_related('medico', 'historia_general', 'historia_nutricion')
+        .prefetch_related('justificativos', 'referencias', 'reposos', 'recipes')
+        .order_by('-fecha', '-id')
+    )
+    if cursor:
+        momento, tipo, pk = cursor
+        condicion = Q(fecha__lt=momento)
+        if tipo == TIPO_HISTORIAL:
+            condicion |= Q(fecha=momento, id__lt=pk)
+        historiales = historiales.filter(condicion)
+    return list(historiales[:limite + 1])
+
+
+def _formato(historial, relacion):
+    # Los formatos son OneToOne opcionales: select_related deja la excepción
+    # de "no existe" en lugar de None.
+    try:
+        return getattr(historial, relacion)
+    except (HistorialMedico.historia_general.RelatedObjectDoesNotExist,
+            HistorialMedico.historia_nutricion.RelatedObjectDoesNotExist):
+        return None
+
+
+def _fecha(valor):
+    return valor.isoformat() if valor else None
+
+
+def serializar_cita(cita):
+    return {
+        'id': cita.id,
+        'fecha': _fecha(cita.fecha),
+        'hora_inicio': _fecha(cita.hora_inicio),
+        'hora_fin': _fecha(cita.hora_fin),
+        'tipo_cita': cita.tipo_cita.nombre,
+        'motivo': cita.motivo.nombre,
+        'estado': cita.estado.nombre,
+        'color': cita.estado.color,
+        'observaciones': cita.observaciones,
+        'notas': [
+            {
+                'id': nota.id,
+                'tipo': nota.tipo_nota.nombre,
+                'contenido': nota.contenido,
+                'fecha': _fecha(nota.created_at),
+            }
+            for nota in cita.notas.all()
+        ],
+    }
+
+
+def serializar_historial(historial):
+    general = _formato(historial, 'historia_general')
+    nutricion = _formato(historial, 'historia_nutricion')
+    return {
+        'id': historial.id,
+        'fecha': _fecha(historial.fecha),
+        'medico': historial.medico.get_full_name() or historial.medico.username if historial.medico else None,
+        'historia_general': {
+            'tipo_afiliado': general.get_tipo_afiliado_display() if general.tipo_afiliado else None,
+            'motivo_consulta': general.motivo_consulta,
+            'diagnostico': general.diagnostico,
+            'plan': general.plan,
+            'peso': general.peso,
+            'talla': general.talla,
+            'ta': general.ta,
+        } if general else None,
+        'historia_nutricion': {
+            'motivo_consulta': nutricion.motivo_consulta_nutricion,
+            'dx_nutricional': nutricion.dx_nutricional,
+            'evolucion': nutricion.evolucion,
+        } if nutricion else None,
+        'documentos': {
+            'justificativos': [
+                {
+                    'id': d.id,
+                    'motivo_consulta': d.motivo_consulta,
+                    'hora_entrada': _fecha(d.hora_entrada),
+                    'hora_salida': _fecha(d.hora_salida),
+                }
+                for d in historial.justificativos.all()
+            ],
+            'referencias': [
+                {'id': d.id, 'referido_a': d.referido_a, 'motivo_referencia': d.motivo_referencia}
+                for d in historial.referencias.all()
+            ],
+            'reposos': [
+                {
+                    'id': d.id,
+                    'diagnostico': d.diagnostico,
+                    'duracion_dias': d.duracion_dias,
+                    'fecha_inicio': _fecha(d.fecha_inicio),
+                    'fecha_fin': _fecha(d.fecha_fin),
+                    'debe_volver': _fecha(d.debe_volver),
+                }
+                for d in historial.reposos.all()
+            ],
+            'recipes': [
+                {'id': d.id, 'texto_recipe': d.texto_recipe}
+                for d in historial.recipes.all()
+            ],
+        },
+    }
+
+
+def linea_tiempo(paciente_id, cursor=None, limite=LIMITE_POR_DEFECTO):
+    """
+    Devuelve una página de eventos y el cursor de la siguiente (o None si
+    no hay más). `cursor` es el valor opaco devuelto por la página anterior.
+    """
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    posicion = decodificar_cursor(cursor) if cursor else None
+
+    eventos_citas = (
+        (_momento_cita(c), TIPO_CITA, c.id, c) for c in _citas(paciente_id, posicion, limite)
+    )
+    eventos_historiales = (
+        (h.fecha, TIPO_HISTORIAL, h.id, h) for h in _historiales(paciente_id, posicion, limite)
+    )
+    # Ambos flujos ya vienen ordenados de forma descendente por (momento, tipo, id)
+    mezcla = heapq.merge(
+        eventos_citas, eventos_historiales, key=lambda e: (e[0], e[1], e[2]), reverse=True
+    )
+
+    eventos = []
+    siguiente = None
+    for momento, tipo, pk, objeto in mezcla:
+        if len(eventos) == limite:
+            ultimo = eventos[-1]
+            siguiente = codificar_cursor(*ultimo['_clave'])
+            break
+        datos = serializar_cita(objeto) if tipo == TIPO_CITA else serializar_historial(objeto)
+        eventos.append({'tipo': tipo, 'momento': timezone.localtime(momento).isoformat(), 'datos': datos, '_clave': (momento, tipo, pk)})
+
+    for evento in eventos:
+        del evento['_clave']
+    return eventos, siguiente
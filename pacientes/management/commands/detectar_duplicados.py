@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pacientes.duplicados import detectar_duplicados, UMBRAL
+
+class Command(BaseCommand):
+    help = 'Busca posibles pacientes duplicados y los agrega a la cola de revisión'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral', type=float, default=UMBRAL, help='Similitud mínima (0 a 1) para reportar un par')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        encontrados, nuevos = detectar_duplicados(options['umbral'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{encontrados} pares candidatos, {nuevos} nuevos en la cola de revisión '
+            f'({time.monotonic() - inicio:.1f}s)'
+        ))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import ArchivoInvalido
+from pacientes.importacion import importar_pacientes, TAMANIO_LOTE
+
+class Command(BaseCommand):
+    help = 'Importa pacientes (con dirección y teléfono) desde un archivo CSV o XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE, help='Filas por lote de inserción')
+        parser.add_argument('--simular', action='store_true', help='Solo valida, sin guardar')
+        parser.add_argument('--reporte', help='Ruta del CSV donde escribir las filas rechazadas')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_pacientes(
+                    archivo, options['archivo'],
+                    tamanio_lote=options['lote'], simular=options['simular'],
+                )
+        except (OSError, ArchivoInvalido) as e:
+            raise CommandError(str(e))
+        except UnicodeDecodeError as e:
+            # El CSV se decodifica por partes: un byte inválido puede aparecer a mitad del archivo
+            raise CommandError(f'No se pudo procesar el archivo: {e}')
+        duracion = time.monotonic() - inicio
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                resultado.escribir_reporte(salida)
+        else:
+            for error in resultado.errores[:50]:
+                self.stdout.write(self.style.WARNING(f"Fila {error['fila']} ({error['numero_documento']}): {error['error']}"))
+            if len(resultado.errores) > 50:
+                self.stdout.write(self.style.NOTICE(f'... y {len(resultado.errores) - 50} errores más (use --reporte)'))
+
+        accion = 'válidos' if options['simular'] else 'creados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.leidas} filas leídas, {resultado.creados} pacientes {accion}, '
+            f'{resultado.duplicados} duplicados, {len(resultado.errores)} filas rechazadas '
+            f'en {duracion:.1f}s'
+        ))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pacientes', '0007_alter_paciente_apellido_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PosibleDuplicado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField(help_text='Similitud entre 0 y 1')),
+                ('motivo', models.CharField(blank=True, max_length=255)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('fusionado', 'Fusionado'), ('descartado', 'Descartado')], default='pendiente', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('paciente_a', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pacientes.paciente')),
+                ('paciente_b', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pacientes.paciente')),
+                ('revisado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Posible Duplicado',
+                'verbose_name_plural': 'Posibles Duplicados',
+                'db_table': 'posibles_duplicados',
+                'indexes': [models.Index(fields=['estado', '-puntaje'], name='posibles_du_estado_570417_idx')],
+                'unique_together': {('paciente_a', 'paciente_b')},
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.contrib.auth.models import User
 
 class TipoDocumento(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
@@ -151,3 +152,34 @@ class Telefono(models.Model):
         unique_together = ('paciente', 'numero')
         verbose_name = 'Teléfono'
         verbose_name_plural = 'Teléfonos'
+
+class PosibleDuplicado(models.Model):
+    ESTADO_OPCIONES = [
+        ('pendiente', 'Pendiente'),
+        ('fusionado', 'Fusionado'),
+        ('descartado', 'Descartado'),
+    ]
+
+    # paciente_a siempre tiene el id menor, para no registrar el mismo par dos
+    # veces. Tras una fusión el paciente eliminado queda en NULL y el registro
+    # se conserva como constancia.
+    paciente_a = models.ForeignKey(Paciente, on_delete=models.SET_NULL, null=True, related_name='+')
+    paciente_b = models.ForeignKey(Paciente, on_delete=models.SET_NULL, null=True, related_name='+')
+    puntaje = models.FloatField(help_text="Similitud entre 0 y 1")
+    motivo = models.CharField(max_length=255, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADO_OPCIONES, default='pendiente')
+    revisado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.paciente_a or '-'} / {self.paciente_b or '-'} ({self.puntaje:.2f})"
+
+    class Meta:
+        db_table = 'posibles_duplicados'
+        unique_together = ('paciente_a', 'paciente_b')
+        indexes = [
+            models.Index(fields=['estado', '-puntaje']),
+        ]
+        verbose_name = 'Posible Duplicado'
+        verbose_name_plural = 'Posibles Duplicados'
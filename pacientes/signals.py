@@ -0,0 +1,16 @@
+from django.db.models import Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Paciente, PosibleDuplicado
+
+
+@receiver(pre_delete, sender=Paciente)
+def eliminar_pares_pendientes(sender, instance, **kwargs):
+    """
+    Los pares pendientes del paciente eliminado pierden sentido; los ya
+    revisados se conservan como constancia (con ese lado en NULL)
+    """
+    PosibleDuplicado.objects.filter(estado='pendiente').filter(
+        Q(paciente_a=instance) | Q(paciente_b=instance)
+    ).delete()
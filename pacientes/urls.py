@@ -6,10 +6,16 @@ app_name = 'pacientes'
 urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.create, name='create'),
+    path('importar/', views.importar, name='importar'),
     path('<int:paciente_id>/', views.show, name='show'),
     path('<int:paciente_id>/edit/', views.edit, name='edit'),
     path('<int:paciente_id>/destroy/', views.destroy, name='destroy'),
+    path('<int:paciente_id>/timeline/', views.timeline, name='timeline'),
     path('search/', views.search, name='search'),
+    # Revisión de duplicados
+    path('duplicados/', views.duplicados, name='duplicados'),
+    path('duplicados/<int:duplicado_id>/fusionar/', views.fusionar_duplicado, name='fusionar_duplicado'),
+    path('duplicados/<int:duplicado_id>/descartar/', views.descartar_duplicado, name='descartar_duplicado'),
     # URLs AJAX para cargar datos dinámicamente
     path('ajax/cargar-estados/', views.cargar_estados, name='cargar_estados'),
     path('ajax/cargar-ciudades/', views.cargar_ciudades, name='cargar_ciudades'),
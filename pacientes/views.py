@@ -2,26 +2,26 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.db import transaction
 from django.http import HttpResponse, JsonResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
-from io import BytesIO
-import datetime
+from django.template.loader import render_to_string
 import json
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import Paciente, Pais, Estado, Ciudad, Direccion, Telefono
-from .forms import PacienteForm, DireccionFormSet, TelefonoFormSet, TipoTelefonoForm
-from sistema_medico.settings import BASE_DIR
-from core.decorators import personal_medico_required
+from .models import Paciente, Pais, Estado, Ciudad, Direccion, Telefono, PosibleDuplicado
+from .forms import PacienteForm, DireccionFormSet, TelefonoFormSet, TipoTelefonoForm, ImportarPacientesForm
+from .importacion import importar_pacientes
+from .duplicados import fusionar_pacientes
+from core.importacion import ArchivoInvalido
+from core.decorators import personal_medico_required, admin_required
+from core import exportacion
+from core.asincronia import guardar_formulario
+from core.replicas import usar_replica
+from core.transacciones import vista_reintentable
 from historiales.models import HistorialMedico
+from .linea_tiempo import linea_tiempo, CursorInvalido, LIMITE_POR_DEFECTO
 
 # --- Vistas CRUD y de Búsqueda --- #
 
@@ -34,7 +34,7 @@ def index(request):
     return render(request, 'pacientes/index.html', {'pacientes': pacientes})
 
 @personal_medico_required
-@transaction.atomic
+@vista_reintentable
 def create(request):
     if request.method == 'POST':
         paciente_form = PacienteForm(request.POST)
@@ -73,6 +73,38 @@ def create(request):
         'paises': paises,
     })
 
+@personal_medico_required
+def importar(request):
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarPacientesForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            simular = form.cleaned_data['simular']
+            try:
+                resultado = importar_pacientes(archivo, archivo.name, simular=simular)
+            except (ArchivoInvalido, UnicodeDecodeError) as e:
+                messages.error(request, f'No se pudo procesar el archivo: {e}')
+            else:
+                if form.cleaned_data['descargar_reporte']:
+                    response = HttpResponse(content_type='text/csv; charset=utf-8')
+                    response['Content-Disposition'] = 'attachment; filename="errores_importacion_pacientes.csv"'
+                    resultado.escribir_reporte(response)
+                    return response
+                accion = 'válidos' if simular else 'importados'
+                messages.success(request, f'{resultado.creados} pacientes {accion}.')
+                if resultado.errores:
+                    messages.warning(request, f'{len(resultado.errores)} filas fueron rechazadas.')
+        else:
+            messages.error(request, 'Por favor, corrija los errores en el formulario.')
+    else:
+        form = ImportarPacientesForm()
+    return render(request, 'pacientes/importar.html', {
+        'form': form,
+        'resultado': resultado,
+        'errores': resultado.errores[:500] if resultado else [],
+    })
+
 @personal_medico_required
 def show(request, paciente_id):
     paciente = get_object_or_404(Paciente, id=paciente_id)
@@ -87,7 +119,27 @@ def show(request, paciente_id):
     })
 
 @personal_medico_required
-@transaction.atomic
+@usar_replica
+def timeline(request, paciente_id):
+    paciente = get_object_or_404(Paciente, id=paciente_id)
+    try:
+        limite = int(request.GET.get('limite', LIMITE_POR_DEFECTO))
+        eventos, siguiente = linea_tiempo(paciente.id, request.GET.get('cursor'), limite)
+    except (CursorInvalido, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({
+        'success': True,
+        'paciente': {
+            'id': paciente.id,
+            'nombre': f"{paciente.nombre} {paciente.apellido}",
+            'numero_documento': paciente.numero_documento,
+        },
+        'eventos': eventos,
+        'siguiente': siguiente,
+    })
+
+@personal_medico_required
+@vista_reintentable
 def edit(request, paciente_id):
     paciente = get_object_or_404(Paciente, id=paciente_id)
     if request.method == 'POST':
@@ -125,7 +177,7 @@ def edit(request, paciente_id):
     })
 
 @personal_medico_required
-@transaction.atomic
+@vista_reintentable
 def destroy(request, paciente_id):
     paciente = get_object_or_404(Paciente, id=paciente_id)
     if request.method == 'POST':
@@ -136,6 +188,7 @@ def destroy(request, paciente_id):
     return render(request, 'pacientes/destroy.html', {'paciente': paciente})
 
 @personal_medico_required
+@usar_replica
 def search(request):
     query = request.GET.get('q', '')
     pacientes = Paciente.objects.all().order_by('apellido', 'nombre')
@@ -148,27 +201,74 @@ def search(request):
 
 # --- Vistas AJAX --- #
 
+# --- Revisión de Duplicados --- #
+
+@admin_required
+def duplicados(request):
+    pendientes = (
+        PosibleDuplicado.objects.filter(estado='pendiente', paciente_a__isnull=False, paciente_b__isnull=False)
+        .select_related('paciente_a', 'paciente_b')
+        .order_by('-puntaje', 'id')
+    )
+    paginator = Paginator(pendientes, 20)
+    pares = paginator.get_page(request.GET.get('page'))
+    return render(request, 'pacientes/duplicados.html', {'pares': pares})
+
+@admin_required
+@require_http_methods(["POST"])
+def fusionar_duplicado(request, duplicado_id):
+    # Un par que perdió uno de sus pacientes ya no se puede fusionar
+    par = get_object_or_404(
+        PosibleDuplicado, id=duplicado_id, estado='pendiente', paciente_a__isnull=False, paciente_b__isnull=False
+    )
+    if request.POST.get('conservar') == 'b':
+        conservar, eliminar = par.paciente_b, par.paciente_a
+    else:
+        conservar, eliminar = par.paciente_a, par.paciente_b
+    fusionar_pacientes(conservar, eliminar, usuario=request.user)
+    messages.success(request, f'Paciente {eliminar} fusionado en {conservar} (C.I. {conservar.numero_documento}).')
+    return redirect('pacientes:duplicados')
+
+@admin_required
+@require_http_methods(["POST"])
+def descartar_duplicado(request, duplicado_id):
+    par = get_object_or_404(PosibleDuplicado, id=duplicado_id, estado='pendiente')
+    par.estado = 'descartado'
+    par.revisado_por = request.user
+    par.save()
+    messages.success(request, 'El par fue marcado como no duplicado.')
+    return redirect('pacientes:duplicados')
+
+# Vistas AJAX async: bajo ASGI no ocupan un hilo mientras esperan a la base.
+# Las opciones se renderizan sin `request` porque los context processors de
+# base.html consultan la base de forma síncrona y aquí no hacen falta.
+async def _opciones(consulta):
+    opciones = [opcion async for opcion in consulta.only('id', 'nombre').order_by('nombre')]
+    return HttpResponse(render_to_string('pacientes/dropdown_list_options.html', {'opciones': opciones}))
+
 @login_required
-def cargar_estados(request):
+async def cargar_estados(request):
     pais_id = request.GET.get('pais_id')
-    estados = Estado.objects.filter(pais_id=pais_id).order_by('nombre')
-    return render(request, 'pacientes/dropdown_list_options.html', {'opciones': estados})
+    if not str(pais_id).isdigit():
+        return HttpResponse('')
+    return await _opciones(Estado.objects.filter(pais_id=pais_id))
 
 @login_required
-def cargar_ciudades(request):
+async def cargar_ciudades(request):
     estado_id = request.GET.get('estado_id')
-    ciudades = Ciudad.objects.filter(estado_id=estado_id).order_by('nombre')
-    return render(request, 'pacientes/dropdown_list_options.html', {'opciones': ciudades})
+    if not str(estado_id).isdigit():
+        return HttpResponse('')
+    return await _opciones(Ciudad.objects.filter(estado_id=estado_id))
 
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
-def crear_tipo_telefono_ajax(request):
+async def crear_tipo_telefono_ajax(request):
     try:
         data = json.loads(request.body)
         form = TipoTelefonoForm(data)
-        if form.is_valid():
-            tipo_telefono = form.save()
+        tipo_telefono = await guardar_formulario(form)
+        if tipo_telefono is not None:
             return JsonResponse({
                 'success': True,
                 'id': tipo_telefono.id,
@@ -188,76 +288,33 @@ def crear_tipo_telefono_ajax(request):
 # --- Vistas de Exportación --- #
 
 @personal_medico_required
+@usar_replica
 def exportar_pacientes_pdf(request):
     pacientes = Paciente.objects.all().select_related('direccion__ciudad__estado__pais').prefetch_related('telefonos__tipo_telefono').order_by('apellido', 'nombre')
-    logo_path = str(BASE_DIR / 'static/img/logo.png')
-    
-    context = {
-        'pacientes': pacientes,
-        'logo_path': logo_path,
-        'generation_date': datetime.datetime.now().strftime('%d/%m/%Y %H:%M')
-    }
-
-    template = get_template('pacientes/pdf_template.html')
-    html = template.render(context)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="dossier_pacientes_{}.pdf"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-        return response
-    
-    return HttpResponse("Error al generar el PDF.", status=400)
+    return exportacion.respuesta_pdf('pacientes/pdf_template.html', {'pacientes': pacientes}, 'dossier_pacientes')
 
 @personal_medico_required
+@usar_replica
 def exportar_pacientes_excel(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="listado_pacientes_{}.xlsx"'.format(datetime.datetime.now().strftime("%Y%m%d"))
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Pacientes"
-    ws.freeze_panes = 'A2'
     headers = ['Cédula', 'Nombre', 'Apellido', 'Fecha de Nacimiento', 'Edad', 'Género', 'Email', 'Dirección', 'Ciudad', 'Estado', 'País', 'Teléfonos']
-    ws.append(headers)
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="0d6efd", end_color="0d6efd", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
     pacientes = Paciente.objects.all().select_related('direccion__ciudad__estado__pais').prefetch_related('telefonos').order_by('apellido', 'nombre')
-    for paciente in pacientes:
-        direccion_obj = paciente.direccion
-        dir_completa, ciudad, estado, pais = "N/A", "N/A", "N/A", "N/A"
-        if direccion_obj:
-            dir_completa = direccion_obj.direccion
-            if direccion_obj.ciudad:
-                ciudad = direccion_obj.ciudad.nombre
-                if direccion_obj.ciudad.estado:
-                    estado = direccion_obj.ciudad.estado.nombre
-                    if direccion_obj.ciudad.estado.pais:
-                        pais = direccion_obj.ciudad.estado.pais.nombre
-        telefonos = ", ".join([t.numero for t in paciente.telefonos.all()])
-        ws.append([
-            paciente.numero_documento, paciente.nombre, paciente.apellido, paciente.fecha_nacimiento, paciente.edad,
-            paciente.get_genero_display(), paciente.email or 'N/A', dir_completa, ciudad, estado, pais, telefonos
-        ])
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(response)
-    return response
\ No newline at end of file
+
+    def filas():
+        for paciente in pacientes:
+            direccion_obj = paciente.direccion
+            dir_completa, ciudad, estado, pais = "N/A", "N/A", "N/A", "N/A"
+            if direccion_obj:
+                dir_completa = direccion_obj.direccion
+                if direccion_obj.ciudad:
+                    ciudad = direccion_obj.ciudad.nombre
+                    if direccion_obj.ciudad.estado:
+                        estado = direccion_obj.ciudad.estado.nombre
+                        if direccion_obj.ciudad.estado.pais:
+                            pais = direccion_obj.ciudad.estado.pais.nombre
+            telefonos = ", ".join([t.numero for t in paciente.telefonos.all()])
+            yield [
+                paciente.numero_documento, paciente.nombre, paciente.apellido, paciente.fecha_nacimiento, paciente.edad,
+                paciente.get_genero_display(), paciente.email or 'N/A', dir_completa, ciudad, estado, pais, telefonos
+            ]
+
+    return exportacion.respuesta_excel('listado_pacientes', 'Pacientes', headers, filas(), centrar=True)
\ No newline at end of file
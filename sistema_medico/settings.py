@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'citas',
     'historiales',
     'inventario',
+    'api',
 ]
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
@@ -62,11 +63,13 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Middleware de Whitenoise
+    'core.estaticos.WhiteNoiseMiddleware',  # Whitenoise, también sin bloquear bajo ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auditoria.AuditoriaMiddleware',  # Guarda los eventos de auditoría de la petición
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,19 +82,29 @@ TEMPLATES = [
         'DIRS': [
             BASE_DIR / 'templates',  # Directorio global de plantillas
         ],
-        'APP_DIRS': True,  # Buscar plantillas en directorios templates de cada app
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.navegacion',
+            ],
+            # Cada proceso compila cada plantilla una sola vez. Con DEBUG, el
+            # autorecargador de runserver vacía esta caché al editar una plantilla.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',  # Directorios templates de cada app
+                ]),
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'sistema_medico.wsgi.application'
+# Despliegue ASGI (vistas async, citas de hoy en vivo): uvicorn sistema_medico.asgi:application
+ASGI_APPLICATION = 'sistema_medico.asgi.application'
 
 
 # Database
@@ -118,6 +131,66 @@ DATABASES = {
     }
 }
 
+# Conexiones: persistentes por proceso con chequeo de salud (por defecto), o
+# pool de psycopg 3 con DB_POOL=True. Con pool, Django exige CONN_MAX_AGE=0
+# porque es el pool quien reutiliza las conexiones (ver core/conexiones.py).
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+if DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Réplica de lectura para reportes, exportaciones y búsquedas (core/replicas.py).
+# Con DB_REPLICA=True y sin DB_REPLICA_HOST usa la misma base bajo otro alias,
+# en modo de solo lectura, para probar el enrutamiento en local.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if config('DB_REPLICA', default=bool(DB_REPLICA_HOST), cast=bool):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST or DATABASES['default']['HOST'],
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        # Una réplica en espera no admite transacciones serializables
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'options': '-c default_transaction_read_only=on'},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.replicas.RouterReplica']
+REPLICA_VENTANA_ESCRITURA = config('REPLICA_VENTANA_ESCRITURA', default=5, cast=int)
+
+# Caché. `default` es local a cada proceso salvo que se configure un backend
+# compartido (p. ej. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# y CACHE_LOCATION=redis://127.0.0.1:6379), necesario para que los cambios en
+# las tablas de referencia (core/referencias.py) y en las estadísticas de
+# antropometría (historiales/antropometria.py) lleguen a todos los procesos.
+# `fragmentos` guarda la barra de navegación y el pie de base.html (uno por
+# rol) durante CACHE_FRAGMENTOS segundos.
+CACHE_FRAGMENTOS = config('CACHE_FRAGMENTOS', default=3600, cast=int)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    },
+    'fragmentos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragmentos',
+    },
+}
+
+# Segundos entre verificaciones del sello de versión de cada tabla de referencia
+REFERENCIAS_VERIFICAR_CADA = config('REFERENCIAS_VERIFICAR_CADA', default=2, cast=float)
+# Con la caché local, segundos tras los que cada proceso recarga sus tablas de
+# referencia aunque no haya visto un sello nuevo
+REFERENCIAS_EDAD_MAXIMA_LOCAL = config('REFERENCIAS_EDAD_MAXIMA_LOCAL', default=60, cast=float)
+
+# Reintentos ante conflictos de serialización (core/transacciones.py)
+TRANSACCION_MAX_INTENTOS = config('TRANSACCION_MAX_INTENTOS', default=4, cast=int)
+TRANSACCION_ESPERA_BASE = config('TRANSACCION_ESPERA_BASE', default=0.05, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
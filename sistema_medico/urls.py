@@ -51,6 +51,7 @@ urlpatterns = [
     path('citas/', include('citas.urls', namespace='citas')),
     path('historiales/', include('historiales.urls', namespace='historiales')),
     path('inventario/', include('inventario.urls', namespace='inventario')),
+    path('api/', include('api.urls', namespace='api')),
     path('accounts/', include('django.contrib.auth.urls')),
 ]
 